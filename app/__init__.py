@@ -1,35 +1,69 @@
 import os
+import queue
+import atexit
 import logging
 
 
 from os import getenv
 from config import TestConfig
-from flask import Flask, request
+from flask import Flask
 from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
 from flask_sqlalchemy import SQLAlchemy
 from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-from logging.handlers import RotatingFileHandler
-
-
-db = SQLAlchemy()
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from app.cache import Cache
+from app.commands import rebuild_task_stats_command
+from app.hashing import PasswordHasher
+from app.loadgen import loadgen_command
+from app.metrics import Metrics
+from app.profiling import QueryProfiler
+from app.rate_limiting import rate_limit_key
+from app.replicas import ReadReplicas, RoutingSession
+from app.request_logging import register_request_logging
+from app.revocation import TokenBlocklist
+from app.tokens import CachingJWTManager
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 migrate = Migrate()
-jwt = JWTManager()
+jwt_cache = Cache('JWT_CACHE')
+jwt = CachingJWTManager(jwt_cache)
+token_blocklist = TokenBlocklist(jwt)
 limiter = Limiter(
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     default_limits=['1 per second', '50 per hour']
 )
+task_cache = Cache('TASK_CACHE')
+password_hasher = PasswordHasher()
+metrics = Metrics()
+query_profiler = QueryProfiler()
+read_replicas = ReadReplicas()
+
+
+log_listeners = {}  # log file -> background thread writing the records of the apps logging to it
 
 
 def configure_logging(app: Flask) -> None:
-    logs_dir = 'logs'
-    os.makedirs(logs_dir, exist_ok=True)
-    log_file = os.path.join(logs_dir, 'app.log')
-    handler = RotatingFileHandler(log_file, maxBytes=1000000, backupCount=3)  # 1 MB limit, keep 3 old log files
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    app.logger.addHandler(handler)
+    """
+    Log records are put on a queue by the request threads and written to the log file and to stderr by a background
+    thread, one per log file, so that requests never wait for I/O. The default handler of the app logger, writing to
+    stderr on the request thread, is replaced, as well as the queue of a previous app logging with the same name.
+    """
+    log_file = os.path.abspath(app.config.get('LOG_FILE', os.path.join('logs', 'app.log')))
+    log_listener = log_listeners.get(log_file)
+    if log_listener is None:
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        file_handler = RotatingFileHandler(log_file, maxBytes=1000000, backupCount=3)  # 1 MB limit, keep 3 old files
+        file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter('[%(asctime)s] %(levelname)s in %(module)s: %(message)s'))
+        log_listener = QueueListener(queue.SimpleQueue(), file_handler, stream_handler, respect_handler_level=True)
+        log_listener.start()
+        atexit.register(log_listener.stop)  # flush the queue at exit
+        log_listeners[log_file] = log_listener
+    for handler in list(app.logger.handlers):
+        app.logger.removeHandler(handler)
+    app.logger.addHandler(QueueHandler(log_listener.queue))
     app.logger.setLevel(logging.INFO)
 
 
@@ -38,10 +72,24 @@ def configure_extensions(app: Flask) -> None:
     app.logger.info('db bounded to app')
     migrate.init_app(app, db)
     app.logger.info('alembic bounded to app')
+    read_replicas.init_app(app)
+    app.logger.info('read replicas bounded to app')
+    query_profiler.init_app(app)
+    app.logger.info('query profiler bounded to app')
+    metrics.init_app(app)  # before the limiter, so that rejected requests are measured too
+    app.logger.info('metrics bounded to app')
     limiter.init_app(app)
     app.logger.info('limiter bounded to app')
     jwt.init_app(app)
     app.logger.info('jwt manager bounded to app')
+    token_blocklist.init_app(app)
+    app.logger.info('token blocklist bounded to app')
+    jwt_cache.init_app(app)
+    app.logger.info('jwt cache bounded to app')
+    task_cache.init_app(app)
+    app.logger.info('task cache bounded to app')
+    password_hasher.init_app(app)
+    app.logger.info('password hasher bounded to app')
 
 
 def init_database(app: Flask) -> None:
@@ -49,6 +97,8 @@ def init_database(app: Flask) -> None:
         if getenv("INIT_DATABASE"):
             from app.models.task import Task  # be sure to import all the models before running create_all
             from app.models.user import User
+            from app.models.revoked_token import RevokedToken
+            from app.models.task_stats import TaskStats
             # db.drop_all()
             db.create_all()
             app.logger.info('db.create_all()')
@@ -60,6 +110,11 @@ def register_blueprints(app):
     app.logger.info('blueprints registered')
 
 
+def register_commands(app: Flask) -> None:
+    app.cli.add_command(loadgen_command)
+    app.cli.add_command(rebuild_task_stats_command)
+
+
 def create_app(config=TestConfig) -> Flask:
     """
     Flask factory.
@@ -69,15 +124,11 @@ def create_app(config=TestConfig) -> Flask:
     app = Flask(__name__)
     app.config.from_object(config())
     configure_logging(app)
+    register_request_logging(app)  # before the extensions, so that requests rejected by the limiter are logged too
     configure_extensions(app)
     init_database(app)
     register_blueprints(app)
-
-    @app.before_request
-    def log_request_info() -> None:
-        app.logger.info('Request: %s %s', request.method, request.url)
-        app.logger.info('Request Headers: %s', request.headers)
-        app.logger.info('Request Body: %s', request.get_data())
+    register_commands(app)
 
     # Error handler for unhandled exceptions
     @app.errorhandler(Exception)
@@ -0,0 +1,67 @@
+from os import getenv
+from quart import Quart
+from werkzeug.exceptions import HTTPException
+from config import TestConfig
+from app import configure_logging, password_hasher, task_cache
+from app.aio.database import async_db
+
+
+def init_database(app: Quart) -> None:
+    if getenv("INIT_DATABASE"):
+        @app.before_serving
+        async def create_all():
+            from app.models.task import Task  # be sure to import all the models before running create_all
+            from app.models.task_stats import TaskStats
+            from app.models.user import User
+            from app.models.revoked_token import RevokedToken
+            await async_db.create_all()
+            app.logger.info('async_db.create_all()')
+
+
+def create_async_app(config=TestConfig) -> Quart:
+    """
+    Async app factory: the /register, /login, /refresh and /tasks endpoints of the API on an asyncio stack (Quart),
+    served by an ASGI server such as hypercorn, e.g. hypercorn "asgi:app". Requests waiting for the db or for idle
+    keep-alive clients do not hold a thread each, so many concurrent connections are served by a single thread.
+
+    The responses, the tokens and the db are the ones of the sync app, so that both can serve the same clients.
+    The other endpoints and the extensions of the sync app (rate limits, caches, read replicas, metrics, query
+    profiler) are not available. The task cache is not read, but the tasks written are invalidated in it, so that
+    the sync app does not serve them stale: this needs the sqlite backend, shared by the processes of the host.
+
+    :return: app
+    :raise ValueError: if the task cache is enabled with a backend other than sqlite
+    """
+    app = Quart(__name__)
+    app.config.from_object(config())
+    app.json.sort_keys = False  # fields in the order of the models, as the sync app
+    configure_logging(app)
+    async_db.init_app(app)
+    app.logger.info('async db bounded to app')
+    password_hasher.init_app(app)
+    app.logger.info('password hasher bounded to app')
+    if app.config.get('TASK_CACHE_ENABLED'):
+        if app.config.get('TASK_CACHE_BACKEND', 'memory') != 'sqlite':
+            raise ValueError("TASK_CACHE_BACKEND must be 'sqlite' with the async app, which cannot invalidate the "
+                             "memory cache of the sync app processes")
+        task_cache.init_app(app)
+        app.logger.info('task cache bounded to app')
+    init_database(app)
+
+    from app.aio.api import api_bp
+    app.register_blueprint(api_bp, url_prefix='/api')
+    app.logger.info('blueprints registered')
+
+    @app.after_serving
+    async def dispose():
+        await async_db.dispose()
+
+    # Error handler for unhandled exceptions
+    @app.errorhandler(Exception)
+    async def handle_exception(e):
+        if isinstance(e, HTTPException):
+            return e
+        app.logger.exception(e)
+        return {'message': 'Internal Server Error'}, 500
+
+    return app
@@ -0,0 +1,238 @@
+from quart import Blueprint, current_app, request
+from flask_restx.reqparse import RequestParser
+from werkzeug.datastructures import MultiDict
+from app.hashing import PasswordHasherBusy
+from app.repositories.async_task_repository import AsyncTaskRepository
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.api.api_models import task_encoder, get_task_encoder, task_list_parser, task_get_parser, \
+    task_delete_parser, TASK_LIST_FILTERS
+from app.api.resources.task import TaskResource
+from app.api.resources.user import UserRegistration
+from app.aio.tokens import create_token, get_jwt_identity, jwt_required
+
+api_bp = Blueprint('async_api', __name__)
+
+
+def query_args(parser: RequestParser, args: MultiDict) -> dict:
+    """
+    Convert the query string arguments declared by a reqparse parser of the sync API, with the same types and
+    choices, so that both apps accept the same requests.
+
+    :param parser: parser
+    :param args: query string arguments
+    :return: argument name -> value, None if the argument is missing
+    :raise ValueError: if an argument is not valid
+    """
+    values = {}
+    for argument in parser.args:
+        value = args.get(argument.name)
+        if value is not None:
+            try:
+                value = argument.type(value)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f'{argument.name}: {argument.help or e}')
+            if argument.choices and value not in argument.choices:
+                raise ValueError(f'{argument.name}: {value} is not a valid choice')
+        values[argument.name] = value
+    return values
+
+
+def error(msg: str, status_code: int, level: str = 'error', headers: dict = None) -> (dict, int, dict):
+    """
+    Log an error and build its response, as the resources of the sync API do.
+
+    :param msg: message
+    :param status_code: status code
+    :param level: log level
+    :param headers: headers of the response
+    :return: message, status_code, headers
+    """
+    getattr(current_app.logger, level)(msg)
+    return {'message': msg}, status_code, headers or {}
+
+
+@api_bp.post('/register')
+async def register():
+    """
+    Register a user.
+
+    :return: message, status_code
+    """
+    payload = await request.get_json(silent=True) or {}
+    username, password = payload.get('username'), payload.get('password')
+    if not isinstance(username, str) or not username or not isinstance(password, str):
+        return error('username and password cannot be blank', 400)
+    try:
+        UserRegistration.password_validator(password)
+    except ValueError as e:
+        return error(str(e), 400)
+    try:
+        created = await AsyncUserRepository.create_user(username, password)
+    except PasswordHasherBusy as e:
+        return error(str(e), 503, headers={'Retry-After': '1'})
+    if not created:
+        return error(f'username {username} already exists', 400)
+    msg = f'user {username} created successfully'
+    current_app.logger.info(msg)
+    return {'message': msg}, 201
+
+
+@api_bp.post('/login')
+async def login():
+    """
+    Login.
+
+    :return: error_message or access_token, status_code
+    """
+    payload = await request.get_json(silent=True) or {}
+    username, password = payload.get('username'), payload.get('password')
+    user = await AsyncUserRepository.get_user_by_username(username) if isinstance(username, str) else None
+    try:
+        valid_password = user is not None and isinstance(password, str) \
+            and await AsyncUserRepository.check_password(user, password)
+    except PasswordHasherBusy as e:
+        return error(str(e), 503, headers={'Retry-After': '1'})
+    if not valid_password:
+        return error('invalid username or password', 401)
+    current_app.logger.info('successful login')
+    return {'access_token': create_token(user.username), 'refresh_token': create_token(user.username, 'refresh')}, 200
+
+
+@api_bp.post('/refresh')
+@jwt_required(refresh=True)
+async def refresh():
+    """
+    Get a new access token.
+
+    :return: message, status_code
+    """
+    current_app.logger.info('token refreshed')
+    return {'access_token': create_token(get_jwt_identity())}, 200
+
+
+@api_bp.get('/tasks')
+@jwt_required()
+async def get_tasks():
+    """
+    Get all tasks, or a page of tasks if any of limit, after, sort or a filter is specified, as GET /tasks of the
+    sync app. Tasks are always read as plain rows and encoded by a task encoder.
+
+    :return: list of tasks, status_code, headers
+    """
+    try:
+        args = query_args(task_list_parser, request.args)
+    except ValueError as e:
+        return error(str(e), 400)
+    names = args['fields'] or list(task_encoder.names)
+    filters = {key: args[key] for key in TASK_LIST_FILTERS if args[key] is not None}
+    if args['limit'] is None and args['after'] is None and args['sort'] is None and not filters:
+        tasks = await AsyncTaskRepository.get_all_tasks(names)
+        current_app.logger.info('all tasks returned')
+        return get_task_encoder(tuple(names))(tasks), 200
+    limit = min(args['limit'] or current_app.config['TASKS_PAGE_DEFAULT_LIMIT'],
+                current_app.config['TASKS_PAGE_MAX_LIMIT'])
+    try:
+        sort = args['sort'] or (None if filters else 'id')
+        tasks, next_cursor = await AsyncTaskRepository.get_tasks_page(limit, args['after'], sort, names, **filters)
+    except ValueError as e:
+        return error(str(e), 400, 'warning')
+    current_app.logger.info(f'page of {len(tasks)} tasks returned')
+    return get_task_encoder(tuple(names))(tasks), 200, {'X-Next-Cursor': next_cursor} if next_cursor else {}
+
+
+@api_bp.post('/tasks')
+@jwt_required()
+async def post_task():
+    """
+    Create a new task.
+
+    :return: task, status_code
+    """
+    payload = await request.get_json(silent=True)
+    try:
+        fields = TaskResource.patch_validator(payload)
+        if 'name' not in fields:
+            raise ValueError('name cannot be blank.')
+    except ValueError as e:
+        return error(str(e), 400)
+    task = await AsyncTaskRepository.create_task(fields['name'], fields.get('priority', 1))
+    current_app.logger.info(f'task {task.id} successfully created')
+    return task_encoder.encode_row(task), 201
+
+
+@api_bp.delete('/tasks')
+@jwt_required()
+async def delete_tasks():
+    """
+    Delete all tasks, or the tasks matching all the filters, whose number is returned.
+
+    :return: message, status_code
+    """
+    try:
+        filters = {key: value for key, value in query_args(task_delete_parser, request.args).items()
+                   if value is not None}
+    except ValueError as e:
+        return error(str(e), 400)
+    if len(filters.get('ids', [])) > current_app.config['TASKS_BATCH_MAX_SIZE']:
+        return error(f'ids cannot contain more than {current_app.config["TASKS_BATCH_MAX_SIZE"]} tasks', 400)
+    deleted = await AsyncTaskRepository.delete_tasks(**filters)
+    current_app.logger.info(f'{deleted} tasks deleted')
+    return ({'deleted': deleted}, 200) if filters else ('', 204)
+
+
+@api_bp.get('/tasks/<int:task_id>')
+@jwt_required()
+async def get_task(task_id: int):
+    """
+    Get task by task_id, only the fields listed in fields if specified.
+
+    :param task_id: task id
+    :return: task, status_code
+    """
+    try:
+        names = query_args(task_get_parser, request.args)['fields'] or list(task_encoder.names)
+    except ValueError as e:
+        return error(str(e), 400)
+    task = await AsyncTaskRepository.get_task_by_id(task_id, names)
+    if task is None:
+        return error(f'task {task_id} not found', 404, 'warning')
+    current_app.logger.info(f'get task {task_id}')
+    return get_task_encoder(tuple(names)).encode_row(task), 200
+
+
+@api_bp.route('/tasks/<int:task_id>', methods=['PUT', 'PATCH'])
+@jwt_required()
+async def update_task(task_id: int):
+    """
+    Update a task by id: all the fields with PUT, the fields of the body with PATCH.
+
+    :param task_id: task id
+    :return: message, status_code
+    """
+    payload = await request.get_json(silent=True)
+    try:
+        fields = TaskResource.patch_validator(payload)
+        if request.method == 'PUT' and set(fields) != {'name', 'priority'}:
+            raise ValueError('name and priority are required.')
+    except ValueError as e:
+        return error(str(e), 400)
+    if await AsyncTaskRepository.update_task_by_id(task_id, **fields) is None:
+        return error(f'task {task_id} not found', 404, 'warning')
+    msg = f'task {task_id} updated'
+    current_app.logger.info(msg)
+    return {'message': msg}, 200
+
+
+@api_bp.delete('/tasks/<int:task_id>')
+@jwt_required()
+async def delete_task(task_id: int):
+    """
+    Delete a task by id.
+
+    :param task_id: task id
+    :return: message, status_code
+    """
+    if not await AsyncTaskRepository.delete_task_by_id(task_id):
+        return error(f'task {task_id} not found', 404, 'warning')
+    current_app.logger.info(f'task {task_id} deleted')
+    return '', 204
@@ -0,0 +1,95 @@
+from sqlalchemy import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
+from quart import Quart, current_app, g
+from app import db
+from app.replicas import ReadReplicas
+
+# async drivers replacing the sync ones of SQLALCHEMY_DATABASE_URI, other URIs must name an async driver already
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'sqlite+pysqlite': 'sqlite+aiosqlite',
+}
+
+
+class AsyncDatabase:
+    """
+    Async counterpart of the Flask-SQLAlchemy extension for the apps served on an asyncio loop: an AsyncEngine on
+    SQLALCHEMY_DATABASE_URI, with the async driver of its dialect (aiosqlite for SQLite), and an AsyncSession per
+    app context, i.e. per request, closed at its teardown. The models and the metadata are the ones of db.
+    """
+
+    def __init__(self, app: Quart = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Quart) -> None:
+        """
+        Bind the engine to an app.
+
+        :param app: app
+        :return: None
+        """
+        # relative sqlite paths are in the instance folder, as the ones of the sync app
+        url = make_url(ReadReplicas._resolve(app, app.config['SQLALCHEMY_DATABASE_URI']))
+        url = url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+        options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+        if url.get_backend_name() == 'sqlite':
+            if url.database in (None, '', ':memory:'):
+                options.setdefault('poolclass', StaticPool)  # a single connection, else every connection has its own db
+            else:
+                # aiosqlite defaults to NullPool, i.e. a connection and a driver thread per session: pool them as the
+                # sync engine does
+                options.setdefault('poolclass', AsyncAdaptedQueuePool)
+        engine = create_async_engine(url, **options)
+        app.extensions['async_db'] = (engine, async_sessionmaker(engine, expire_on_commit=False))
+        app.teardown_appcontext(self._close_session)
+
+    @staticmethod
+    async def _close_session(exception: BaseException = None) -> None:
+        session = g.pop('async_session', None)
+        if session is not None:
+            await session.close()
+
+    @property
+    def engine(self) -> AsyncEngine:
+        return current_app.extensions['async_db'][0]
+
+    @property
+    def session(self) -> AsyncSession:
+        """
+        Session of the current app context, created on first use.
+        Objects are not expired on commit, so that their attributes can be read afterwards without implicit I/O.
+        """
+        if 'async_session' not in g:
+            g.async_session = current_app.extensions['async_db'][1]()
+        return g.async_session
+
+    async def create_all(self) -> None:
+        """
+        Create the tables of the models, with the triggers attached to them, as db.create_all does.
+
+        :return: None
+        """
+        async with self.engine.begin() as connection:
+            await connection.run_sync(db.metadata.create_all)
+
+    async def drop_all(self) -> None:
+        """
+        Drop the tables of the models.
+
+        :return: None
+        """
+        async with self.engine.begin() as connection:
+            await connection.run_sync(db.metadata.drop_all)
+
+    async def dispose(self) -> None:
+        """
+        Close the connections of the engine.
+
+        :return: None
+        """
+        await self.engine.dispose()
+
+
+async_db = AsyncDatabase()
@@ -0,0 +1,100 @@
+import uuid
+import functools
+import jwt
+
+from datetime import datetime, timedelta, timezone
+from quart import current_app, g, request
+from app.repositories.async_revoked_token_repository import AsyncRevokedTokenRepository
+
+# Defaults of flask_jwt_extended, so that the tokens issued by the sync and the async apps are interchangeable
+DEFAULT_EXPIRES = {'access': timedelta(minutes=15), 'refresh': timedelta(days=30)}
+
+
+def _expires(token_type: str):
+    expires = current_app.config.get(f'JWT_{token_type.upper()}_TOKEN_EXPIRES', DEFAULT_EXPIRES[token_type])
+    return timedelta(seconds=expires) if isinstance(expires, int) and not isinstance(expires, bool) else expires
+
+
+def create_token(identity: str, token_type: str = 'access') -> str:
+    """
+    Create a JWT with the claims of flask_jwt_extended create_access_token / create_refresh_token, signed with the
+    same key and algorithm, so that it is accepted by the sync app too.
+
+    :param identity: identity of the user, i.e. the username
+    :param token_type: 'access' or 'refresh'
+    :return: encoded token
+    """
+    now = datetime.now(timezone.utc)
+    claims = {
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': token_type,
+        'sub': identity,
+        'nbf': now,
+        'csrf': str(uuid.uuid4()),
+    }
+    expires = _expires(token_type)
+    if expires is not False:
+        claims['exp'] = now + expires
+    return jwt.encode(claims, current_app.config['JWT_SECRET_KEY'],
+                      algorithm=current_app.config.get('JWT_ALGORITHM', 'HS256'))
+
+
+def decode_token(encoded_token: str) -> dict:
+    """
+    Decode and verify a JWT.
+
+    :param encoded_token: token
+    :return: claims
+    :raise jwt.PyJWTError: if the token is invalid or expired
+    """
+    return jwt.decode(encoded_token, current_app.config['JWT_SECRET_KEY'],
+                      algorithms=[current_app.config.get('JWT_ALGORITHM', 'HS256')],
+                      leeway=current_app.config.get('JWT_DECODE_LEEWAY', 0))
+
+
+def get_jwt_identity() -> str:
+    """
+    Get the identity of the token of the current request, verified by jwt_required.
+
+    :return: identity
+    """
+    return g.jwt['sub']
+
+
+def jwt_required(refresh: bool = False):
+    """
+    Decorator of the views requiring a valid token in the Authorization header, the async counterpart of
+    flask_jwt_extended jwt_required: the errors have the same status codes and messages. Revocations made by
+    /logout of the sync app are enforced with a lookup of the revoked_token table.
+
+    :param refresh: if True, only refresh tokens are accepted, else only access tokens
+    :return: decorator
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            header = request.headers.get('Authorization')
+            if not header:
+                return {'msg': 'Missing Authorization Header'}, 401
+            scheme, _, encoded_token = header.partition(' ')
+            if scheme != 'Bearer':
+                return {'msg': "Missing 'Bearer' type in 'Authorization' header. "
+                               "Expected 'Authorization: Bearer <JWT>'"}, 401
+            try:
+                claims = decode_token(encoded_token)
+            except jwt.ExpiredSignatureError:
+                return {'msg': 'Token has expired'}, 401
+            except jwt.PyJWTError as e:
+                return {'msg': str(e)}, 422
+            if refresh and claims.get('type') != 'refresh':
+                return {'msg': 'Only refresh tokens are allowed'}, 422
+            if not refresh and claims.get('type') == 'refresh':
+                return {'msg': 'Only non-refresh tokens are allowed'}, 422
+            if await AsyncRevokedTokenRepository.is_revoked(claims['jti']):
+                return {'msg': 'Token has been revoked'}, 401
+            g.jwt = claims
+            return await view(*args, **kwargs)
+        return wrapper
+    return decorator
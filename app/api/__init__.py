@@ -16,10 +16,19 @@ ns = Namespace("api", authorizations=authorizations)
 api.add_namespace(ns)
 
 # Import and register resource classes
-from app.api.resources.user import UserRegistration, UserLogin, TokenRefresh
-from app.api.resources.task import TasksResource, TaskResource
+from app.api.resources.user import UserRegistration, UserLogin, TokenRefresh, UserLogout
+from app.api.resources.task import TasksResource, TasksBatchResource, TasksExportResource, \
+    TasksSearchResource, TasksStatsResource, TasksClaimResource, TaskRenewResource, TaskAckResource, TaskResource
 ns.add_resource(UserRegistration, "/register")
 ns.add_resource(UserLogin, "/login")
 ns.add_resource(TokenRefresh, "/refresh")
+ns.add_resource(UserLogout, "/logout")
 ns.add_resource(TasksResource, "/tasks")
+ns.add_resource(TasksBatchResource, "/tasks/batch")
+ns.add_resource(TasksExportResource, "/tasks/export")
+ns.add_resource(TasksSearchResource, "/tasks/search")
+ns.add_resource(TasksStatsResource, "/tasks/stats")
+ns.add_resource(TasksClaimResource, "/tasks/claim")
 ns.add_resource(TaskResource, "/tasks/<int:task_id>")
+ns.add_resource(TaskRenewResource, "/tasks/<int:task_id>/renew")
+ns.add_resource(TaskAckResource, "/tasks/<int:task_id>/ack")
@@ -1,5 +1,51 @@
-from flask_restx import fields
+import functools
+
+from datetime import datetime
+from flask_restx import Model, fields, inputs, reqparse
 from app.api import api
+from app.api.serialization import RowEncoder
+
+
+def int_list(value: str) -> list[int]:
+    """
+    Parse a comma separated list of integers.
+
+    :param value: string to be parsed, e.g. '1,2,3'
+    :return: list of integers
+    """
+    try:
+        return [int(item) for item in value.split(',')]
+    except ValueError:
+        raise ValueError(f'{value} is not a comma separated list of integers')
+
+
+def local_datetime(value: str) -> datetime:
+    """
+    Parse an ISO 8601 date or datetime. Datetimes with a timezone are converted to naive local datetimes,
+    as the ones stored in the db.
+
+    :param value: string to be parsed, e.g. '2024-02-24T10:43:27'
+    :return: naive datetime
+    """
+    parsed = inputs.datetime_from_iso8601(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+
+def field_list(model: Model):
+    """
+    Build a parser of comma separated lists of fields of a model.
+
+    :param model: model
+    :return: parser returning the names of the listed fields in the order of the model, e.g. ['id', 'name']
+    """
+    def parse(value: str) -> list[str]:
+        names = {name.strip() for name in value.split(',') if name.strip()}
+        if not names or not names.issubset(model):
+            raise ValueError(f'{value} is not a comma separated list of fields, valid fields are {", ".join(model)}')
+        return [name for name in model if name in names]
+    return parse
 
 
 user_model = api.model("User", {
@@ -15,6 +61,10 @@ login_model = api.model("Login", {
     'password': fields.String(required=True, description='Password cannot be blank')
 })
 
+logout_model = api.model("Logout", {
+    'refresh_token': fields.String(required=False, description='Refresh token revoked too (optional)')
+})
+
 task_model = api.model("Task", {
     'id': fields.Integer,
     'name': fields.String,
@@ -23,7 +73,101 @@ task_model = api.model("Task", {
     'updated_at': fields.DateTime
 })
 
+
+@functools.lru_cache(maxsize=None)  # at most one encoder per subset of the task_model fields
+def get_task_encoder(names: tuple[str] = None) -> RowEncoder:
+    """
+    Get the encoder of the rows of some task_model fields, with the same output as task_model.
+
+    :param names: names of the fields, in the order of task_model, all the fields if None
+    :return: encoder
+    """
+    return RowEncoder(task_model, names)
+
+
+task_encoder = get_task_encoder()
+
+task_search_model = api.model("TaskSearchResult", {
+    **task_model,
+    'highlight': fields.String(description='HTML-escaped name, with the matching words between <mark> and </mark>')
+})
+
+task_search_encoder = RowEncoder(task_search_model)
+
+task_stats_model = api.model("TaskStats", {
+    'total': fields.Integer(description='Number of tasks'),
+    'priorities': fields.List(fields.Nested(api.model("TaskPriorityCount", {
+        'priority': fields.Integer,
+        'count': fields.Integer(description='Number of tasks with this priority')
+    })), description='Priorities with at least one task, in ascending order'),
+    'oldest_created_at': fields.DateTime(description='Creation date of the oldest task, null if there are no tasks'),
+    'newest_created_at': fields.DateTime(description='Creation date of the newest task, null if there are no tasks')
+})
+
+task_claim_model = api.model("TaskClaim", {
+    **task_model,
+    'lease_owner': fields.String(description='Owner of the lease, needed to renew it and to ack the task'),
+    'lease_expires_at': fields.DateTime(description='The task can be claimed by another worker after this date')
+})
+
+task_lease_model = api.model("TaskLease", {
+    'lease_owner': fields.String(description='Owner of the lease returned by the claim'),
+    'lease_seconds': fields.Integer(required=False, description='Duration of the lease (default=TASK_LEASE_SECONDS)')
+})
+
 task_post_model = api.model("TaskPost", {
     'name': fields.String(required=True, description='Name cannot be blank'),
     'priority': fields.Integer(required=False, description='Priority is optional (default=1)', default=1)
 })
+
+task_patch_model = api.model("TaskPatch", {
+    'name': fields.String(required=False, description='Name cannot be blank'),
+    'priority': fields.Integer(required=False, description='Priority')
+})
+
+task_batch_model = api.model("TaskBatch", {
+    'ids': fields.List(fields.Integer, description='Ids of the created tasks, in the order of the request')
+})
+
+# Filters of GET /tasks, see TaskRepository.get_tasks_page for the allowed combinations with the sort keys
+TASK_LIST_FILTERS = ('priority', 'priority_min', 'priority_max', 'created_from', 'created_to', 'updated_from',
+                     'updated_to', 'name_prefix')
+TASK_SORT_KEYS = ('id', 'priority', 'created_at', 'updated_at', 'name')
+
+task_list_parser = reqparse.RequestParser()
+task_list_parser.add_argument('limit', type=inputs.positive, location='args', help='Page size')
+task_list_parser.add_argument('after', type=str, location='args', help='Cursor returned by the previous page')
+task_list_parser.add_argument('sort', type=str, location='args',
+                              choices=[f'{order}{key}' for key in TASK_SORT_KEYS for order in ('', '-')],
+                              help='Sort key, descending if prefixed by -')
+task_list_parser.add_argument('priority', type=int, location='args', help='Priority of the tasks')
+task_list_parser.add_argument('priority_min', type=int, location='args', help='Minimum priority (inclusive)')
+task_list_parser.add_argument('priority_max', type=int, location='args', help='Maximum priority (inclusive)')
+task_list_parser.add_argument('created_from', type=local_datetime, location='args',
+                              help='Minimum creation date (inclusive), ISO 8601')
+task_list_parser.add_argument('created_to', type=local_datetime, location='args',
+                              help='Maximum creation date (exclusive), ISO 8601')
+task_list_parser.add_argument('updated_from', type=local_datetime, location='args',
+                              help='Minimum last modification date (inclusive), ISO 8601')
+task_list_parser.add_argument('updated_to', type=local_datetime, location='args',
+                              help='Maximum last modification date (exclusive), ISO 8601')
+task_list_parser.add_argument('name_prefix', type=str, location='args', help='Prefix of the name, case sensitive')
+task_list_parser.add_argument('fields', type=field_list(task_model), location='args',
+                              help='Comma separated list of the fields to return, e.g. id,name')
+
+task_search_parser = reqparse.RequestParser()
+task_search_parser.add_argument('q', type=str, location='args', required=True, help='Searched words')
+task_search_parser.add_argument('limit', type=inputs.positive, location='args', help='Page size')
+task_search_parser.add_argument('after', type=str, location='args', help='Cursor returned by the previous page')
+
+task_get_parser = reqparse.RequestParser()
+task_get_parser.add_argument('fields', type=field_list(task_model), location='args',
+                             help='Comma separated list of the fields to return, e.g. id,name')
+
+task_delete_parser = reqparse.RequestParser()
+task_delete_parser.add_argument('ids', type=int_list, location='args', help='Comma separated list of task ids')
+task_delete_parser.add_argument('priority', type=int, location='args', help='Priority of the tasks')
+task_delete_parser.add_argument('created_from', type=local_datetime, location='args',
+                                help='Minimum creation date (inclusive), ISO 8601')
+task_delete_parser.add_argument('created_to', type=local_datetime, location='args',
+                                help='Maximum creation date (exclusive), ISO 8601')
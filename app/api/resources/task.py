@@ -1,31 +1,145 @@
-from flask import current_app, Response, abort
-from flask_restx import Resource
-from flask_jwt_extended import jwt_required
+import json
+import uuid
+import hashlib
+import functools
+
+from datetime import datetime, timezone
+from flask import current_app, request, Response, abort, stream_with_context
+from flask_restx import Resource, marshal
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from werkzeug.http import http_date, is_resource_modified, quote_etag
 from app import limiter
 from app.repositories.task_repository import TaskRepository
-from app.api.api_models import task_model, task_post_model
+from app.api.api_models import task_model, task_encoder, get_task_encoder, task_post_model, task_patch_model, \
+    task_batch_model, task_list_parser, task_get_parser, task_delete_parser, task_search_model, task_search_encoder, \
+    task_search_parser, task_stats_model, task_claim_model, task_lease_model, TASK_LIST_FILTERS
 from app.api import ns
 
 
+def conditional_headers(last_modified: datetime, *values) -> (dict, bool):
+    """
+    Build the ETag and Last-Modified headers of a response and evaluate the conditional headers of the request.
+
+    :param last_modified: last modification date of the resource (naive local time), None if unknown
+    :param values: values that identify the version of the resource
+    :return: headers, True if the client copy of the resource is still valid (304 Not Modified), False otherwise
+    """
+    etag = hashlib.sha1(':'.join(str(value) for value in (last_modified, *values)).encode()).hexdigest()
+    headers = {'ETag': quote_etag(etag)}
+    if last_modified is not None:
+        last_modified = last_modified.astimezone(timezone.utc)
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers, not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+
+def lease_payload() -> dict:
+    """
+    Get the body of a claim, renewal or ack request.
+
+    :return: body of the request, {} if empty
+    :raise ValueError: if the body is not an object
+    """
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return {}
+    if not isinstance(payload, dict):
+        raise ValueError('Payload must be an object.')
+    return payload
+
+
+def lease_seconds(payload: dict) -> int:
+    """
+    Get the duration of a lease requested in the body of a claim or renewal.
+
+    :param payload: body of the request
+    :return: lease_seconds of the body, TASK_LEASE_SECONDS if not specified
+    :raise ValueError: if lease_seconds is not a positive integer up to TASK_LEASE_MAX_SECONDS
+    """
+    seconds = payload.get('lease_seconds')
+    if seconds is None:
+        return current_app.config['TASK_LEASE_SECONDS']
+    max_seconds = current_app.config['TASK_LEASE_MAX_SECONDS']
+    if type(seconds) is not int or not 0 < seconds <= max_seconds:
+        raise ValueError(f'lease_seconds must be an integer between 1 and {max_seconds}')
+    return seconds
+
+
 @ns.route("/tasks")
 class TasksResource(Resource):
     """
     Class implementing the Tasks resource.
     """
 
+    @staticmethod
+    def serialize(tasks: list, names: list[str] = None) -> list[dict]:
+        """
+        Serialize tasks as task_model does.
+
+        :param tasks: tasks, or rows with the values of the fields first
+        :param names: names of the fields of the rows, None if tasks are ORM objects
+        :return: list of dicts
+        """
+        if names is None:
+            return marshal(tasks, task_model)
+        return get_task_encoder(tuple(names))(tasks)
+
     @jwt_required()
     @ns.doc(security="jsonWebToken")
-    @ns.marshal_list_with(task_model)
+    @ns.expect(task_list_parser)
+    @ns.response(200, 'Success', [task_model])
+    @ns.response(304, 'Not Modified')
     def get(self) -> (Response, int):
         """
         Get all tasks.
+        If any of limit, after, sort or a filter is specified, a single page of tasks is returned instead: the cursor
+        of the next page is sent in the X-Next-Cursor header. Filters on a column are only allowed with the sort
+        keys served by the index of the column, and they sort by it by default.
+        The ETag is derived from the version of the whole task list, so a 304 is returned without loading any task,
+        once the arguments have been validated.
+        If fields is specified, only the columns of these fields are selected and returned.
+        With fields or TASKS_FAST_SERIALIZATION, tasks are selected as plain rows and encoded by a task encoder
+        instead of being loaded as ORM objects and marshalled.
 
-        :return: list of tasks, status_code
+        :return: list of tasks, status_code, headers
         """
-        tasks = TaskRepository.get_all_tasks()
-        msg = 'all tasks returned'
-        current_app.logger.info(msg)
-        return tasks, 200
+        args = task_list_parser.parse_args()
+        names = args['fields']
+        if names is None and current_app.config.get('TASKS_FAST_SERIALIZATION', False):
+            names = list(task_encoder.names)
+        columns = {'columns': names} if names is not None else {}
+        filters = {key: args[key] for key in TASK_LIST_FILTERS if args[key] is not None}
+        paginated = args['limit'] is not None or args['after'] is not None or args['sort'] is not None or filters
+        limit = min(args['limit'] or current_app.config['TASKS_PAGE_DEFAULT_LIMIT'],
+                    current_app.config['TASKS_PAGE_MAX_LIMIT'])
+        sort = args['sort'] or (None if filters else 'id')
+        try:
+            if paginated:
+                TaskRepository.validate_page(args['after'], sort, **filters)
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.warning(msg)
+            abort(400, msg)
+        version = TaskRepository.get_tasks_version()
+        headers, cached = conditional_headers(version.last_modified, version.count, version.max_id,
+                                              request.query_string.decode())
+        if cached:
+            current_app.logger.info('tasks not modified')
+            return Response(status=304, headers=headers)
+        if not paginated:
+            tasks = TaskRepository.get_all_tasks(**columns)
+            msg = 'all tasks returned'
+            current_app.logger.info(msg)
+            return self.serialize(tasks, names), 200, headers
+        try:
+            tasks, next_cursor = TaskRepository.get_tasks_page(limit, args['after'], sort, **columns, **filters)
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.warning(msg)
+            abort(400, msg)
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        current_app.logger.info(f'page of {len(tasks)} tasks returned')
+        return self.serialize(tasks, names), 200, headers
 
     @jwt_required()
     @ns.doc(security="jsonWebToken")
@@ -45,15 +159,261 @@ class TasksResource(Resource):
 
     @jwt_required()
     @ns.doc(security="jsonWebToken")
+    @ns.expect(task_delete_parser)
     def delete(self) -> (Response, int):
         """
         Delete all tasks.
+        If any filter is specified, only the tasks matching all the filters are deleted and their number is returned.
 
         :return: message, status_code
         """
-        TaskRepository.delete_all_tasks()
-        msg = 'all tasks deleted'
-        current_app.logger.info(msg)
+        filters = {key: value for key, value in task_delete_parser.parse_args().items() if value is not None}
+        if not filters:
+            TaskRepository.delete_all_tasks()
+            msg = 'all tasks deleted'
+            current_app.logger.info(msg)
+            return {}, 204
+        if len(filters.get('ids', [])) > current_app.config['TASKS_BATCH_MAX_SIZE']:
+            msg = f'ids cannot contain more than {current_app.config["TASKS_BATCH_MAX_SIZE"]} tasks'
+            current_app.logger.error(msg)
+            return {'message': msg}, 400
+        deleted = TaskRepository.delete_tasks(**filters)
+        current_app.logger.info(f'{deleted} tasks deleted')
+        return {'deleted': deleted}, 200
+
+
+@ns.route("/tasks/batch")
+class TasksBatchResource(Resource):
+    """
+    Class implementing the TasksBatch resource.
+    """
+
+    @staticmethod
+    def tasks_validator(payload: list, max_size: int) -> list[dict]:
+        """
+        Validate a batch of tasks.
+
+        :param payload: list of tasks, as specified by task_post_model
+        :param max_size: maximum number of tasks in the batch
+        :return: list of dicts with the name and the priority of each task
+        """
+        if not isinstance(payload, list) or not payload:
+            raise ValueError("Payload must be a non-empty list of tasks.")
+        if len(payload) > max_size:
+            raise ValueError(f"Payload cannot contain more than {max_size} tasks.")
+        tasks = []
+        for i, item in enumerate(payload):
+            if not isinstance(item, dict):
+                raise ValueError(f"Task {i} must be an object.")
+            name = item.get('name')
+            priority = item.get('priority', 1)
+            if not isinstance(name, str) or not name:
+                raise ValueError(f"Task {i}: name cannot be blank.")
+            if not isinstance(priority, int) or isinstance(priority, bool):
+                raise ValueError(f"Task {i}: priority must be an integer.")
+            tasks.append({'name': name, 'priority': priority})
+        return tasks
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect([task_post_model])
+    @ns.marshal_with(task_batch_model, code=201)
+    @limiter.limit('1 per 10 second')  # the limit is counted per batch, not per task
+    def post(self) -> (Response, int):
+        """
+        Create several tasks in a single transaction.
+
+        :return: ids of the created tasks, status_code
+        """
+        try:
+            tasks = self.tasks_validator(ns.payload, current_app.config['TASKS_BATCH_MAX_SIZE'])
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        ids = TaskRepository.create_tasks(tasks)
+        current_app.logger.info(f'{len(ids)} tasks successfully created')
+        return {'ids': ids}, 201
+
+
+@ns.route("/tasks/export")
+class TasksExportResource(Resource):
+    """
+    Class implementing the TasksExport resource.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.produces(['application/x-ndjson'])
+    def get(self) -> Response:
+        """
+        Export all tasks as newline delimited JSON.
+        Tasks are read from the db and sent to the client in batches, so the response is streamed and memory usage
+        does not depend on the number of tasks.
+
+        :return: streamed response, one task per line
+        """
+        if current_app.config.get('TASKS_FAST_SERIALIZATION', False):
+            batches = TaskRepository.iter_task_batches(current_app.config['TASKS_EXPORT_BATCH_SIZE'],
+                                                       columns=list(task_encoder.names))
+            encode = task_encoder.encode_row
+        else:
+            batches = TaskRepository.iter_task_batches(current_app.config['TASKS_EXPORT_BATCH_SIZE'])
+            encode = functools.partial(marshal, fields=task_model)
+
+        def generate():
+            for batch in batches:
+                yield ''.join(json.dumps(encode(task)) + '\n' for task in batch)
+
+        current_app.logger.info('tasks export started')
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@ns.route("/tasks/search")
+class TasksSearchResource(Resource):
+    """
+    Class implementing the TasksSearch resource.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect(task_search_parser)
+    @ns.response(200, 'Success', [task_search_model])
+    def get(self) -> (Response, int):
+        """
+        Search tasks by the words of their names.
+        Tasks containing all the words of q (the last one as a prefix) are returned by relevance, a page at a time:
+        the cursor of the next page is sent in the X-Next-Cursor header.
+
+        :return: list of tasks with their highlighted names, status_code, headers
+        """
+        args = task_search_parser.parse_args()
+        limit = min(args['limit'] or current_app.config['TASKS_PAGE_DEFAULT_LIMIT'],
+                    current_app.config['TASKS_PAGE_MAX_LIMIT'])
+        try:
+            rows, next_cursor = TaskRepository.search_tasks(args['q'], limit, args['after'])
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.warning(msg)
+            abort(400, msg)
+        headers = {'X-Next-Cursor': next_cursor} if next_cursor else {}
+        current_app.logger.info(f'{len(rows)} tasks found')
+        return task_search_encoder(rows), 200, headers
+
+
+@ns.route("/tasks/stats")
+class TasksStatsResource(Resource):
+    """
+    Class implementing the TasksStats resource.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.marshal_with(task_stats_model)
+    def get(self) -> dict:
+        """
+        Get the number of tasks by priority, the total and the creation dates of the oldest and newest tasks.
+        The counts are maintained incrementally in task_stats, so the cost does not depend on the number of tasks.
+
+        :return: task statistics
+        """
+        stats = TaskRepository.get_task_stats()
+        current_app.logger.info(f'{stats.total} tasks counted')
+        return stats._asdict()
+
+
+@ns.route("/tasks/claim")
+class TasksClaimResource(Resource):
+    """
+    Class implementing the TasksClaim resource: the task list used as a priority work queue.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect(task_lease_model)
+    @ns.response(200, 'Success', task_claim_model)
+    @ns.response(204, 'No task to claim')
+    def post(self) -> (Response, int):
+        """
+        Claim the task with the highest priority (priority 1 first) that is not leased by another worker.
+        The task is leased for lease_seconds: it must be acked (or the lease renewed) by then, otherwise it can be
+        claimed again. A task is never leased to two workers at the same time.
+
+        :return: claimed task with its lease, status_code
+        """
+        try:
+            seconds = lease_seconds(lease_payload())
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        task = TaskRepository.claim_task(f'{get_jwt_identity()}:{uuid.uuid4().hex}', seconds)
+        if task is None:
+            current_app.logger.info('no task to claim')
+            return {}, 204
+        current_app.logger.info(f'task {task.id} claimed by {task.lease_owner}')
+        return marshal(task, task_claim_model), 200
+
+
+@ns.route("/tasks/<int:task_id>/renew")
+class TaskRenewResource(Resource):
+    """
+    Class implementing the TaskRenew resource.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect(task_lease_model)
+    def post(self, task_id: int) -> (Response, int):
+        """
+        Renew the lease of a claimed task for lease_seconds from now.
+
+        :param task_id: task id
+        :return: new expiration date of the lease, status_code
+        """
+        try:
+            payload = lease_payload()
+            seconds = lease_seconds(payload)
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        expires_at = TaskRepository.renew_lease(task_id, payload.get('lease_owner'), seconds)
+        if expires_at is None:
+            msg = f'task {task_id} is not leased by {payload.get("lease_owner")}'
+            current_app.logger.warning(msg)
+            return {'message': msg}, 409
+        current_app.logger.info(f'lease of task {task_id} renewed')
+        return {'lease_expires_at': expires_at.isoformat()}, 200
+
+
+@ns.route("/tasks/<int:task_id>/ack")
+class TaskAckResource(Resource):
+    """
+    Class implementing the TaskAck resource.
+    """
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect(task_lease_model)
+    def post(self, task_id: int) -> (Response, int):
+        """
+        Acknowledge a claimed task once it has been processed: the task is deleted if the lease is still held.
+
+        :param task_id: task id
+        :return: status_code
+        """
+        try:
+            payload = lease_payload()
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        if not TaskRepository.ack_task(task_id, payload.get('lease_owner')):
+            msg = f'task {task_id} is not leased by {payload.get("lease_owner")}'
+            current_app.logger.warning(msg)
+            return {'message': msg}, 409
+        current_app.logger.info(f'task {task_id} acked')
         return {}, 204
 
 
@@ -65,22 +425,37 @@ class TaskResource(Resource):
 
     @jwt_required()
     @ns.doc(security="jsonWebToken")
-    @ns.marshal_with(task_model)
+    @ns.expect(task_get_parser)
+    @ns.response(200, 'Success', task_model)
+    @ns.response(304, 'Not Modified')
     def get(self, task_id: int) -> (Response, int):
         """
         Get task by task_id.
+        If fields is specified, only these fields are returned and, if the task is not cached, only their columns
+        are selected.
 
         :param task_id: task id
-        :return: task, status_code
+        :return: task, status_code, headers
         """
-        task = TaskRepository.get_task_by_id(task_id)
+        names = task_get_parser.parse_args()['fields']
+        if names is None:
+            task = TaskRepository.get_task_by_id(task_id)
+        else:
+            # id and updated_at are needed by the ETag and the Last-Modified headers
+            columns = names + [name for name in ('id', 'updated_at') if name not in names]
+            task = TaskRepository.get_task_by_id(task_id, columns=columns)
         if task is None:
-            # return {'message': f'task {task_id} not found'}, 404  @marshal_with would return a task with all nulls
             msg = f'task {task_id} not found'
             current_app.logger.warning(msg)
             abort(404, msg)
+        headers, cached = conditional_headers(task.updated_at, task.id, *(names or ()))
+        if cached:
+            current_app.logger.info(f'task {task_id} not modified')
+            return Response(status=304, headers=headers)
         current_app.logger.info(f'get task {task_id}')
-        return task, 200
+        if names is None:
+            return marshal(task, task_model), 200, headers
+        return get_task_encoder(tuple(names)).encode_row([getattr(task, name) for name in names]), 200, headers
 
     @jwt_required()
     @ns.doc(security="jsonWebToken")
@@ -93,7 +468,61 @@ class TaskResource(Resource):
         :param task_id: task id
         :return: message, status_code
         """
-        task = TaskRepository.update_task_by_id(task_id, ns.payload["name"], ns.payload["priority"])
+        try:
+            fields = self.patch_validator(request.get_json(silent=True))
+            if set(fields) != {'name', 'priority'}:
+                raise ValueError('name and priority are required.')
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        task = TaskRepository.update_task_by_id(task_id, fields['name'], fields['priority'])
+        if task is None:
+            msg = f'task {task_id} not found'
+            current_app.logger.warning(msg)
+            return {'message': msg}, 404
+        msg = f'task {task_id} updated'
+        current_app.logger.info(msg)
+        return {'message': msg}, 200
+
+    @staticmethod
+    def patch_validator(payload: dict) -> dict:
+        """
+        Validate a partial update of a task.
+
+        :param payload: fields to update, as specified by task_patch_model
+        :return: dict with the name and/or the priority of the task
+        """
+        if not isinstance(payload, dict) or not payload:
+            raise ValueError("Payload must be a non-empty object.")
+        unknown = sorted(set(payload) - {'name', 'priority'})
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}.")
+        if 'name' in payload and (not isinstance(payload['name'], str) or not payload['name']):
+            raise ValueError("name cannot be blank.")
+        priority = payload.get('priority', 0)
+        if not isinstance(priority, int) or isinstance(priority, bool):
+            raise ValueError("priority must be an integer.")
+        return payload
+
+    @jwt_required()
+    @ns.doc(security="jsonWebToken")
+    @ns.expect(task_patch_model)
+    @limiter.limit('1 per 10 second')
+    def patch(self, task_id: int) -> (Response, int):
+        """
+        Update some fields of a task by id.
+
+        :param task_id: task id
+        :return: message, status_code
+        """
+        try:
+            fields = self.patch_validator(request.get_json(silent=True))
+        except ValueError as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            abort(400, msg)
+        task = TaskRepository.update_task_by_id(task_id, **fields)
         if task is None:
             msg = f'task {task_id} not found'
             current_app.logger.warning(msg)
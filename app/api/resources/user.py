@@ -1,10 +1,15 @@
 import re
 
-from flask import current_app, Response
-from flask_jwt_extended import create_access_token, create_refresh_token, get_jwt_identity, jwt_required
+from flask import current_app, request, Response
+from flask_jwt_extended import create_access_token, create_refresh_token, decode_token, get_jwt, get_jwt_identity, \
+    jwt_required
+from flask_jwt_extended.exceptions import JWTExtendedException
 from flask_restx import Resource
+from jwt import PyJWTError
+from app import token_blocklist
+from app.hashing import PasswordHasherBusy
 from app.repositories.user_repository import UserRepository
-from app.api.api_models import login_model
+from app.api.api_models import login_model, logout_model
 from app.api import ns
 
 
@@ -46,7 +51,13 @@ class UserRegistration(Resource):
             msg = str(e)
             current_app.logger.error(msg)
             return {'message': msg}, 400
-        if not UserRepository.create_user(ns.payload['username'], ns.payload['password']):
+        try:
+            created = UserRepository.create_user(ns.payload['username'], ns.payload['password'])
+        except PasswordHasherBusy as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            return {'message': msg}, 503, {'Retry-After': '1'}
+        if not created:
             msg = f'username {ns.payload["username"]} already exists'
             current_app.logger.error(msg)
             return {'message': msg}, 400
@@ -69,7 +80,13 @@ class UserLogin(Resource):
         :return: error_message or access_token, status_code
         """
         user = UserRepository.get_user_by_username(ns.payload['username'])
-        if not user or not user.check_password(ns.payload['password']):
+        try:
+            valid_password = user is not None and user.check_password(ns.payload['password'])
+        except PasswordHasherBusy as e:
+            msg = str(e)
+            current_app.logger.error(msg)
+            return {'message': msg}, 503, {'Retry-After': '1'}
+        if not valid_password:
             msg = 'invalid username or password'
             current_app.logger.error(msg)
             return {'message': msg}, 401
@@ -97,3 +114,39 @@ class TokenRefresh(Resource):
         new_access_token = create_access_token(identity=current_user)
         current_app.logger.info('token refreshed')
         return {'access_token': new_access_token}, 200
+
+
+@ns.route("/logout")
+class UserLogout(Resource):
+    """
+    Class implementing the UserLogout resource.
+    """
+
+    @jwt_required(verify_type=False)
+    @ns.expect(logout_model)
+    @ns.doc(security="jsonWebToken")
+    def post(self) -> (Response, int):
+        """
+        Logout: revoke the token of the request (access or refresh) and, if given, the refresh token of the same user.
+        Revoked tokens are rejected until they expire.
+
+        :return: message, status_code
+        """
+        revoked = [get_jwt()]
+        refresh_token = (request.get_json(silent=True) or {}).get('refresh_token')
+        if refresh_token:
+            try:
+                claims = decode_token(refresh_token)
+            except (PyJWTError, JWTExtendedException) as e:
+                msg = f'invalid refresh token: {e}'
+                current_app.logger.error(msg)
+                return {'message': msg}, 400
+            if claims.get('type') != 'refresh' or claims.get('sub') != get_jwt_identity():
+                msg = 'invalid refresh token: not a refresh token of the current user'
+                current_app.logger.error(msg)
+                return {'message': msg}, 400
+            revoked.append(claims)
+        for claims in revoked:
+            token_blocklist.revoke(claims)
+        current_app.logger.info('successful logout')
+        return {'message': 'logged out'}, 200
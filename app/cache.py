@@ -0,0 +1,371 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from collections import OrderedDict
+from flask import Flask, current_app, has_app_context
+
+# Invalidations are counted in this many slots, each one shared by the keys with the same hash modulo the number of
+# slots: a set conditioned on the generation of a key is also refused after the invalidation of another key of its slot.
+GENERATION_SLOTS = 1024
+
+
+class MemoryCacheBackend:
+    """
+    LRU cache with TTL, local to the process.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expires_at), least recently used first
+        self._generations = [0] * GENERATION_SLOTS  # invalidations of the keys of each slot
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _slot(key) -> int:
+        return hash(str(key)) % GENERATION_SLOTS
+
+    def generation(self, key) -> int:
+        """
+        Get the generation of a key, which changes every time the key is invalidated.
+
+        :param key: key
+        :return: generation
+        """
+        return self._generations[self._slot(key)]
+
+    def get(self, key):
+        """
+        Get a value from the cache.
+
+        :param key: key
+        :return: value if the key exists and it is not expired, None otherwise
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl: float = None, generation: int = None) -> bool:
+        """
+        Add a value to the cache, evicting the least recently used entry if the cache is full.
+
+        :param key: key
+        :param value: value
+        :param ttl: time to live in seconds, default ttl if None
+        :param generation: if specified, the value is only added if the key has not been invalidated since generation
+            was returned by the generation method
+        :return: True if the value is added
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and self._generations[self._slot(key)] != generation:
+                return False
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return True
+
+    def delete(self, key) -> None:
+        """
+        Remove a key from the cache.
+
+        :param key: key
+        :return: None
+        """
+        with self._lock:
+            self._generations[self._slot(key)] += 1
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Remove all the keys from the cache.
+
+        :return: None
+        """
+        with self._lock:
+            self._generations = [generation + 1 for generation in self._generations]
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    LRU cache with TTL stored in a SQLite file, so that it is shared by all the worker processes of the host.
+    Values must be JSON serializable.
+    """
+
+    def __init__(self, path: str, max_size: int, ttl: float):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._local = threading.local()  # sqlite3 connections cannot be shared among threads
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS generation (slot INTEGER PRIMARY KEY, generation INTEGER NOT NULL)'
+            )
+            connection.execute(
+                'INSERT OR IGNORE INTO generation (slot, generation) '
+                'WITH RECURSIVE slots(slot) AS (SELECT 0 UNION ALL SELECT slot + 1 FROM slots WHERE slot + 1 < ?) '
+                'SELECT slot, 0 FROM slots', (GENERATION_SLOTS,)
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _slot(key) -> int:
+        # not hash(): it differs among processes
+        return zlib.crc32(str(key).encode()) % GENERATION_SLOTS
+
+    def generation(self, key) -> int:
+        """
+        Get the generation of a key, which changes every time the key is invalidated by any process.
+
+        :param key: key
+        :return: generation
+        """
+        return self._connection().execute(
+            'SELECT generation FROM generation WHERE slot = ?', (self._slot(key),)
+        ).fetchone()[0]
+
+    def get(self, key):
+        """
+        Get a value from the cache.
+
+        :param key: key
+        :return: value if the key exists and it is not expired, None otherwise
+        """
+        now = time.time()
+        connection = self._connection()
+        row = connection.execute(
+            'UPDATE cache SET accessed_at = ? WHERE key = ? AND expires_at > ? RETURNING value', (now, str(key), now)
+        ).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value, ttl: float = None, generation: int = None) -> bool:
+        """
+        Add a value to the cache, evicting the least recently used entries if the cache is full.
+
+        :param key: key
+        :param value: JSON serializable value
+        :param ttl: time to live in seconds, default ttl if None
+        :param generation: if specified, the value is only added if the key has not been invalidated since generation
+            was returned by the generation method
+        :return: True if the value is added
+        """
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        connection = self._connection()
+        # the generation is checked by the statement adding the value, so no invalidation can happen in between
+        cursor = connection.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) SELECT ?, ?, ?, ? '
+            'WHERE ? IS NULL OR (SELECT generation FROM generation WHERE slot = ?) = ?',
+            (str(key), json.dumps(value), expires_at, now, generation, self._slot(key), generation)
+        )
+        if cursor.rowcount == 0:
+            return False
+        (size,) = connection.execute('SELECT count(*) FROM cache').fetchone()
+        if size > self.max_size:
+            connection.execute('DELETE FROM cache WHERE expires_at <= ?', (now,))
+            connection.execute(
+                'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT '
+                '(SELECT max(count(*) - ?, 0) FROM cache))', (self.max_size,)
+            )
+        return True
+
+    def delete(self, key) -> None:
+        """
+        Remove a key from the cache.
+
+        :param key: key
+        :return: None
+        """
+        connection = self._connection()
+        # the generation changes first: a value read before the invalidation can no longer be added once it is removed
+        connection.execute('UPDATE generation SET generation = generation + 1 WHERE slot = ?', (self._slot(key),))
+        connection.execute('DELETE FROM cache WHERE key = ?', (str(key),))
+
+    def clear(self) -> None:
+        """
+        Remove all the keys from the cache.
+
+        :return: None
+        """
+        connection = self._connection()
+        connection.execute('UPDATE generation SET generation = generation + 1')
+        connection.execute('DELETE FROM cache')
+
+    def __len__(self):
+        return self._connection().execute('SELECT count(*) FROM cache').fetchone()[0]
+
+
+class CacheState:
+    """
+    Backend and hit/miss counters of a Cache bound to an app.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+
+class Cache:
+    """
+    Read-through cache extension. It is configured by the app config keys starting with prefix:
+
+    - <prefix>_ENABLED: enable the cache
+    - <prefix>_BACKEND: 'memory' (local to the process) or 'sqlite' (shared by the processes of the host)
+    - <prefix>_MAX_SIZE: maximum number of entries
+    - <prefix>_TTL: default time to live of the entries, in seconds
+    - <prefix>_PATH: path of the sqlite backend file, <instance_path>/<prefix>.db if None
+
+    When the cache is disabled or it is not bound to the current app, every lookup is a miss.
+    """
+
+    BACKENDS = ('memory', 'sqlite')
+
+    def __init__(self, prefix: str, app: Flask = None):
+        self.prefix = prefix
+        if app is not None:
+            self.init_app(app)
+
+    def _config(self, app: Flask, key: str, default=None):
+        return app.config.get(f'{self.prefix}_{key}', default)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Bind the cache to an app.
+
+        :param app: app
+        :return: None
+        """
+        if not self._config(app, 'ENABLED', False):
+            return
+        backend = self._config(app, 'BACKEND', 'memory')
+        max_size = self._config(app, 'MAX_SIZE', 1024)
+        ttl = self._config(app, 'TTL', 60)
+        if backend == 'memory':
+            state = CacheState(MemoryCacheBackend(max_size, ttl))
+        elif backend == 'sqlite':
+            path = self._config(app, 'PATH') or os.path.join(app.instance_path, f'{self.prefix.lower()}.db')
+            state = CacheState(SQLiteCacheBackend(path, max_size, ttl))
+        else:
+            raise ValueError(f'{self.prefix}_BACKEND must be one of {self.BACKENDS}, got {backend}')
+        app.extensions[self.prefix.lower()] = state
+
+    @property
+    def _state(self) -> CacheState:
+        if not has_app_context():
+            return None
+        return current_app.extensions.get(self.prefix.lower())
+
+    def backend(self, app) -> MemoryCacheBackend | SQLiteCacheBackend:
+        """
+        Get the backend bound to an app. Unlike the other methods, it does not need a Flask app context, e.g. to
+        invalidate keys from the async app.
+
+        :param app: app
+        :return: backend, None if the cache is disabled
+        """
+        state = app.extensions.get(self.prefix.lower())
+        return None if state is None else state.backend
+
+    def get(self, key):
+        """
+        Get a value from the cache.
+
+        :param key: key
+        :return: value if the key is cached, None otherwise
+        """
+        state = self._state
+        if state is None:
+            return None
+        value = state.backend.get(key)
+        if value is None:
+            state.misses += 1
+        else:
+            state.hits += 1
+        return value
+
+    def generation(self, key) -> int:
+        """
+        Get the generation of a key, to be read before the value that is added to the cache on a miss: see set.
+
+        :param key: key
+        :return: generation, None if the cache is disabled
+        """
+        state = self._state
+        return None if state is None else state.backend.generation(key)
+
+    def set(self, key, value, ttl: float = None, generation: int = None) -> bool:
+        """
+        Add a value to the cache. A value read on a miss must be added with the generation of the key read before
+        it: if the key is invalidated meanwhile, e.g. because the value has been updated in the db, the value may be
+        stale and it is not added.
+
+        :param key: key
+        :param value: value, it must be JSON serializable
+        :param ttl: time to live in seconds, default ttl if None
+        :param generation: generation of the key, None to add the value unconditionally
+        :return: True if the value is added
+        """
+        state = self._state
+        return state is not None and state.backend.set(key, value, ttl, generation)
+
+    def delete(self, key) -> None:
+        """
+        Invalidate a key.
+
+        :param key: key
+        :return: None
+        """
+        state = self._state
+        if state is not None:
+            state.backend.delete(key)
+
+    def clear(self) -> None:
+        """
+        Invalidate all the keys.
+
+        :return: None
+        """
+        state = self._state
+        if state is not None:
+            state.backend.clear()
+
+    def stats(self) -> dict:
+        """
+        Get the cache counters. Hits and misses are counted by each process.
+
+        :return: dict with enabled, hits, misses and size
+        """
+        state = self._state
+        if state is None:
+            return {'enabled': False, 'hits': 0, 'misses': 0, 'size': 0}
+        return {'enabled': True, 'hits': state.hits, 'misses': state.misses, 'size': len(state.backend)}
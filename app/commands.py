@@ -0,0 +1,19 @@
+import click
+
+from flask.cli import with_appcontext
+
+
+@click.command('rebuild-task-stats')
+@with_appcontext
+def rebuild_task_stats_command():
+    """
+    Recompute the task counts of task_stats from the task table.
+
+    The counts are maintained by triggers on every write, so a rebuild is only needed to repair a drift, e.g. after
+    writes made while the triggers were missing. The counts that changed are printed.
+    """
+    from app.repositories.task_repository import TaskRepository
+    changes = TaskRepository.rebuild_task_stats()
+    for priority, (previous, current) in changes.items():
+        click.echo(f'priority {priority}: {previous} -> {current}')
+    click.echo(f'task stats rebuilt, {len(changes)} counts repaired')
@@ -0,0 +1,134 @@
+import atexit
+import asyncio
+import functools
+import threading
+
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from multiprocessing import get_context
+from flask import Flask, current_app, has_app_context
+
+
+class PasswordHasherBusy(Exception):
+    """
+    Raised when the password hashing queue is full or a password is not hashed in time.
+    """
+
+
+class HasherState:
+    """
+    Process pool and queue of a PasswordHasher bound to an app. The pool is started on first use.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float, mp_context: str):
+        self.workers = workers
+        self.timeout = timeout
+        self.mp_context = mp_context
+        self.slots = threading.BoundedSemaphore(workers + queue_size)  # running + queued jobs
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=get_context(self.mp_context))
+                atexit.register(self._executor.shutdown, wait=False, cancel_futures=True)
+            return self._executor
+
+
+class PasswordHasher:
+    """
+    Extension running password hashing functions on a bounded process pool, so that CPU heavy hashes do not hold
+    the request serving threads. It is configured by:
+
+    - PASSWORD_HASH_METHOD: method (and cost) passed to werkzeug generate_password_hash, e.g. 'scrypt:32768:8:1'
+    - PASSWORD_HASH_WORKERS: number of worker processes, 0 to hash on the calling thread
+    - PASSWORD_HASH_QUEUE_SIZE: number of jobs waiting for a worker, further jobs raise PasswordHasherBusy
+    - PASSWORD_HASH_TIMEOUT: maximum time in seconds to wait for a job
+    - PASSWORD_HASH_MP_CONTEXT: multiprocessing start method of the workers
+
+    Outside of an app context, or when no worker is configured, functions are called on the calling thread.
+    """
+
+    def __init__(self, app: Flask = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Bind the hasher to an app.
+
+        :param app: app
+        :return: None
+        """
+        workers = app.config.get('PASSWORD_HASH_WORKERS', 0)
+        if not workers:
+            app.extensions['password_hasher'] = None
+            return
+        app.extensions['password_hasher'] = HasherState(
+            workers,
+            app.config.get('PASSWORD_HASH_QUEUE_SIZE', 0),
+            app.config.get('PASSWORD_HASH_TIMEOUT', 10),
+            app.config.get('PASSWORD_HASH_MP_CONTEXT', 'spawn')
+        )
+
+    def options(self, app: Flask = None) -> dict:
+        """
+        Get the keyword arguments for generate_password_hash configured for an app.
+
+        :param app: app, the current app if None
+        :return: dict with the hash method, empty if not configured
+        """
+        if app is None:
+            app = current_app if has_app_context() else None
+        if app is None or not app.config.get('PASSWORD_HASH_METHOD'):
+            return {}
+        return {'method': app.config['PASSWORD_HASH_METHOD']}
+
+    @staticmethod
+    def _submit(state: HasherState, func, *args, **kwargs) -> Future:
+        if not state.slots.acquire(blocking=False):
+            raise PasswordHasherBusy('too many password hashing requests')
+        try:
+            future = state.executor.submit(func, *args, **kwargs)
+        except BaseException:
+            state.slots.release()
+            raise
+        future.add_done_callback(lambda _: state.slots.release())
+        return future
+
+    def run(self, func, *args, **kwargs):
+        """
+        Call a hashing function on the process pool and wait for its result.
+
+        :param func: picklable function, e.g. werkzeug generate_password_hash or check_password_hash
+        :return: result of func(*args, **kwargs)
+        :raise PasswordHasherBusy: if the queue is full or the result is not ready within the timeout
+        """
+        state = current_app.extensions.get('password_hasher') if has_app_context() else None
+        if state is None:
+            return func(*args, **kwargs)
+        future = self._submit(state, func, *args, **kwargs)
+        try:
+            return future.result(timeout=state.timeout)
+        except TimeoutError:
+            raise PasswordHasherBusy('password hashing timed out')
+
+    async def run_async(self, app, func, *args, **kwargs):
+        """
+        Call a hashing function on the process pool of an app served on an asyncio loop, which keeps serving other
+        requests meanwhile. When no worker is configured, func is called on the default executor of the loop.
+
+        :param app: app the hasher is bound to
+        :param func: picklable function, e.g. werkzeug generate_password_hash or check_password_hash
+        :return: result of func(*args, **kwargs)
+        :raise PasswordHasherBusy: if the queue is full or the result is not ready within the timeout
+        """
+        state = app.extensions.get('password_hasher')
+        if state is None:
+            return await asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+        future = self._submit(state, func, *args, **kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), state.timeout)
+        except asyncio.TimeoutError:
+            raise PasswordHasherBusy('password hashing timed out')
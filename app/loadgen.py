@@ -0,0 +1,410 @@
+import json
+import random
+import threading
+import time
+import click
+import http.client
+
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+OPERATIONS = ('list', 'get', 'create', 'update', 'delete')
+DEFAULT_MIX = 'list=30,get=40,create=15,update=10,delete=5'
+CONNECTION_ERROR = 0  # status recorded for the requests failed without a response (connection refused, timeout...)
+
+
+def parse_mix(mix: str) -> dict:
+    """
+    Parse a traffic mix such as 'get=60,create=30,delete=10' into operation weights.
+
+    :param mix: comma separated operation=weight pairs
+    :return: operation -> weight
+    :raise ValueError: if an operation is unknown or a weight is not a non-negative number
+    """
+    weights = {}
+    for item in mix.split(','):
+        operation, _, weight = item.partition('=')
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise ValueError(f'unknown operation {operation}, expected one of {", ".join(OPERATIONS)}')
+        weights[operation] = float(weight)
+        if weights[operation] < 0:
+            raise ValueError(f'negative weight for {operation}')
+    if not sum(weights.values()):
+        raise ValueError('the mix has no operations')
+    return weights
+
+
+def retry_delay(retry_after: str, attempt: int) -> float:
+    """
+    Time to wait before retrying a request rejected by the rate limiter.
+
+    :param retry_after: Retry-After header of the 429 response, None if missing
+    :param attempt: number of 429 responses received so far for the request, starting from 1
+    :return: seconds, Retry-After if it is a number of seconds, otherwise an exponential backoff with jitter
+    """
+    try:
+        return max(float(retry_after), 0.0)
+    except (TypeError, ValueError):
+        return min(0.1 * 2 ** (attempt - 1), 5.0) * random.uniform(0.5, 1.0)
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile of values.
+    """
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def count_errors(statuses: Counter) -> int:
+    """
+    Number of failed requests: answered with an error other than 429, or without a response.
+    """
+    return sum(count for status, count in statuses.items()
+               if status == CONNECTION_ERROR or (status >= 400 and status != 429))
+
+
+class LoadStats:
+    """
+    Thread-safe latencies and status codes of the requests sent by the load generator, by operation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.latencies = defaultdict(list)  # operation -> seconds
+        self.statuses = defaultdict(Counter)  # operation -> status code -> count
+        self._interval_start = self.start
+        self._interval_latencies = []
+        self._interval_statuses = Counter()
+
+    def record(self, operation: str, status: int, latency: float) -> None:
+        with self._lock:
+            self.latencies[operation].append(latency)
+            self.statuses[operation][status] += 1
+            self._interval_latencies.append(latency)
+            self._interval_statuses[status] += 1
+
+    def interval(self) -> dict:
+        """
+        Get the stats of the requests sent since the previous call and start a new interval.
+
+        :return: stats of the interval
+        """
+        with self._lock:
+            now = time.perf_counter()
+            latencies, statuses = self._interval_latencies, self._interval_statuses
+            elapsed = now - self._interval_start
+            self._interval_start, self._interval_latencies, self._interval_statuses = now, [], Counter()
+        return {
+            'elapsed': now - self.start,
+            'requests': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'errors': count_errors(statuses),
+            'throttled': statuses[429],
+        }
+
+    def summary(self) -> list[dict]:
+        """
+        Get the stats of all the requests, by operation.
+
+        :return: stats of each operation, followed by the total
+        """
+        with self._lock:
+            elapsed = time.perf_counter() - self.start
+            rows = [(operation, self.latencies[operation], self.statuses[operation])
+                    for operation in sorted(self.latencies)]
+            rows.append(('total', [latency for _, latencies, _ in rows for latency in latencies],
+                         sum((statuses for _, _, statuses in rows), Counter())))
+        return [{
+            'operation': operation,
+            'requests': len(latencies),
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50_ms': percentile(latencies, 50) * 1000,
+            'p95_ms': percentile(latencies, 95) * 1000,
+            'p99_ms': percentile(latencies, 99) * 1000,
+            'max_ms': max(latencies, default=float('nan')) * 1000,
+            'errors': count_errors(statuses),
+            'throttled': statuses[429],
+        } for operation, latencies, statuses in rows]
+
+
+class ApiClient:
+    """
+    HTTP client of one load generator thread. It keeps a persistent connection to the server.
+    """
+
+    def __init__(self, url: str, timeout: float = 30):
+        parts = urlsplit(url)
+        self.prefix = parts.path.rstrip('/')
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout)
+
+    def request(self, method: str, path: str, body: dict = None, token: str = None) -> (int, dict, object):
+        """
+        Send a request, reconnecting once if the server closed the connection.
+
+        :return: status code, headers, decoded JSON body (None if the body is not JSON)
+        """
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        for attempt in range(2):
+            try:
+                self.connection.request(method, self.prefix + path, body=data, headers=headers)
+                response = self.connection.getresponse()
+                content = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                if attempt:
+                    raise
+        try:
+            payload = json.loads(content) if content else None
+        except ValueError:
+            payload = None
+        return response.status, dict(response.headers), payload
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class UserSession:
+    """
+    Credentials and tokens of a user of the pool, shared by the threads acting as that user.
+    """
+
+    def __init__(self, username: str, password: str):
+        self.username = username
+        self.password = password
+        self.access_token = None
+        self.refresh_token = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _request(client: ApiClient, method: str, path: str, body: dict = None, token: str = None,
+                 max_retries: int = 10) -> (int, object):
+        for attempt in range(1, max_retries + 1):
+            status, headers, payload = client.request(method, path, body, token)
+            if status != 429:
+                break
+            time.sleep(retry_delay(headers.get('Retry-After'), attempt))
+        return status, payload
+
+    def login(self, client: ApiClient) -> None:
+        """
+        Register the user, if it does not exist yet, and get a new pair of tokens.
+
+        :raise RuntimeError: if the user cannot log in
+        """
+        credentials = {'username': self.username, 'password': self.password}
+        self._request(client, 'POST', '/register', credentials)  # 400 if the user already exists
+        status, payload = self._request(client, 'POST', '/login', credentials)
+        if status != 200:
+            raise RuntimeError(f'login of {self.username} failed with status {status}')
+        self.access_token, self.refresh_token = payload['access_token'], payload['refresh_token']
+
+    def renew(self, client: ApiClient, rejected_token: str) -> None:
+        """
+        Get a new access token through /refresh after rejected_token was refused, logging in again if the refresh
+        token is not valid anymore. Only one thread renews the token, the others reuse the new one.
+        """
+        with self._lock:
+            if self.access_token != rejected_token:
+                return
+            status, payload = self._request(client, 'POST', '/refresh', token=self.refresh_token)
+            if status == 200:
+                self.access_token = payload['access_token']
+            else:
+                self.login(client)
+
+
+class LoadGenerator:
+    """
+    Drive a mix of task requests against a running instance of the API from concurrent threads.
+    """
+
+    def __init__(self, url: str, users: int, threads: int, mix: dict, duration: float = None, requests: int = None,
+                 page_size: int = 100, max_retries: int = 5, password: str = 'Loadgen123#'):
+        self.url = url.rstrip('/')
+        self.sessions = [UserSession(f'loadgen_user{i}', password) for i in range(users)]
+        self.threads = threads
+        self.operations, self.weights = zip(*mix.items())
+        self.duration = duration
+        self.requests = requests
+        self.page_size = page_size
+        self.max_retries = max_retries
+        self.stats = LoadStats()
+        self.task_ids = []  # ids of existing tasks, targets of get, update and delete
+        self.deleted_ids = set()  # never added back to task_ids by a list response sent before the delete
+        self._lock = threading.Lock()
+        self._sent = 0
+        self._stop = threading.Event()
+
+    def login(self) -> None:
+        """
+        Register and log in the users of the pool.
+        """
+        client = ApiClient(self.url)
+        try:
+            for session in self.sessions:
+                session.login(client)
+        finally:
+            client.close()
+
+    def run(self, report=None, interval: float = 1.0) -> LoadStats:
+        """
+        Send the requests until the duration elapses or the number of requests is reached.
+
+        :param report: called with the stats of each interval while the load is running, if given
+        :param interval: seconds between two reports
+        :return: stats
+        """
+        self.login()
+        self.stats = LoadStats()
+        workers = [threading.Thread(target=self._worker, args=(i,), daemon=True) for i in range(self.threads)]
+        for worker in workers:
+            worker.start()
+        deadline = None if self.duration is None else time.monotonic() + self.duration
+        next_report = time.monotonic() + interval
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(0.05)
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                self._stop.set()
+            if report is not None and now >= next_report:
+                report(self.stats.interval())
+                next_report = now + interval
+        return self.stats
+
+    def _next_request(self) -> bool:
+        with self._lock:
+            if self._stop.is_set() or (self.requests is not None and self._sent >= self.requests):
+                return False
+            self._sent += 1
+            return True
+
+    def _pick_task_id(self, remove: bool = False) -> int:
+        with self._lock:
+            if not self.task_ids:
+                return None
+            i = random.randrange(len(self.task_ids))
+            if remove:
+                self.task_ids[i], self.task_ids[-1] = self.task_ids[-1], self.task_ids[i]
+                self.deleted_ids.add(self.task_ids[-1])
+                return self.task_ids.pop()
+            return self.task_ids[i]
+
+    def _worker(self, n: int) -> None:
+        client = ApiClient(self.url)
+        session = self.sessions[n % len(self.sessions)]
+        try:
+            while self._next_request():
+                operation = random.choices(self.operations, self.weights)[0]
+                self._call(client, session, operation)
+        finally:
+            client.close()
+
+    def _call(self, client: ApiClient, session: UserSession, operation: str) -> None:
+        """
+        Send one request of the given operation, renewing the access token on 401 and waiting on 429.
+        A request failed without a response is recorded as a CONNECTION_ERROR, the next one opens a new connection.
+        """
+        task_id = None
+        if operation in ('get', 'update', 'delete'):
+            task_id = self._pick_task_id(remove=operation == 'delete')
+            if task_id is None:
+                operation = 'create'  # nothing to read or modify yet
+        method, path, body = {
+            'list': ('GET', f'/tasks?limit={self.page_size}', None),
+            'get': ('GET', f'/tasks/{task_id}', None),
+            'create': ('POST', '/tasks', {'name': 'loadgen task', 'priority': random.randint(1, 5)}),
+            'update': ('PUT', f'/tasks/{task_id}', {'name': 'loadgen task updated', 'priority': random.randint(1, 5)}),
+            'delete': ('DELETE', f'/tasks/{task_id}', None),
+        }[operation]
+        throttled = 0
+        renewed = False
+        while True:
+            token = session.access_token
+            start = time.perf_counter()
+            try:
+                status, headers, payload = client.request(method, path, body, token)
+            except (OSError, http.client.HTTPException):
+                self.stats.record(operation, CONNECTION_ERROR, time.perf_counter() - start)
+                client.close()
+                return
+            self.stats.record(operation, status, time.perf_counter() - start)
+            if status == 401 and not renewed:
+                try:
+                    session.renew(client, token)
+                except (OSError, http.client.HTTPException, RuntimeError):
+                    client.close()
+                    break
+                renewed = True
+            elif status == 429 and throttled < self.max_retries and not self._stop.is_set():
+                throttled += 1
+                time.sleep(retry_delay(headers.get('Retry-After'), throttled))
+            else:
+                break
+        with self._lock:
+            if operation == 'create' and status == 201:
+                self.task_ids.append(payload['id'])
+            elif operation in ('get', 'update') and status == 404 and task_id in self.task_ids:
+                self.task_ids.remove(task_id)  # deleted by another thread
+            elif operation == 'list' and status == 200 and len(self.task_ids) < 10000:
+                known = self.deleted_ids.union(self.task_ids)
+                self.task_ids += [task['id'] for task in payload if task['id'] not in known]
+
+
+def format_stats(stats: dict) -> str:
+    return (f'{stats["operation"]:>10} {stats["requests"]:>9} {stats["throughput"]:>9.1f} {stats["p50_ms"]:>8.1f} '
+            f'{stats["p95_ms"]:>8.1f} {stats["p99_ms"]:>8.1f} {stats["max_ms"]:>8.1f} {stats["errors"]:>7} '
+            f'{stats["throttled"]:>7}')
+
+
+@click.command('loadgen')
+@click.option('--url', default='http://127.0.0.1:5000/api', show_default=True, help='base url of the API')
+@click.option('--users', default=10, show_default=True, help='users registered and logged in')
+@click.option('--threads', default=32, show_default=True, help='concurrent connections')
+@click.option('--mix', default=DEFAULT_MIX, show_default=True, help='weights of the task operations')
+@click.option('--duration', type=float, default=None, help='seconds of load [default: 30 if --requests is not set]')
+@click.option('--requests', type=int, default=None, help='total number of requests')
+@click.option('--page-size', default=100, show_default=True, help='limit of the list requests')
+@click.option('--max-retries', default=5, show_default=True, help='retries of a request answered with 429')
+@click.option('--interval', default=1.0, show_default=True, help='seconds between two live reports')
+def loadgen_command(url, users, threads, mix, duration, requests, page_size, max_retries, interval):
+    """
+    Generate load against a running instance of the API.
+
+    A pool of users is registered and logged in, then concurrent threads send a weighted mix of task reads, writes
+    and deletes. Expired access tokens are renewed through /refresh and requests rejected by the rate limiter (429)
+    are retried after Retry-After or an exponential backoff. Live stats are printed every interval, final stats by
+    operation at the end.
+    """
+    try:
+        weights = parse_mix(mix)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--mix')
+    if duration is None and requests is None:
+        duration = 30
+    generator = LoadGenerator(url, users, threads, weights, duration, requests, page_size, max_retries)
+
+    def report(stats):
+        click.echo(f'[{stats["elapsed"]:6.1f} s] {stats["throughput"]:8.1f} req/s  p50 {stats["p50_ms"]:7.1f} ms  '
+                   f'p95 {stats["p95_ms"]:7.1f} ms  errors {stats["errors"]}  429 {stats["throttled"]}')
+
+    try:
+        stats = generator.run(report, interval)
+    except (RuntimeError, OSError) as e:
+        raise click.ClickException(str(e))
+    click.echo(f'\n{"operation":>10} {"requests":>9} {"req/s":>9} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} '
+               f'{"max ms":>8} {"errors":>7} {"429":>7}')
+    for row in stats.summary():
+        click.echo(format_stats(row))
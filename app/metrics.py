@@ -0,0 +1,277 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from collections import defaultdict
+from flask import Flask, Response, current_app, g, request
+
+# name -> (type, help)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests by endpoint, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Request latency by endpoint and method.'),
+    'http_requests_in_progress': ('gauge', 'Requests being served.'),
+    'http_rate_limited_total': ('counter', 'Requests rejected by the rate limiter by endpoint.'),
+    'db_queries_total': ('counter', 'SQL statements executed by endpoint.'),
+    'db_query_duration_seconds_total': ('counter', 'Time spent executing SQL statements by endpoint.'),
+    'http_request_db_queries': ('histogram', 'SQL statements executed per request by endpoint.'),
+    'task_cache_hits_total': ('counter', 'Task cache hits.'),
+    'task_cache_misses_total': ('counter', 'Task cache misses.'),
+    'task_cache_size': ('gauge', 'Entries in the task cache.'),
+}
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process store of counters, gauges and histograms. Samples are keyed by metric name and labels.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(float)  # (name, labels) -> value
+        self.gauges = defaultdict(float)  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> (buckets, [count per bucket..., +Inf count], [sum])
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        with self._lock:
+            self.counters[(name, labels)] += value
+
+    def add(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        with self._lock:
+            self.gauges[(name, labels)] += value
+
+    def set(self, name: str, labels: tuple = (), value: float = 0) -> None:
+        with self._lock:
+            self.gauges[(name, labels)] = value
+
+    def observe(self, name: str, labels: tuple, value: float, buckets: tuple) -> None:
+        with self._lock:
+            histogram = self.histograms.get((name, labels))
+            if histogram is None:
+                histogram = self.histograms[(name, labels)] = (buckets, [0] * (len(buckets) + 1), [0.0])
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][i] += 1
+                    break
+            else:
+                histogram[1][-1] += 1
+            histogram[2][0] += value
+
+    def snapshot(self) -> dict:
+        """
+        Get a JSON serializable copy of the samples.
+
+        :return: snapshot
+        """
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in self.counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in self.gauges.items()],
+                'histograms': [[name, labels, list(buckets), list(counts), total[0]]
+                               for (name, labels), (buckets, counts, total) in self.histograms.items()],
+            }
+
+
+def merge_snapshots(snapshots: list[dict]) -> dict:
+    """
+    Sum the samples of several snapshots, e.g. taken by different worker processes.
+
+    :param snapshots: snapshots
+    :return: (name, labels) -> value dicts of counters and gauges, (name, labels) -> [buckets, counts, sum] dict of
+             histograms
+    """
+    counters, gauges, histograms = defaultdict(float), defaultdict(float), {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, value in snapshot['gauges']:
+            gauges[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, buckets, counts, total in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key not in histograms:
+                histograms[key] = [tuple(buckets), [0] * len(counts), 0.0]
+            for i, count in enumerate(counts):
+                histograms[key][1][i] += count
+            histograms[key][2] += total
+    return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+
+def format_labels(labels: tuple, extra: tuple = ()) -> str:
+    labels = tuple(labels) + extra
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + '}'
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def to_prometheus(merged: dict) -> str:
+    """
+    Render merged samples in the Prometheus text exposition format.
+
+    :param merged: samples, as returned by merge_snapshots
+    :return: text
+    """
+    samples = defaultdict(list)
+    for kind in ('counters', 'gauges'):
+        for (name, labels), value in sorted(merged[kind].items()):
+            samples[name].append(f'{name}{format_labels(labels)} {format_value(value)}')
+    for (name, labels), (buckets, counts, total) in sorted(merged['histograms'].items()):
+        cumulative = 0
+        for bound, count in zip((*buckets, '+Inf'), counts):
+            cumulative += count
+            le = bound if bound == '+Inf' else format_value(bound)
+            samples[name].append(f'{name}_bucket{format_labels(labels, (("le", le),))} {cumulative}')
+        samples[name].append(f'{name}_sum{format_labels(labels)} {format_value(total)}')
+        samples[name].append(f'{name}_count{format_labels(labels)} {cumulative}')
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if samples.get(name):
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', *samples[name]]
+    return '\n'.join(lines) + '\n'
+
+
+class Metrics:
+    """
+    Extension collecting request, db, cache and rate limiter metrics and serving them at /metrics in the Prometheus
+    text format. The SQL statements of each request are taken from the query profiler: the db metrics are only
+    collected if SQL_PROFILER_ENABLED is set too. It is configured by:
+
+    - METRICS_ENABLED: enable the extension
+    - METRICS_MULTIPROCESS_DIR: directory where each worker process periodically writes its samples, so that
+      /metrics aggregates all the workers of the host. None for a single process
+    - METRICS_FLUSH_INTERVAL: minimum time in seconds between two writes of the samples of a process
+    """
+
+    def __init__(self, app: Flask = None):
+        self.registry = MetricsRegistry()
+        self._last_flush = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the hooks collecting the metrics and the /metrics endpoint.
+
+        :param app: app
+        :return: None
+        """
+        if not app.config.get('METRICS_ENABLED', False):
+            return
+        if not app.config.get('SQL_PROFILER_ENABLED', False):
+            app.logger.warning('SQL_PROFILER_ENABLED is not set, the db metrics are not collected')
+        from app import limiter
+        directory = app.config.get('METRICS_MULTIPROCESS_DIR')
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            atexit.register(self.flush, directory)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self.view)
+        limiter.exempt(self.view)
+
+    @staticmethod
+    def _endpoint() -> str:
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _before_request(self) -> None:
+        g.metrics_start = time.perf_counter()
+        self.registry.add('http_requests_in_progress')
+
+    def _after_request(self, response: Response) -> Response:
+        if 'metrics_start' not in g:
+            return response
+        endpoint = self._endpoint()
+        labels = (('endpoint', endpoint), ('method', request.method))
+        self.registry.inc('http_requests_total', labels + (('status', str(response.status_code)),))
+        self.registry.observe('http_request_duration_seconds', labels, time.perf_counter() - g.metrics_start,
+                              LATENCY_BUCKETS)
+        if current_app.config.get('SQL_PROFILER_ENABLED', False):  # otherwise no statement is recorded: not 0
+            from app import query_profiler
+            queries = query_profiler.queries()
+            self.registry.observe('http_request_db_queries', labels, len(queries), QUERY_BUCKETS)
+            self.registry.inc('db_queries_total', (('endpoint', endpoint),), len(queries))
+            self.registry.inc('db_query_duration_seconds_total', (('endpoint', endpoint),),
+                              sum(query.duration for query in queries))
+        if response.status_code == 429:
+            self.registry.inc('http_rate_limited_total', (('endpoint', endpoint),))
+        return response
+
+    def _teardown_request(self, exc) -> None:
+        if g.pop('metrics_start', None) is not None:
+            self.registry.add('http_requests_in_progress', value=-1)
+        directory = current_app.config.get('METRICS_MULTIPROCESS_DIR')
+        if directory and time.monotonic() - self._last_flush >= current_app.config.get('METRICS_FLUSH_INTERVAL', 5):
+            self.flush(directory)
+
+    def _process_snapshot(self) -> dict:
+        from app import task_cache
+        stats = task_cache.stats()
+        snapshot = self.registry.snapshot()
+        snapshot['counters'] += [['task_cache_hits_total', [], stats['hits']],
+                                 ['task_cache_misses_total', [], stats['misses']]]
+        snapshot['gauges'].append(['task_cache_size', [], stats['size']])
+        return snapshot
+
+    def flush(self, directory: str) -> None:
+        """
+        Write the samples of this process to the multiprocess directory.
+
+        :param directory: multiprocess directory
+        :return: None
+        """
+        self._last_flush = time.monotonic()
+        path = os.path.join(directory, f'metrics_{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self._process_snapshot(), f)
+        os.replace(f'{path}.tmp', path)  # readers never see a partially written file
+
+    def collect(self) -> dict:
+        """
+        Collect the samples of this process and, in multiprocess mode, of the other worker processes.
+        Gauges of the processes that are not running anymore are discarded, their counters are kept.
+
+        :return: merged samples
+        """
+        snapshots = [self._process_snapshot()]
+        directory = current_app.config.get('METRICS_MULTIPROCESS_DIR')
+        if directory:
+            for path in glob.glob(os.path.join(directory, 'metrics_*.json')):
+                pid = int(os.path.basename(path)[len('metrics_'):-len('.json')])
+                if pid == os.getpid():
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if not process_exists(pid):
+                    snapshot['gauges'] = []
+                snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def view(self) -> Response:
+        """
+        Get the metrics in the Prometheus text format.
+
+        :return: response
+        """
+        return Response(to_prometheus(self.collect()), mimetype='text/plain; version=0.0.4')
+
+
+def process_exists(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
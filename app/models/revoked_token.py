@@ -0,0 +1,24 @@
+from app import db
+from app.models.base import BaseModel
+
+
+class RevokedToken(BaseModel):
+    """
+    RevokedToken model. It inherits from BaseModel.
+    A revoked token is kept until it expires, after that it is rejected anyway.
+    """
+    __tablename__ = "revoked_token"
+    __table_args__ = {'sqlite_autoincrement': True}  # ids are never reused, the blocklist is synced by id
+
+    jti = db.Column(db.String(36), nullable=False, unique=True, index=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        """
+        String representation of RevokedToken.
+
+        :return: 'RevokedToken <id> - jti: <jti>, token_type: <token_type>, expires_at: <expires_at>'
+        """
+        return f'RevokedToken {self.id} - jti: {self.jti}, token_type: {self.token_type}, ' \
+               f'expires_at: {self.expires_at}'
@@ -1,3 +1,4 @@
+from sqlalchemy import DDL, event
 from app import db
 from app.models.base import BaseModel
 
@@ -7,9 +8,17 @@ class Task(BaseModel):
     Task model. It inherits from BaseModel.
     """
     __tablename__ = "task"
+    __table_args__ = (
+        db.Index('ix_task_priority_id', 'priority', 'id'),  # keyset pagination sorted by priority
+        db.Index('ix_task_created_at', 'created_at'),
+        db.Index('ix_task_updated_at', 'updated_at'),  # last modification date of the task list
+        db.Index('ix_task_name', 'name'),  # name prefix filters
+    )
 
     name = db.Column(db.String(255), nullable=False)
     priority = db.Column(db.Integer, nullable=False, default=1)
+    lease_owner = db.Column(db.String(80))  # worker that claimed the task, see TaskRepository.claim_task
+    lease_expires_at = db.Column(db.DateTime)  # the task can be claimed again after this date
     # description = db.Column(db.String(255))
 
     def __repr__(self):
@@ -32,3 +41,29 @@ class Task(BaseModel):
             return False
         return self.name == other.name and self.priority == other.priority \
             and self.created_at == other.created_at and self.updated_at == other.updated_at
+
+
+# Full-text index of the task names: an external content FTS5 table, i.e. it stores only the index and reads the names
+# from task, kept in sync by triggers. It is created and dropped with task by create_all and drop_all, and by the
+# b7c1e9f4a2d6 migration on existing dbs.
+TASK_FTS_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS task_fts USING fts5("
+    "name, content='task', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_insert AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_fts (rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_delete AFTER DELETE ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS task_fts_update AFTER UPDATE OF name ON task BEGIN "
+    "INSERT INTO task_fts (task_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO task_fts (rowid, name) VALUES (new.id, new.name); END",
+)
+TASK_FTS_DROP = (
+    "DROP TRIGGER IF EXISTS task_fts_update",
+    "DROP TRIGGER IF EXISTS task_fts_delete",
+    "DROP TRIGGER IF EXISTS task_fts_insert",
+    "DROP TABLE IF EXISTS task_fts",
+)
+for statement in TASK_FTS_CREATE:
+    event.listen(Task.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in TASK_FTS_DROP:
+    event.listen(Task.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
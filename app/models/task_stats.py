@@ -0,0 +1,48 @@
+from sqlalchemy import DDL, event
+from app import db
+from app.models.task import Task
+
+
+class TaskStats(db.Model):
+    """
+    TaskStats model: number of tasks of each priority.
+    The rows are maintained by triggers on task, in the transaction of every insert, delete and priority update, so
+    that the counts are read without scanning task. They can be recomputed by TaskRepository.rebuild_task_stats.
+    """
+    __tablename__ = "task_stats"
+
+    priority = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        """
+        String representation of TaskStats.
+
+        :return: 'TaskStats - priority: <priority>, count: <count>'
+        """
+        return f'TaskStats - priority: {self.priority}, count: {self.count}'
+
+
+# Triggers keeping task_stats in sync with task. They are created and dropped with task by create_all and drop_all,
+# and by the c4d8e2f6a1b3 migration on existing dbs. A priority whose tasks are all deleted keeps a row with count 0.
+TASK_STATS_CREATE = (
+    "CREATE TRIGGER IF NOT EXISTS task_stats_insert AFTER INSERT ON task BEGIN "
+    "INSERT INTO task_stats (priority, count) VALUES (new.priority, 1) "
+    "ON CONFLICT (priority) DO UPDATE SET count = count + 1; END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_delete AFTER DELETE ON task BEGIN "
+    "UPDATE task_stats SET count = count - 1 WHERE priority = old.priority; END",
+    "CREATE TRIGGER IF NOT EXISTS task_stats_update AFTER UPDATE OF priority ON task "
+    "WHEN new.priority IS NOT old.priority BEGIN "
+    "UPDATE task_stats SET count = count - 1 WHERE priority = old.priority; "
+    "INSERT INTO task_stats (priority, count) VALUES (new.priority, 1) "
+    "ON CONFLICT (priority) DO UPDATE SET count = count + 1; END",
+)
+TASK_STATS_DROP = (
+    "DROP TRIGGER IF EXISTS task_stats_update",
+    "DROP TRIGGER IF EXISTS task_stats_delete",
+    "DROP TRIGGER IF EXISTS task_stats_insert",
+)
+for statement in TASK_STATS_CREATE:
+    event.listen(Task.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in TASK_STATS_DROP:
+    event.listen(Task.__table__, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
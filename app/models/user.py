@@ -1,4 +1,4 @@
-from app import db
+from app import db, password_hasher
 from app.models.base import BaseModel
 from werkzeug.security import generate_password_hash, check_password_hash
 
@@ -9,26 +9,26 @@ class User(BaseModel):
     """
     __tablename__ = "user"
 
-    username = db.Column(db.String(32), nullable=False)
+    username = db.Column(db.String(32), nullable=False, unique=True, index=True)
     password_hash = db.Column(db.String(128), nullable=False)
 
     def set_password(self, password: str):
         """
-        It generates a password hash.
+        It generates a password hash, on the password hasher pool if configured.
 
         :param password: plaintext password
         :return: None
         """
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.run(generate_password_hash, password, **password_hasher.options())
 
     def check_password(self, password):
         """
-        It compares a password with its hash.
+        It compares a password with its hash, on the password hasher pool if configured.
 
         :param password: plaintext password to be checked
         :return: True if the provided password matches the stored password hash, False otherwise
         """
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.run(check_password_hash, self.password_hash, password)
 
     def __repr__(self):
         """
@@ -0,0 +1,129 @@
+import time
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, NamedTuple
+from flask import Flask, Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+
+class QueryRecord(NamedTuple):
+    """
+    SQL statement executed by the app.
+    """
+    statement: str
+    parameters: object
+    duration: float  # seconds
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    Raised when a block of code executes more SQL statements than allowed.
+    """
+
+
+_collectors = ContextVar('collectors', default=())  # lists receiving the statements executed in the current context
+
+
+@contextmanager
+def record_queries() -> Iterator[list[QueryRecord]]:
+    """
+    Record the SQL statements executed within the block, in the current thread.
+
+    :return: list of the executed statements, filled while the block runs
+    """
+    queries = []
+    token = _collectors.set(_collectors.get() + (queries,))
+    try:
+        yield queries
+    finally:
+        _collectors.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[list[QueryRecord]]:
+    """
+    Ensure that the block executes at most max_queries SQL statements.
+
+    :param max_queries: maximum number of statements
+    :return: list of the executed statements, filled while the block runs
+    :raise QueryBudgetExceeded: if the block executes more than max_queries statements
+    """
+    with record_queries() as queries:
+        yield queries
+    if len(queries) > max_queries:
+        statements = '\n'.join(query.statement for query in queries)
+        raise QueryBudgetExceeded(f'{len(queries)} queries executed, budget is {max_queries}:\n{statements}')
+
+
+class QueryProfiler:
+    """
+    Extension recording the SQL statements executed by each request. It is configured by:
+
+    - SQL_PROFILER_ENABLED: enable the extension
+    - SQL_SLOW_QUERY_MS: statements slower than this threshold are logged
+    - SQL_N_PLUS_ONE_THRESHOLD: statements executed at least this number of times by a request are logged as
+      suspected N+1 queries
+    """
+
+    def __init__(self, app: Flask = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Register the engine and request hooks on the app.
+
+        :param app: app
+        :return: None
+        """
+        if not app.config.get('SQL_PROFILER_ENABLED', False):
+            return
+        from app import db
+        with app.app_context():
+            engines = [db.engine]
+        replicas = app.extensions.get('read_replicas')
+        if replicas is not None:
+            engines += replicas.engines
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    @staticmethod
+    def queries() -> list[QueryRecord]:
+        """
+        Get the SQL statements executed so far by the current request.
+
+        :return: list of statements
+        """
+        return g.get('sql_queries', []) if has_request_context() else []
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        context.profiler_start = time.perf_counter()
+
+    @staticmethod
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        record = QueryRecord(statement, parameters, time.perf_counter() - context.profiler_start)
+        if has_request_context() and 'sql_queries' in g:
+            g.sql_queries.append(record)
+        for collector in _collectors.get():
+            collector.append(record)
+        if has_app_context() and record.duration * 1000 >= current_app.config['SQL_SLOW_QUERY_MS']:
+            current_app.logger.warning('slow query (%.1f ms): %s', record.duration * 1000, statement)
+
+    @staticmethod
+    def _before_request() -> None:
+        g.sql_queries = []
+
+    @staticmethod
+    def _after_request(response: Response) -> Response:
+        threshold = current_app.config['SQL_N_PLUS_ONE_THRESHOLD']
+        for statement, count in Counter(query.statement for query in g.get('sql_queries', [])).items():
+            if count >= threshold:
+                current_app.logger.warning('suspected N+1 query, executed %d times by %s %s: %s',
+                                           count, request.method, request.path, statement)
+        return response
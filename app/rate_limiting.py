@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import threading
+import time
+
+from urllib.parse import unquote, urlparse
+from flask import current_app
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_limiter.util import get_remote_address
+from limits.storage import MovingWindowSupport, Storage
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """
+    Rate limit storage in a SQLite file in WAL mode, so that the limits are shared by all the worker processes of the
+    host without an external service. Every counter update is a single atomic statement.
+
+    The storage is registered for the sqlite scheme, e.g. RATELIMIT_STORAGE_URI = 'sqlite:////var/run/limits.db'
+    (absolute path) or 'sqlite:///limits.db' (relative to the working directory).
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    CLEANUP_INTERVAL = 60  # seconds between two deletions of the expired rows by a process
+
+    def __init__(self, uri: str = None, wrap_exceptions: bool = False, **options):
+        parts = urlparse(uri)
+        self.path = unquote(parts.path[1:] if parts.path.startswith('/') else parts.path) or ':memory:'
+        self._local = threading.local()  # sqlite3 connections cannot be shared among threads
+        self._last_cleanup = 0.0
+        if self.path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._connection()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')  # the limits do not need to survive a power loss
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS counters '
+                '(key TEXT PRIMARY KEY, value INTEGER NOT NULL, expires_at REAL NOT NULL) WITHOUT ROWID'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS events (key TEXT NOT NULL, at REAL NOT NULL, expires_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_events_key_at ON events (key, at)')
+            connection.execute('CREATE INDEX IF NOT EXISTS ix_events_expires_at ON events (expires_at)')
+            self._local.connection = connection
+        return connection
+
+    def _cleanup(self, connection: sqlite3.Connection, now: float) -> None:
+        if now - self._last_cleanup < self.CLEANUP_INTERVAL:
+            return
+        self._last_cleanup = now
+        connection.execute('DELETE FROM counters WHERE expires_at <= ?', (now,))
+        connection.execute('DELETE FROM events WHERE expires_at <= ?', (now,))
+
+    def incr(self, key: str, expiry: int, elastic_expiry: bool = False, amount: int = 1) -> int:
+        """
+        Increment the counter of a key, starting a new window if the counter is expired.
+
+        :param key: key
+        :param expiry: seconds until the counter expires
+        :param elastic_expiry: extend the expiry at every increment
+        :param amount: increment
+        :return: counter value
+        """
+        now = time.time()
+        connection = self._connection()
+        self._cleanup(connection, now)
+        (value,) = connection.execute(
+            'INSERT INTO counters (key, value, expires_at) VALUES (:key, :amount, :expires_at) '
+            'ON CONFLICT (key) DO UPDATE SET '
+            'value = CASE WHEN expires_at <= :now THEN :amount ELSE value + :amount END, '
+            'expires_at = CASE WHEN expires_at <= :now OR :elastic THEN :expires_at ELSE expires_at END '
+            'RETURNING value',
+            {'key': key, 'amount': amount, 'expires_at': now + expiry, 'now': now, 'elastic': elastic_expiry}
+        ).fetchone()
+        return value
+
+    def get(self, key: str) -> int:
+        row = self._connection().execute(
+            'SELECT value FROM counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    def get_expiry(self, key: str) -> int:
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires_at FROM counters WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+        return int(now if row is None else row[0])
+
+    def check(self) -> bool:
+        try:
+            self._connection().execute('SELECT 1')
+        except sqlite3.Error:
+            return False
+        return True
+
+    def reset(self) -> int:
+        connection = self._connection()
+        count = connection.execute('DELETE FROM counters').rowcount
+        count = max(count, connection.execute('SELECT count(DISTINCT key) FROM events').fetchone()[0])
+        connection.execute('DELETE FROM events')
+        return count
+
+    def clear(self, key: str) -> None:
+        connection = self._connection()
+        connection.execute('DELETE FROM counters WHERE key = ?', (key,))
+        connection.execute('DELETE FROM events WHERE key = ?', (key,))
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        """
+        Acquire entries in the moving window of a key, if the window has room for them.
+
+        :param key: key
+        :param limit: maximum number of entries in the window
+        :param expiry: window length in seconds
+        :param amount: number of entries
+        :return: True if the entries are acquired, False if the limit is reached
+        """
+        if amount > limit:
+            return False
+        now = time.time()
+        connection = self._connection()
+        self._cleanup(connection, now)
+        connection.execute('BEGIN IMMEDIATE')  # serialize the count and the insert among processes
+        try:
+            (acquired,) = connection.execute(
+                'SELECT count(*) FROM events WHERE key = ? AND at > ?', (key, now - expiry)
+            ).fetchone()
+            if acquired + amount <= limit:
+                connection.executemany('INSERT INTO events (key, at, expires_at) VALUES (?, ?, ?)',
+                                       [(key, now, now + expiry)] * amount)
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return acquired + amount <= limit
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> (int, int):
+        """
+        Get the moving window of a key.
+
+        :param key: key
+        :param limit: maximum number of entries in the window
+        :param expiry: window length in seconds
+        :return: start of the window, number of acquired entries
+        """
+        now = time.time()
+        start, acquired = self._connection().execute(
+            'SELECT min(at), count(*) FROM events WHERE key = ? AND at > ?', (key, now - expiry)
+        ).fetchone()
+        return int(now if start is None else start), acquired
+
+
+def rate_limit_key() -> str:
+    """
+    Key of the rate limits of the current request, according to RATELIMIT_KEY_BY:
+
+    - 'remote_address': client address
+    - 'jwt_identity': identity of the access token, client address if the request has no valid token
+
+    :return: key
+    """
+    if current_app.config.get('RATELIMIT_KEY_BY', 'remote_address') == 'jwt_identity':
+        try:
+            verify_jwt_in_request(optional=True)
+            identity = get_jwt_identity()
+        except Exception:  # invalid or expired tokens are rejected by the endpoint itself
+            identity = None
+        if identity is not None:
+            return f'identity:{identity}'
+    return get_remote_address()
@@ -0,0 +1,154 @@
+import os
+import threading
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from flask import Flask, current_app, g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+
+_reading = ContextVar('reading', default=False)  # True while a read-only repository call is running
+
+
+class ReplicaState:
+    """
+    Engines and selection state of the read replicas bound to an app.
+    """
+
+    def __init__(self, engines: list[Engine], selection: str):
+        self.engines = engines
+        self.selection = selection
+        self.busy = [0] * len(engines)  # connections checked out of the pool of each engine
+        self._next = 0
+        self._lock = threading.Lock()
+        for i, engine in enumerate(engines):
+            event.listen(engine, 'checkout', lambda *args, i=i: self._add_busy(i, 1))
+            event.listen(engine, 'checkin', lambda *args, i=i: self._add_busy(i, -1))
+
+    def _add_busy(self, i: int, value: int) -> None:
+        with self._lock:
+            self.busy[i] += value
+
+    def select(self) -> Engine:
+        """
+        Select the replica serving the next read.
+
+        :return: engine, the next one in turn (round_robin) or the one with the fewest connections in use (least_busy)
+        """
+        with self._lock:
+            if self.selection == 'least_busy':
+                i = min(range(len(self.engines)), key=lambda j: (self.busy[j], (j - self._next) % len(self.engines)))
+            else:
+                i = self._next % len(self.engines)
+            self._next = i + 1
+        return self.engines[i]
+
+
+class ReadReplicas:
+    """
+    Extension sending the read-only repository calls to read replicas of the primary db. It is configured by:
+
+    - SQLALCHEMY_REPLICA_URIS: database URIs of the replicas, no replicas if empty
+    - SQLALCHEMY_REPLICA_SELECTION: 'round_robin' or 'least_busy'
+
+    Reads run on a replica only inside reading(), and only until the current request writes to the primary:
+    after that, they run on the primary too, so that the request reads its own writes. The replica is selected once
+    per request, all its reads run on the same one.
+    """
+
+    SELECTIONS = ('round_robin', 'least_busy')
+
+    def __init__(self, app: Flask = None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app: Flask) -> None:
+        """
+        Create the replica engines of an app.
+
+        :param app: app
+        :return: None
+        """
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS')
+        if not uris:
+            return
+        selection = app.config.get('SQLALCHEMY_REPLICA_SELECTION', 'round_robin')
+        if selection not in self.SELECTIONS:
+            raise ValueError(f'SQLALCHEMY_REPLICA_SELECTION must be one of {self.SELECTIONS}, got {selection}')
+        options = app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+        engines = [create_engine(self._resolve(app, uri), **options) for uri in uris]
+        app.extensions['read_replicas'] = ReplicaState(engines, selection)
+        app.before_request(self._before_request)
+
+    @staticmethod
+    def _resolve(app: Flask, uri: str) -> str:
+        # relative sqlite paths are in the instance folder, as the ones of SQLALCHEMY_DATABASE_URI
+        url = make_url(uri)
+        if url.drivername.startswith('sqlite') and url.database and url.database != ':memory:' \
+                and not url.database.startswith('file:') and not os.path.isabs(url.database):
+            os.makedirs(app.instance_path, exist_ok=True)
+            url = url.set(database=os.path.join(app.instance_path, url.database))
+        return url.render_as_string(hide_password=False)
+
+    @staticmethod
+    def _before_request() -> None:
+        g.pop('wrote_primary', None)
+        g.pop('read_replica', None)
+
+    @staticmethod
+    @contextmanager
+    def reading() -> Iterator[None]:
+        """
+        Run the statements of the block on a read replica, if any.
+        """
+        token = _reading.set(True)
+        try:
+            yield
+        finally:
+            _reading.reset(token)
+
+    @staticmethod
+    def engine() -> Engine:
+        """
+        Get the replica serving the current read: the one selected for the first read of the request, so that all
+        the reads of a request, e.g. the version of the task list and the tasks, see the same copy of the data.
+
+        :return: engine, None if the read must run on the primary
+        """
+        if not _reading.get() or not has_app_context() or g.get('wrote_primary'):
+            return None
+        if 'read_replica' not in g:
+            state = current_app.extensions.get('read_replicas')
+            g.read_replica = state.select() if state is not None else None
+        return g.read_replica
+
+
+class RoutingSession(Session):
+    """
+    Session running the statements inside ReadReplicas.reading() on a replica, and all the others on the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            engine = ReadReplicas.engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _wrote_primary() -> None:
+    if has_app_context():
+        g.wrote_primary = True
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _after_flush(session, flush_context) -> None:
+    _wrote_primary()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _do_orm_execute(orm_execute_state) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _wrote_primary()  # bulk statements, not flushed
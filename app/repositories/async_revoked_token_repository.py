@@ -0,0 +1,21 @@
+from datetime import datetime
+from sqlalchemy import select
+from app.models.revoked_token import RevokedToken
+from app.aio.database import async_db
+
+
+class AsyncRevokedTokenRepository:
+    """
+    Class to interact with the RevokedToken model from the async app, see RevokedTokenRepository.
+    """
+
+    @staticmethod
+    async def is_revoked(jti: str) -> bool:
+        """
+        Check if a token is revoked. Revocations of expired tokens are ignored.
+
+        :param jti: unique identifier of the token
+        :return: True if the token is revoked
+        """
+        statement = select(RevokedToken.id).where(RevokedToken.jti == jti, RevokedToken.expires_at > datetime.now())
+        return (await async_db.session.execute(statement)).first() is not None
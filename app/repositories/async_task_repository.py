@@ -0,0 +1,164 @@
+import asyncio
+
+from datetime import datetime
+from quart import current_app
+from sqlalchemy import Row, delete, insert, select, update
+from app import task_cache
+from app.models.task import Task
+from app.repositories.task_repository import TaskRepository
+from app.aio.database import async_db
+
+
+class AsyncTaskRepository:
+    """
+    Class to interact with the Task model from the async app, see TaskRepository.
+    Tasks are read and written as plain rows, never loaded as ORM objects, so that no attribute access can trigger
+    implicit I/O; the queries (keyset pagination, filters, single statement writes) are the ones of TaskRepository.
+    """
+    RETURNED_COLUMNS = (Task.id, Task.name, Task.priority, Task.created_at, Task.updated_at)
+
+    @staticmethod
+    async def _invalidate(ids: list[int] = None) -> None:
+        """
+        Invalidate tasks in the task cache of the sync app, shared through the sqlite backend (see create_async_app),
+        on a worker thread, so that the event loop does not wait for the cache file.
+
+        :param ids: task ids, all the tasks if None
+        :return: None
+        """
+        backend = task_cache.backend(current_app)
+        if backend is None:
+            return
+        if ids is None:
+            await asyncio.to_thread(backend.clear)
+        else:
+            await asyncio.to_thread(lambda: [backend.delete(id) for id in ids])
+
+    @staticmethod
+    async def get_task_by_id(id: int, columns: list[str]) -> Row:
+        """
+        Get task by id.
+
+        :param id: task id
+        :param columns: names of the selected columns
+        :return: row, None if the task does not exist
+        :raise ValueError: if a column does not exist
+        """
+        query = select(*TaskRepository._columns(columns)).where(Task.id == id)
+        return (await async_db.session.execute(query)).first()
+
+    @staticmethod
+    async def get_all_tasks(columns: list[str]) -> list[Row]:
+        """
+        Get all tasks.
+
+        :param columns: names of the selected columns
+        :return: list of rows
+        :raise ValueError: if a column does not exist
+        """
+        return (await async_db.session.execute(select(*TaskRepository._columns(columns)))).all()
+
+    @staticmethod
+    async def get_tasks_page(limit: int, after: str = None, sort: str = 'id', columns: list[str] = None,
+                             **filters) -> (list[Row], str):
+        """
+        Get a page of tasks using keyset pagination, see TaskRepository.get_tasks_page.
+
+        :param limit: maximum number of tasks in the page
+        :param after: cursor returned with the previous page, None to get the first page
+        :param sort: sort key, one of SORT_COLUMNS, descending if prefixed by '-'; None to sort by the filtered column
+        :param columns: names of the selected columns, followed in the rows by the sort columns missing from them
+        :param filters: filters, as specified by TaskRepository._filter_predicates
+        :return: rows, cursor of the next page (None if there are no more tasks)
+        :raise ValueError: if the cursor is malformed or the filters cannot be served by an index
+        """
+        sort_columns, where, order_by = TaskRepository._page_criteria(after, sort, **filters)
+        query = select(*TaskRepository._page_columns(columns, sort_columns)) \
+            .where(*where) \
+            .order_by(*order_by) \
+            .limit(limit + 1)  # fetch one more row to know if there is a next page
+        rows = (await async_db.session.execute(query)).all()
+        return TaskRepository._next_page(rows, limit, sort_columns)
+
+    @staticmethod
+    async def create_task(name: str, priority: int) -> Row:
+        """
+        Create a task.
+
+        :param name: name of the task
+        :param priority: priority of the task
+        :return: row (id, name, priority, created_at, updated_at) of the created task
+        """
+        session = async_db.session
+        query = insert(Task).values(name=name, priority=priority).returning(*AsyncTaskRepository.RETURNED_COLUMNS)
+        task = (await session.execute(query)).one()
+        await session.commit()
+        return task
+
+    @staticmethod
+    async def update_task_by_id(id: int, name: str = None, priority: int = None) -> Row:
+        """
+        Update existing task with a single UPDATE ... RETURNING statement.
+        The fields left to None are not modified, updated_at is always set.
+
+        :param id: task id
+        :param name: new name for the task
+        :param priority: new priority for the task
+        :return: row (id, name, priority, created_at, updated_at) of the updated task if task exists, None otherwise
+        """
+        session = async_db.session
+        values = {key: value for key, value in (('name', name), ('priority', priority)) if value is not None}
+        query = update(Task) \
+            .where(Task.id == id) \
+            .values(**values, updated_at=datetime.now()) \
+            .returning(*AsyncTaskRepository.RETURNED_COLUMNS)
+        task = (await session.execute(query, execution_options={'synchronize_session': False})).first()
+        await session.commit()
+        if task is not None:
+            await AsyncTaskRepository._invalidate([id])
+        return task
+
+    @staticmethod
+    async def delete_task_by_id(id: int) -> bool:
+        """
+        Delete a task by id.
+
+        :param id: task id
+        :return: True if task exists and is deleted, False otherwise
+        """
+        session = async_db.session
+        query = delete(Task).where(Task.id == id).returning(Task.id)
+        deleted = (await session.execute(query, execution_options={'synchronize_session': False})).first()
+        await session.commit()
+        if deleted is None:
+            return False
+        await AsyncTaskRepository._invalidate([id])
+        return True
+
+    @staticmethod
+    async def delete_tasks(ids: list[int] = None, priority: int = None, created_from: datetime = None,
+                           created_to: datetime = None) -> int:
+        """
+        Delete the tasks matching all the specified filters, all the tasks if none is specified, with a single
+        DELETE statement.
+
+        :param ids: task ids
+        :param priority: priority of the tasks
+        :param created_from: minimum creation date (inclusive)
+        :param created_to: maximum creation date (exclusive)
+        :return: number of deleted tasks
+        """
+        session = async_db.session
+        query = delete(Task)
+        if ids is not None:
+            query = query.where(Task.id.in_(ids))
+        if priority is not None:
+            query = query.where(Task.priority == priority)
+        if created_from is not None:
+            query = query.where(Task.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(Task.created_at < created_to)
+        result = await session.execute(query, execution_options={'synchronize_session': False})
+        await session.commit()
+        await AsyncTaskRepository._invalidate(ids)
+        return result.rowcount
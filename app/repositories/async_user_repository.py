@@ -0,0 +1,59 @@
+from quart import current_app
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash, check_password_hash
+from app.models.user import User
+from app import password_hasher
+from app.aio.database import async_db
+
+
+class AsyncUserRepository:
+    """
+    Class to interact with the User model from the async app, see UserRepository.
+    Passwords are hashed on the password hasher pool (or executor) without blocking the event loop.
+    """
+
+    @staticmethod
+    async def get_user_by_username(username: str) -> User:
+        """
+        Get user by username.
+
+        :param username: username of the user
+        :return: user
+        """
+        return await async_db.session.scalar(select(User).where(User.username == username))
+
+    @staticmethod
+    async def check_password(user: User, password: str) -> bool:
+        """
+        Compare a password with the hash of a user.
+
+        :param user: user
+        :param password: plaintext password to be checked
+        :return: True if the password matches the stored password hash, False otherwise
+        """
+        app = current_app._get_current_object()
+        return await password_hasher.run_async(app, check_password_hash, user.password_hash, password)
+
+    @staticmethod
+    async def create_user(username: str, password: str) -> bool:
+        """
+        Create and register a user.
+
+        :param username: username
+        :param password: plaintext password
+        :return: True if the user is created, False if the username already exists
+        """
+        session = async_db.session
+        if await session.scalar(select(User.id).where(User.username == username)) is not None:
+            return False
+        app = current_app._get_current_object()
+        password_hash = await password_hasher.run_async(app, generate_password_hash, password,
+                                                        **password_hasher.options(app))
+        session.add(User(username=username, password_hash=password_hash))
+        try:
+            await session.commit()
+        except IntegrityError:  # the same username has been registered concurrently
+            await session.rollback()
+            return False
+        return True
@@ -0,0 +1,64 @@
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from app.models.revoked_token import RevokedToken
+from app import db
+
+
+class RevokedTokenRepository:
+    """
+    Class to interact with the RevokedToken model.
+    """
+
+    @staticmethod
+    def revoke(jti: str, token_type: str, expires_at: datetime) -> bool:
+        """
+        Revoke a token.
+
+        :param jti: unique identifier of the token
+        :param token_type: 'access' or 'refresh'
+        :param expires_at: expiration date of the token, the revocation is dropped after it
+        :return: True if the token is revoked, False if it was already revoked
+        """
+        db.session.add(RevokedToken(jti=jti, token_type=token_type, expires_at=expires_at))
+        try:
+            db.session.commit()
+        except IntegrityError:  # the same token has been revoked concurrently
+            db.session.rollback()
+            return False
+        return True
+
+    @staticmethod
+    def is_revoked(jti: str) -> bool:
+        """
+        Check if a token is revoked. Revocations of expired tokens are ignored.
+
+        :param jti: unique identifier of the token
+        :return: True if the token is revoked
+        """
+        statement = select(RevokedToken.id).where(RevokedToken.jti == jti, RevokedToken.expires_at > datetime.now())
+        return db.session.execute(statement).first() is not None
+
+    @staticmethod
+    def get_revoked_after(last_id: int = 0) -> list[tuple[int, str]]:
+        """
+        Get the revocations of the tokens not expired yet, in insertion order.
+
+        :param last_id: only revocations with a greater id are returned
+        :return: list of (id, jti)
+        """
+        statement = select(RevokedToken.id, RevokedToken.jti) \
+            .where(RevokedToken.id > last_id, RevokedToken.expires_at > datetime.now()) \
+            .order_by(RevokedToken.id)
+        return [tuple(row) for row in db.session.execute(statement)]
+
+    @staticmethod
+    def delete_expired() -> int:
+        """
+        Delete the revocations of the expired tokens.
+
+        :return: number of deleted revocations
+        """
+        result = db.session.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now()))
+        db.session.commit()
+        return result.rowcount
@@ -1,5 +1,146 @@
+import re
+import sys
+import json
+
+from datetime import datetime, timedelta
+from typing import Iterator, NamedTuple, Sequence
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from markupsafe import escape
+from sqlalchemy import Column, DateTime, Float, Integer, column, delete, func, insert, literal_column, or_, \
+    select, table, tuple_, update, Row
+from sqlalchemy.orm import make_transient_to_detached
 from app.models.task import Task
-from app import db
+from app.models.task_stats import TaskStats
+from app import db, read_replicas, task_cache
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+
+    :param values: values of the sort columns, datetimes are encoded in ISO 8601
+    :return: cursor
+    """
+    values = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence[Column]) -> list:
+    """
+    Decode a cursor generated by encode_cursor.
+
+    :param cursor: cursor
+    :param columns: sort columns
+    :return: values of the sort columns
+    :raise ValueError: if the cursor is malformed
+    """
+    try:
+        values = json.loads(urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        for i, column in enumerate(columns):
+            if isinstance(column.type, DateTime) and isinstance(values[i], str):
+                values[i] = datetime.fromisoformat(values[i])
+            elif column.type.python_type is not type(values[i]):  # bool is not accepted as int
+                raise ValueError
+    except (BinasciiError, UnicodeError, ValueError):
+        raise ValueError(f'invalid cursor {cursor}')
+    return values
+
+
+def prefix_successor(prefix: str) -> str:
+    """
+    Get the smallest string greater than all the strings starting with prefix, so that a prefix match is compiled
+    into a range of an index: prefix <= value < prefix_successor(prefix).
+
+    :param prefix: non-empty prefix
+    :return: successor, None if there is no such string (the prefix is made of maximum code points only)
+    """
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def fts_query(text: str) -> str:
+    """
+    Translate the text typed in a search box into an FTS5 query matching the tasks that contain all its words,
+    the last one as a prefix, since it may be incomplete. Words are quoted, so that the FTS5 query syntax cannot be
+    injected.
+
+    :param text: text, e.g. 'buy mil'
+    :return: FTS5 query, e.g. '"buy" "mil"*'
+    :raise ValueError: if the text contains no words
+    """
+    words = re.findall(r'\w+', text)
+    if not words:
+        raise ValueError(f'{text} does not contain any words')
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+HIGHLIGHT_START, HIGHLIGHT_END = '\x02', '\x03'  # markers of the matches returned by the FTS5 highlight function
+
+
+def highlight_html(name: str, highlighted: str, markup: tuple[str, str]) -> str:
+    """
+    Turn a name highlighted by FTS5 between HIGHLIGHT_START and HIGHLIGHT_END into HTML: the characters of the name
+    are escaped, the markers are replaced by the markup. Markers are told apart from the same characters in the name
+    by walking the name along, so that a name cannot inject markup: matches are single words, so the first end
+    marker after a start marker is always a marker.
+
+    :param name: name
+    :param highlighted: name with the markers inserted around the matches
+    :param markup: strings replacing the start and end markers, e.g. ('<mark>', '</mark>')
+    :return: HTML
+    """
+    parts, i, in_match = [], 0, False
+    for char in highlighted:
+        if in_match and char == HIGHLIGHT_END:
+            parts.append(markup[1])
+            in_match = False
+        elif i < len(name) and name[i] == char:
+            parts.append(escape(char))
+            i += 1
+        else:
+            parts.append(markup[0])
+            in_match = True
+    return ''.join(parts)
+
+
+task_fts = table('task_fts', column('rowid', Integer), column('rank', Float))  # see TASK_FTS_CREATE
+
+
+class TasksVersion(NamedTuple):
+    """
+    Aggregates that change whenever a task is created, updated or deleted.
+    """
+    count: int
+    max_id: int
+    last_modified: datetime
+
+
+class TaskStatsSummary(NamedTuple):
+    """
+    Statistics of the task list.
+    """
+    total: int
+    priorities: list  # rows (priority, count) of the priorities with at least one task, by priority
+    oldest_created_at: datetime
+    newest_created_at: datetime
+
+
+class TaskSearchResult(NamedTuple):
+    """
+    Task matching a full-text search.
+    """
+    id: int
+    name: str
+    priority: int
+    created_at: datetime
+    updated_at: datetime
+    highlight: str  # HTML of the name, with the matches between the highlight markup
+    rank: float
 
 
 class TaskRepository:
@@ -7,23 +148,359 @@ class TaskRepository:
     Class to interact with the User model.
     """
 
+    # Columns used to sort a page of tasks. The last column is always the primary key, so that the sort key is unique.
+    # Each sort key is served by an index: the ones of the other columns implicitly end with the primary key in SQLite.
+    SORT_COLUMNS = {
+        'id': (Task.id,),
+        'priority': (Task.priority, Task.id),
+        'created_at': (Task.created_at, Task.id),
+        'updated_at': (Task.updated_at, Task.id),
+        'name': (Task.name, Task.id)
+    }
+    # Sort keys allowed with filters on each column: the rows matching the filters are a range of the index of the
+    # sort key, so that a page is read without scanning or sorting the other rows. Equality filters on priority
+    # select a range of ix_task_priority_id already sorted by id too.
+    FILTER_SORTS = {
+        'priority': ('priority',),
+        'created_at': ('created_at',),
+        'updated_at': ('updated_at',),
+        'name': ('name',)
+    }
+
     @staticmethod
-    def get_task_by_id(id: int) -> Task:
+    def get_task_by_id(id: int, columns: list[str] = None) -> Task:
         """
         Get task by id.
+        Tasks are read through task_cache: on a hit, the cached task is merged into the session without querying the db.
+        On a miss, the task is read from the primary and cached, unless it has been invalidated by a write meanwhile,
+        so that neither a lagging read replica nor a concurrent update can put a stale task in the cache. Reads not
+        filling the cache (cache disabled or columns specified) are served by a read replica, if configured.
         :param id: task id
+        :param columns: if specified, on a miss only these columns are selected and a plain row is returned instead of
+            the task, without caching it
+        :return: task, or row with the values of columns
+        """
+        cached = task_cache.get(id)
+        if cached is None and columns is not None:
+            query = select(*TaskRepository._columns(columns)).where(Task.id == id)
+            with read_replicas.reading():
+                return db.session.execute(query).first()
+        if cached is None:
+            generation = task_cache.generation(id)  # before the read, see Cache.set
+            if generation is None:
+                with read_replicas.reading():
+                    return Task.query.filter_by(id=id).first()
+            task = Task.query.filter_by(id=id).first()
+            if task is not None:
+                task_cache.set(id, TaskRepository._to_cache(task), generation=generation)
+            return task
+        task = db.session.identity_map.get(db.session.identity_key(Task, id))
+        if task is not None:  # already loaded by this session, it is at least as fresh as the cached one
+            return task
+        return db.session.merge(TaskRepository._from_cache(cached), load=False)
+
+    @staticmethod
+    def _to_cache(task: Task) -> dict:
+        """
+        Convert a task into the JSON serializable dict stored in task_cache.
+
+        :param task: task
+        :return: dict
+        """
+        return {
+            'id': task.id,
+            'name': task.name,
+            'priority': task.priority,
+            'created_at': task.created_at.isoformat(),
+            'updated_at': task.updated_at.isoformat()
+        }
+
+    @staticmethod
+    def _from_cache(cached: dict) -> Task:
+        """
+        Convert a dict stored in task_cache into a detached task.
+
+        :param cached: dict
         :return: task
         """
-        return Task.query.filter_by(id=id).first()
+        task = Task(
+            id=cached['id'],
+            name=cached['name'],
+            priority=cached['priority'],
+            created_at=datetime.fromisoformat(cached['created_at']),
+            updated_at=datetime.fromisoformat(cached['updated_at'])
+        )
+        make_transient_to_detached(task)
+        return task
+
+    @staticmethod
+    def _columns(names: list[str]) -> list:
+        """
+        Get the columns of the Task model with the given names.
+
+        :param names: column names
+        :return: columns
+        :raise ValueError: if a column does not exist
+        """
+        unknown = [name for name in names if name not in Task.__table__.columns]
+        if unknown:
+            raise ValueError(f'unknown task columns {", ".join(unknown)}')
+        return [getattr(Task, name) for name in names]
+
+    @staticmethod
+    def get_all_tasks(columns: list[str] = None) -> list[Task]:
+        """
+        Get all tasks, from a read replica if configured.
+
+        :param columns: if specified, only these columns are selected and plain rows are returned instead of tasks,
+            skipping the creation of the ORM objects
+        :return: tasks, or rows with the values of columns
+        """
+        if columns is not None:
+            query = select(*TaskRepository._columns(columns))
+            with read_replicas.reading():
+                return db.session.execute(query).all()
+        with read_replicas.reading():
+            return Task.query.all()
+
+    @staticmethod
+    def get_tasks_version() -> TasksVersion:
+        """
+        Get the version of the task list, computed with a single aggregate query without loading any task.
+        It is read from the read replica serving the other reads of the request, if any, so that it describes the
+        tasks they return.
+
+        :return: number of tasks, max task id, max updated_at (None if there are no tasks)
+        """
+        query = select(func.count(Task.id), func.max(Task.id), func.max(Task.updated_at))
+        with read_replicas.reading():
+            return TasksVersion(*db.session.execute(query).one())
+
+    @staticmethod
+    def get_task_stats() -> TaskStatsSummary:
+        """
+        Get the statistics of the task list without scanning it: the counts are read from task_stats, one row per
+        priority, and the creation dates from the ends of ix_task_created_at.
+
+        :return: total, counts by priority, oldest and newest created_at (None if there are no tasks)
+        """
+        priorities = select(TaskStats.priority, TaskStats.count).where(TaskStats.count > 0) \
+            .order_by(TaskStats.priority)
+        # min and max in separate subqueries: SQLite reads them from the index only if they are alone in a query
+        created_at = select(select(func.min(Task.created_at)).scalar_subquery(),
+                            select(func.max(Task.created_at)).scalar_subquery())
+        with read_replicas.reading():
+            rows = db.session.execute(priorities).all()
+            oldest, newest = db.session.execute(created_at).one()
+        return TaskStatsSummary(sum(row.count for row in rows), rows, oldest, newest)
+
+    @staticmethod
+    def rebuild_task_stats() -> dict[int, tuple[int, int]]:
+        """
+        Recompute task_stats from task, in a single transaction, to repair counts that drifted from the table (e.g. if
+        tasks were written while the triggers were missing).
+
+        :return: priority -> (previous count, new count), for the counts that changed
+        """
+        previous = dict(db.session.execute(select(TaskStats.priority, TaskStats.count)).all())
+        db.session.execute(delete(TaskStats))
+        counts = select(Task.priority, func.count(Task.id)).group_by(Task.priority)
+        db.session.execute(insert(TaskStats).from_select(['priority', 'count'], counts))
+        current = dict(db.session.execute(select(TaskStats.priority, TaskStats.count)).all())
+        db.session.commit()
+        return {priority: (previous.get(priority, 0), current.get(priority, 0))
+                for priority in sorted(previous.keys() | current.keys())
+                if previous.get(priority, 0) != current.get(priority, 0)}
+
+    @staticmethod
+    def _filter_predicates(priority: int = None, priority_min: int = None, priority_max: int = None,
+                           created_from: datetime = None, created_to: datetime = None, updated_from: datetime = None,
+                           updated_to: datetime = None, name_prefix: str = None) -> dict[str, list]:
+        """
+        Compile filters into SQL predicates.
+
+        :param priority: priority of the tasks
+        :param priority_min: minimum priority (inclusive)
+        :param priority_max: maximum priority (inclusive)
+        :param created_from: minimum creation date (inclusive)
+        :param created_to: maximum creation date (exclusive)
+        :param updated_from: minimum last modification date (inclusive)
+        :param updated_to: maximum last modification date (exclusive)
+        :param name_prefix: prefix of the name, case sensitive
+        :return: predicates by name of the filtered column
+        """
+        predicates = {}
+        for column, operator, value in (
+            (Task.priority, '__eq__', priority),
+            (Task.priority, '__ge__', priority_min),
+            (Task.priority, '__le__', priority_max),
+            (Task.created_at, '__ge__', created_from),
+            (Task.created_at, '__lt__', created_to),
+            (Task.updated_at, '__ge__', updated_from),
+            (Task.updated_at, '__lt__', updated_to),
+            (Task.name, '__ge__', name_prefix or None),
+            (Task.name, '__lt__', prefix_successor(name_prefix) if name_prefix else None)  # a range instead of LIKE
+        ):
+            if value is not None:
+                predicates.setdefault(column.key, []).append(getattr(column, operator)(value))
+        return predicates
+
+    @staticmethod
+    def validate_page(after: str = None, sort: str = 'id', **filters) -> None:
+        """
+        Check the arguments of get_tasks_page without querying the db.
+
+        :param after: cursor returned with the previous page, None to get the first page
+        :param sort: sort key, one of SORT_COLUMNS, descending if prefixed by '-'; None to sort by the filtered column
+        :param filters: filters, as specified by _filter_predicates
+        :return: None
+        :raise ValueError: if the cursor is malformed or the filters cannot be served by an index
+        """
+        TaskRepository._page_criteria(after, sort, **filters)
+
+    @staticmethod
+    def _page_criteria(after: str = None, sort: str = 'id', **filters) -> (tuple, list, list):
+        """
+        Compile the cursor, the sort key and the filters of a page into SQL clauses, see get_tasks_page.
+
+        :param after: cursor returned with the previous page, None to get the first page
+        :param sort: sort key, one of SORT_COLUMNS, descending if prefixed by '-'; None to sort by the filtered column
+        :param filters: filters, as specified by _filter_predicates
+        :return: sort columns, WHERE clauses, ORDER BY clauses
+        :raise ValueError: if the cursor is malformed or the filters cannot be served by an index
+        """
+        predicates = TaskRepository._filter_predicates(**filters)
+        if len(predicates) > 1:
+            raise ValueError(f'filters on {" and ".join(predicates)} cannot be combined')
+        if sort is None:
+            sort = TaskRepository.FILTER_SORTS[next(iter(predicates))][0] if predicates else 'id'
+        descending, sort_key = sort.startswith('-'), sort.lstrip('-')
+        if sort_key not in TaskRepository.SORT_COLUMNS:
+            raise ValueError(f'invalid sort {sort}')
+        for column in predicates:
+            allowed = TaskRepository.FILTER_SORTS[column]
+            if column == 'priority' and filters.get('priority') is not None:
+                allowed += ('id',)
+            if sort_key not in allowed:
+                raise ValueError(f'filters on {column} can only be sorted by {" or ".join(allowed)}')
+        columns = TaskRepository.SORT_COLUMNS[sort_key]
+        where = [predicate for column_predicates in predicates.values() for predicate in column_predicates]
+        order_by = [column.desc() if descending else column for column in columns]
+        if after is not None:
+            values = decode_cursor(after, columns)
+            if len(columns) == 1:
+                key, values = columns[0], values[0]
+            else:
+                key, values = tuple_(*columns), tuple_(*values)
+            where.append(key < values if descending else key > values)
+        return columns, where, order_by
+
+    @staticmethod
+    def _page_columns(names: list[str], sort_columns: tuple) -> list:
+        """
+        Get the columns selected for a page: the columns with the given names, followed by the sort columns missing
+        from them, which are needed to build the cursor of the next page.
+
+        :param names: column names
+        :param sort_columns: sort columns of the page
+        :return: columns
+        :raise ValueError: if a column does not exist
+        """
+        selected = TaskRepository._columns(names)
+        return selected + [column for column in sort_columns if column.key not in {c.key for c in selected}]
+
+    @staticmethod
+    def _next_page(rows: list, limit: int, sort_columns: tuple) -> (list, str):
+        """
+        Split the rows read for a page, limit + 1 at most, into the page and the cursor of the next page.
+
+        :param rows: tasks or rows
+        :param limit: maximum number of tasks in the page
+        :param sort_columns: sort columns of the page
+        :return: tasks or rows, cursor of the next page (None if there are no more tasks)
+        """
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor([getattr(rows[-1], column.key) for column in sort_columns])
+
+    @staticmethod
+    def get_tasks_page(limit: int, after: str = None, sort: str = 'id', columns: list[str] = None,
+                       **filters) -> (list[Task], str):
+        """
+        Get a page of tasks using keyset pagination.
+        Rows are located with a predicate on the sort key instead of an OFFSET, so the cost of a page does not
+        depend on its depth.
+        Filters can be applied to a single column, and only with the sort keys of FILTER_SORTS (or sort=id with a
+        priority equality filter), so that every page is read from an index range.
+
+        :param limit: maximum number of tasks in the page
+        :param after: cursor returned with the previous page, None to get the first page
+        :param sort: sort key, one of SORT_COLUMNS, descending if prefixed by '-'; None to sort by the filtered column
+        :param columns: if specified, only these columns are selected and plain rows are returned instead of tasks,
+            followed by the sort columns missing from them
+        :param filters: filters, as specified by _filter_predicates
+        :return: tasks or rows, cursor of the next page (None if there are no more tasks)
+        :raise ValueError: if the cursor is malformed or the filters cannot be served by an index
+        """
+        sort_columns, where, order_by = TaskRepository._page_criteria(after, sort, **filters)
+        if columns is None:
+            query = Task.query
+        else:
+            query = db.session.query(*TaskRepository._page_columns(columns, sort_columns))
+        # fetch one more row to know if there is a next page
+        tasks = query.filter(*where).order_by(*order_by).limit(limit + 1).all()
+        return TaskRepository._next_page(tasks, limit, sort_columns)
+
+    @staticmethod
+    def search_tasks(text: str, limit: int, after: str = None, highlight: tuple[str, str] = ('<mark>', '</mark>')) \
+            -> (list[TaskSearchResult], str):
+        """
+        Get a page of the tasks whose names contain the words of a text, ranked by relevance (bm25), from the task_fts
+        full-text index. Only the matching tasks are read and sorted. Pages are located by a cursor on the rank and
+        the id; the ranks depend on the whole index, so pages may overlap if tasks are modified meanwhile.
+
+        :param text: searched text, the last word matches as a prefix
+        :param limit: maximum number of tasks in the page
+        :param after: cursor returned with the previous page, None to get the first page
+        :param highlight: HTML inserted before and after the matches in the highlighted names
+        :return: results, whose highlighted names are HTML-escaped, cursor of the next page (None if there are no
+            more tasks)
+        :raise ValueError: if the text contains no words or the cursor is malformed
+        """
+        fts = literal_column('task_fts')
+        query = select(Task.id, Task.name, Task.priority, Task.created_at, Task.updated_at,
+                       func.highlight(fts, 0, HIGHLIGHT_START, HIGHLIGHT_END), task_fts.c.rank) \
+            .join_from(task_fts, Task, Task.id == task_fts.c.rowid) \
+            .where(fts.op('MATCH')(fts_query(text))) \
+            .order_by(task_fts.c.rank, Task.id)
+        if after is not None:
+            values = decode_cursor(after, [task_fts.c.rank, Task.id])
+            query = query.where(tuple_(task_fts.c.rank, Task.id) > tuple_(*values))
+        with read_replicas.reading():
+            rows = db.session.execute(query.limit(limit + 1)).all()  # one more row to know if there is a next page
+        results = [TaskSearchResult(*row[:5], highlight_html(row.name, row[5], highlight), row.rank)
+                   for row in rows[:limit]]
+        if len(rows) <= limit:
+            return results, None
+        return results, encode_cursor([results[-1].rank, results[-1].id])
 
     @staticmethod
-    def get_all_tasks() -> list[Task]:
+    def iter_task_batches(batch_size: int, columns: list[str] = None) -> Iterator[list[Task]]:
         """
-        Get all tasks.
+        Iterate over all tasks in batches, ordered by id.
+        Rows are fetched from a server-side cursor batch_size at a time, so memory usage does not depend on the
+        number of tasks. The iterator must be consumed within the app context that created it.
 
-        :return: tasks
+        :param batch_size: number of tasks in each batch
+        :param columns: if specified, only these columns are selected and plain rows are returned instead of tasks
+        :return: iterator of lists of tasks or rows
         """
-        return Task.query.all()
+        if columns is not None:
+            query = select(*TaskRepository._columns(columns)).order_by(Task.id).execution_options(yield_per=batch_size)
+            return db.session.execute(query).partitions()
+        query = select(Task).order_by(Task.id).execution_options(yield_per=batch_size)
+        return db.session.scalars(query).partitions()
 
     @staticmethod
     def create_task(name: str, priority: int) -> Task:
@@ -40,21 +517,43 @@ class TaskRepository:
         return task
 
     @staticmethod
-    def update_task_by_id(id: int, name: str, priority: int) -> Task:
+    def create_tasks(tasks: list[dict]) -> list[int]:
+        """
+        Create and insert several tasks in a single transaction.
+        Rows are sent with multi-row INSERT statements instead of one statement per task.
+
+        :param tasks: list of dicts with the name and the priority of each task
+        :return: ids of the created tasks, in the order of tasks
+        """
+        if not tasks:
+            return []
+        # RETURNING does not guarantee the order of the rows: asking for it would make SQLAlchemy fall back to one
+        # INSERT per row. The rows are inserted in the order of tasks, and SQLite gives each new row a greater id than
+        # the previous ones while the transaction holds the write lock, so sorting the ids restores the order of tasks.
+        ids = db.session.scalars(insert(Task).returning(Task.id), tasks).all()
+        db.session.commit()
+        return sorted(ids)
+
+    @staticmethod
+    def update_task_by_id(id: int, name: str = None, priority: int = None) -> Row:
         """
-        Update existing task.
+        Update existing task with a single UPDATE ... RETURNING statement, without loading it first.
+        The fields left to None are not modified, updated_at is always set.
 
         :param id: task id
         :param name: new name for the task
         :param priority: new priority for the task
-        :return: updated task if task exists, None otherwise
+        :return: row (id, name, priority, created_at, updated_at) of the updated task if task exists, None otherwise
         """
-        task = db.session.get(Task, id)
-        if not task:
-            return None
-        task.name = name
-        task.priority = priority
+        values = {key: value for key, value in (('name', name), ('priority', priority)) if value is not None}
+        query = update(Task) \
+            .where(Task.id == id) \
+            .values(**values, updated_at=datetime.now()) \
+            .returning(Task.id, Task.name, Task.priority, Task.created_at, Task.updated_at)
+        task = db.session.execute(query, execution_options={'synchronize_session': False}).first()
         db.session.commit()
+        if task is not None:
+            task_cache.delete(id)
         return task
 
     @staticmethod
@@ -70,16 +569,114 @@ class TaskRepository:
             return False
         db.session.delete(task)
         db.session.commit()
+        task_cache.delete(id)
         return True
 
     @staticmethod
-    def delete_all_tasks() -> None:
+    def delete_all_tasks() -> int:
         """
-        Delete all tasks.
+        Delete all tasks with a single DELETE statement.
 
-        :return: None
+        :return: number of deleted tasks
+        """
+        result = db.session.execute(delete(Task))
+        db.session.commit()
+        task_cache.clear()
+        return result.rowcount
+
+    @staticmethod
+    def delete_tasks(ids: list[int] = None, priority: int = None, created_from: datetime = None,
+                     created_to: datetime = None) -> int:
+        """
+        Delete the tasks matching all the specified filters with a single DELETE statement.
+        The deleted ids are not fetched: the cached tasks are invalidated by id if ids is specified, all of them
+        otherwise.
+
+        :param ids: task ids
+        :param priority: priority of the tasks
+        :param created_from: minimum creation date (inclusive)
+        :param created_to: maximum creation date (exclusive)
+        :return: number of deleted tasks
+        """
+        query = delete(Task)
+        if ids is not None:
+            query = query.where(Task.id.in_(ids))
+        if priority is not None:
+            query = query.where(Task.priority == priority)
+        if created_from is not None:
+            query = query.where(Task.created_at >= created_from)
+        if created_to is not None:
+            query = query.where(Task.created_at < created_to)
+        result = db.session.execute(query)
+        db.session.commit()
+        if ids is None:
+            task_cache.clear()
+        else:
+            for id in ids:
+                task_cache.delete(id)
+        return result.rowcount
+
+    @staticmethod
+    def claim_task(owner: str, lease_seconds: float) -> Row:
+        """
+        Claim the task with the highest priority (the lowest value, then the lowest id) that is not leased, or whose
+        lease expired, with a single conditional UPDATE ... RETURNING: the task is selected and leased atomically,
+        so concurrent workers never claim the same task, and no lock is held after the statement. On dbs supporting
+        it, tasks locked by concurrent claims are skipped instead of waited for.
+        The lease does not change updated_at, the task itself is not modified.
+
+        :param owner: lease owner, needed to renew the lease or ack the task
+        :param lease_seconds: duration of the lease
+        :return: row (id, name, priority, created_at, updated_at, lease_owner, lease_expires_at), None if no task
+            can be claimed
+        """
+        now = datetime.now()
+        claimable = or_(Task.lease_expires_at.is_(None), Task.lease_expires_at <= now)
+        next_id = select(Task.id).where(claimable).order_by(Task.priority, Task.id).limit(1) \
+            .with_for_update(skip_locked=True).scalar_subquery()
+        query = update(Task) \
+            .where(Task.id == next_id, claimable) \
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds),
+                    updated_at=Task.updated_at) \
+            .returning(Task.id, Task.name, Task.priority, Task.created_at, Task.updated_at, Task.lease_owner,
+                       Task.lease_expires_at)
+        row = db.session.execute(query, execution_options={'synchronize_session': False}).first()
+        db.session.commit()
+        return row
+
+    @staticmethod
+    def renew_lease(id: int, owner: str, lease_seconds: float) -> datetime:
         """
-        tasks = Task.query.all()
-        for task in tasks:
-            db.session.delete(task)
-        db.session.commit()
\ No newline at end of file
+        Extend the lease of a claimed task, if it is still held by the owner.
+
+        :param id: task id
+        :param owner: lease owner returned by claim_task
+        :param lease_seconds: duration of the lease from now
+        :return: new expiration date of the lease, None if the task does not exist or the lease expired
+        """
+        now = datetime.now()
+        query = update(Task) \
+            .where(Task.id == id, Task.lease_owner == owner, Task.lease_expires_at > now) \
+            .values(lease_expires_at=now + timedelta(seconds=lease_seconds), updated_at=Task.updated_at) \
+            .returning(Task.lease_expires_at)
+        expires_at = db.session.execute(query, execution_options={'synchronize_session': False}).scalar()
+        db.session.commit()
+        return expires_at
+
+    @staticmethod
+    def ack_task(id: int, owner: str) -> bool:
+        """
+        Delete a claimed task once it has been processed, if the lease is still held by the owner.
+
+        :param id: task id
+        :param owner: lease owner returned by claim_task
+        :return: True if the task is deleted, False if it does not exist or the lease expired
+        """
+        query = delete(Task) \
+            .where(Task.id == id, Task.lease_owner == owner, Task.lease_expires_at > datetime.now()) \
+            .returning(Task.id)
+        acked = db.session.execute(query, execution_options={'synchronize_session': False}).first() is not None
+        db.session.commit()
+        if acked:
+            task_cache.delete(id)
+        return acked
@@ -1,5 +1,6 @@
+from sqlalchemy.exc import IntegrityError
 from app.models.user import User
-from app import db
+from app import db, read_replicas
 
 
 class UserRepository:
@@ -10,12 +11,13 @@ class UserRepository:
     @staticmethod
     def get_user_by_username(username: str) -> User:
         """
-        Get user by username.
+        Get user by username, from a read replica if configured.
 
         :param username: username of the user
         :return: user
         """
-        return User.query.filter_by(username=username).first()
+        with read_replicas.reading():
+            return User.query.filter_by(username=username).first()
 
     @staticmethod
     def create_user(username: str, password: str) -> bool:
@@ -24,12 +26,16 @@ class UserRepository:
 
         :param username: username
         :param password: plaintext password
-        :return:
+        :return: True if the user is created, False if the username already exists
         """
         if User.query.filter_by(username=username).first():
             return False
         user = User(username=username)
         user.set_password(password)
         db.session.add(user)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:  # the same username has been registered concurrently
+            db.session.rollback()
+            return False
         return True
@@ -0,0 +1,63 @@
+import json
+import random
+import time
+
+from flask import Flask, Response, current_app, g, request
+
+
+def request_details() -> dict:
+    """
+    Collect the request details to be logged, according to the app config:
+
+    - LOG_REQUEST_HEADERS: names of the headers to be logged, other headers (e.g. Authorization) are never logged
+    - LOG_REQUEST_BODY_MAX_BYTES: maximum number of body bytes to be logged, 0 to skip the body
+
+    :return: dict with the selected headers and the (truncated) body
+    """
+    details = {}
+    headers = {name: request.headers[name] for name in current_app.config['LOG_REQUEST_HEADERS']
+               if name in request.headers}
+    if headers:
+        details['headers'] = headers
+    max_bytes = current_app.config['LOG_REQUEST_BODY_MAX_BYTES']
+    if max_bytes and request.content_length:
+        # at most max_bytes are read if the body has not been read, e.g. on 401 or 404, so that a large upload is not
+        # buffered; if it has been read by a handler parsing it, the stream is exhausted and the cached body is used
+        body = request.stream.read(max_bytes) or request.get_data(cache=True)[:max_bytes]
+        details['body'] = body.decode('utf-8', errors='replace')
+        if request.content_length > max_bytes:
+            details['body_truncated'] = True
+    return details
+
+
+def register_request_logging(app: Flask) -> None:
+    """
+    Register the hooks writing one structured access log line per request on the app.access logger.
+    Only a sample of the requests is logged (LOG_REQUEST_SAMPLE_RATE), except for the ones failed with 5xx.
+
+    :param app: app
+    :return: None
+    """
+    access_logger = app.logger.getChild('access')
+
+    @app.before_request
+    def start_request_timer() -> None:
+        g.request_start = time.perf_counter()
+
+    @app.after_request
+    def log_request(response: Response) -> Response:
+        sampled = random.random() < current_app.config['LOG_REQUEST_SAMPLE_RATE']
+        if not sampled and response.status_code < 500:
+            return response
+        start = g.get('request_start')
+        entry = {
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': response.status_code,
+            'duration_ms': None if start is None else round((time.perf_counter() - start) * 1000, 3),
+            'size': response.content_length,
+            'remote_addr': request.remote_addr,
+            **request_details()
+        }
+        access_logger.info(json.dumps(entry))
+        return response
@@ -0,0 +1,155 @@
+import hashlib
+import math
+import threading
+import time
+
+from datetime import datetime
+from typing import Iterator
+from flask import Flask, current_app
+from flask_jwt_extended import JWTManager
+
+
+class BloomFilter:
+    """
+    Set of strings answering membership queries with no false negatives and a bounded rate of false positives,
+    in a bit array of a few bits per item. Items cannot be removed.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))  # bits
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # double hashing: the positions are h1 + i * h2, from a single 128 bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item: str) -> None:
+        """
+        Add an item to the filter.
+
+        :param item: item
+        :return: None
+        """
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def __len__(self):
+        return self.count
+
+
+class BlocklistState:
+    """
+    Bloom filter of the revoked tokens of an app and state of its synchronization with the revoked_token table.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float, rebuild_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.last_id = 0  # greatest id of the revoked_token rows added to the filter
+        self.synced_at = None
+        self.rebuilt_at = None
+        self.lookups = 0  # revoked_token lookups, i.e. filter hits
+        self.lock = threading.Lock()
+
+
+class TokenBlocklist:
+    """
+    Token revocation extension. Revoked tokens are stored in the revoked_token table until they expire, and their
+    jti are added to a Bloom filter in the memory of the process, so that the table is only queried for the tokens
+    found in the filter: the tokens never revoked, i.e. almost all of them, are accepted without a db query.
+    It is configured by:
+
+    - TOKEN_BLOCKLIST_BLOOM_CAPACITY: revocations expected at the same time, the filter grows if they are more
+    - TOKEN_BLOCKLIST_BLOOM_ERROR_RATE: fraction of the valid tokens that are looked up in the table
+    - TOKEN_BLOCKLIST_SYNC_INTERVAL: seconds between two loads of the revocations made by the other processes
+    - TOKEN_BLOCKLIST_REBUILD_INTERVAL: seconds between two rebuilds of the filter, which drop the expired tokens
+
+    Revocations made by the current process are added to its filter immediately.
+    """
+
+    def __init__(self, jwt: JWTManager, app: Flask = None):
+        jwt.token_in_blocklist_loader(self._is_revoked)
+        if app is not None:
+            self.init_app(app)
+
+    @staticmethod
+    def init_app(app: Flask) -> None:
+        """
+        Bind the blocklist to an app.
+
+        :param app: app
+        :return: None
+        """
+        from app.models.revoked_token import RevokedToken  # registers the table, so that db.create_all creates it
+        app.extensions['token_blocklist'] = BlocklistState(
+            app.config.get('TOKEN_BLOCKLIST_BLOOM_CAPACITY', 100000),
+            app.config.get('TOKEN_BLOCKLIST_BLOOM_ERROR_RATE', 0.001),
+            app.config.get('TOKEN_BLOCKLIST_SYNC_INTERVAL', 1),
+            app.config.get('TOKEN_BLOCKLIST_REBUILD_INTERVAL', 3600),
+        )
+
+    @staticmethod
+    def _state() -> BlocklistState:
+        return current_app.extensions.get('token_blocklist')
+
+    @staticmethod
+    def _sync(state: BlocklistState) -> None:
+        now = time.monotonic()
+        if state.synced_at is not None and now - state.synced_at < state.sync_interval:
+            return
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+        with state.lock:
+            if state.synced_at is not None and now - state.synced_at < state.sync_interval:
+                return  # synced by another thread meanwhile
+            if state.rebuilt_at is None or now - state.rebuilt_at >= state.rebuild_interval:
+                RevokedTokenRepository.delete_expired()
+                revoked = RevokedTokenRepository.get_revoked_after()
+                bloom = BloomFilter(max(state.capacity, 2 * len(revoked)), state.error_rate)
+                state.rebuilt_at = now
+            else:
+                revoked = RevokedTokenRepository.get_revoked_after(state.last_id)
+                bloom = state.bloom
+            for row_id, jti in revoked:
+                bloom.add(jti)
+            state.last_id = revoked[-1][0] if revoked else state.last_id
+            state.bloom = bloom
+            state.synced_at = now
+
+    def _is_revoked(self, jwt_header: dict, jwt_payload: dict) -> bool:
+        state = self._state()
+        if state is None:
+            return False
+        self._sync(state)
+        if jwt_payload['jti'] not in state.bloom:
+            return False
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+        state.lookups += 1
+        return RevokedTokenRepository.is_revoked(jwt_payload['jti'])
+
+    def revoke(self, jwt_payload: dict) -> bool:
+        """
+        Revoke a token until it expires.
+
+        :param jwt_payload: claims of the token
+        :return: True if the token is revoked, False if it was already revoked
+        """
+        from app.repositories.revoked_token_repository import RevokedTokenRepository
+        expires_at = datetime.fromtimestamp(jwt_payload['exp']) if 'exp' in jwt_payload else datetime.max
+        revoked = RevokedTokenRepository.revoke(jwt_payload['jti'], jwt_payload['type'], expires_at)
+        state = self._state()
+        if state is not None:
+            with state.lock:  # not lost by a rebuild running meanwhile
+                state.bloom.add(jwt_payload['jti'])
+        return revoked
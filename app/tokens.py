@@ -0,0 +1,43 @@
+import hashlib
+import time
+
+from flask_jwt_extended import JWTManager
+from flask_jwt_extended.config import config
+from app.cache import Cache
+
+
+class CachingJWTManager(JWTManager):
+    """
+    JWTManager keeping the claims of the verified tokens in a cache until they expire, so that a token sent again
+    is not decoded and its signature is not verified again. The cache is keyed on a digest of the token and of the
+    decode key, so rotating JWT_SECRET_KEY invalidates all the entries.
+
+    Only the decoding is cached: the checks run after it by flask_jwt_extended (token type, freshness, revocation
+    through the token_in_blocklist_loader callback, custom verification) still run on every request, so a revoked
+    token is rejected without being removed from the cache.
+
+    The decoding is hooked by overriding _decode_jwt_from_config, a private method of flask_jwt_extended: the version
+    is pinned in requirements.txt and test_requests_decode_cached fails if another version stops calling it.
+    """
+
+    def __init__(self, cache: Cache, *args, **kwargs):
+        self.cache = cache
+        super().__init__(*args, **kwargs)
+
+    @staticmethod
+    def _cache_key(encoded_token: str) -> str:
+        return hashlib.sha256(f'{config.decode_key}:{encoded_token}'.encode()).hexdigest()
+
+    def _decode_jwt_from_config(self, encoded_token: str, csrf_value=None, allow_expired: bool = False) -> dict:
+        if csrf_value is not None or allow_expired:
+            return super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        key = self._cache_key(encoded_token)
+        claims = self.cache.get(key)
+        if claims is not None:
+            return dict(claims)  # callers must not modify the cached claims
+        claims = super()._decode_jwt_from_config(encoded_token, csrf_value, allow_expired)
+        if 'exp' in claims:  # tokens without expiration are never cached
+            ttl = claims['exp'] - time.time()
+            if ttl > 0:
+                self.cache.set(key, dict(claims), ttl=ttl)
+        return claims
@@ -0,0 +1,15 @@
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.aio import create_async_app
+from os import getenv
+from config import get_config
+
+
+# served by an ASGI server, e.g. hypercorn asgi:app --bind 127.0.0.1:5000
+app = create_async_app(get_config())
+
+if __name__ == '__main__':
+    app.logger.info('running async app')
+    app.run(port=getenv("FLASK_PORT"))
@@ -0,0 +1,5 @@
+"""
+Performance benchmarks. They are not collected by pytest: run them as modules, e.g.
+
+    python -m benchmarks.login_throughput --help
+"""
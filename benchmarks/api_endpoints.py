@@ -0,0 +1,343 @@
+"""
+Throughput and latency of the API endpoints on synthetic datasets.
+
+For each dataset size, a file database is seeded with the given number of tasks and users, then every endpoint is
+driven by concurrent clients through the Flask test client and/or a real local HTTP server. The results (requests
+per second, p50/p95/p99 latency, errors and peak RSS) are printed and optionally written to a JSON file, which can be
+used as the baseline of later runs: endpoints whose throughput or p95 latency got worse than the tolerance are
+reported as regressions and make the benchmark exit with status 1.
+
+    python -m benchmarks.api_endpoints --tasks 1000 100000 --users 100 --transport client server --output run.json
+    python -m benchmarks.api_endpoints --tasks 1000 100000 --users 100 --baseline run.json
+    python -m benchmarks.api_endpoints --tasks 10000 --endpoints list --fast-serialization --baseline run.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import Flask
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+from werkzeug.serving import WSGIRequestHandler, make_server
+from app import create_app, db, limiter, password_hasher
+from app.models.task import Task
+from app.models.user import User
+from app.repositories.task_repository import encode_cursor
+from benchmarks.common import make_config, peak_rss_mb, percentile
+
+PASSWORD = 'Benchmark123#'
+SEED_BATCH_SIZE = 10000
+ENDPOINTS = ('list', 'get', 'create', 'update', 'delete', 'login', 'refresh')
+
+
+class ClientTransport:
+    """
+    Send requests through the Flask test client, without network and server overhead.
+    """
+    name = 'client'
+
+    def __init__(self, app: Flask):
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body: dict = None, token: str = None) -> (int, bytes):
+        if not hasattr(self._local, 'client'):
+            self._local.client = self.app.test_client()
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self._local.client.open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.data
+
+    def close(self) -> None:
+        pass
+
+
+class KeepAliveRequestHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'  # reuse the connection of each client thread
+
+
+class ServerTransport:
+    """
+    Send requests over HTTP to a threaded werkzeug server running the app on a local port.
+    """
+    name = 'server'
+
+    def __init__(self, app: Flask):
+        self.server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveRequestHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self._local = threading.local()
+        self._connections = []
+
+    def request(self, method: str, path: str, body: dict = None, token: str = None) -> (int, bytes):
+        if not hasattr(self._local, 'connection'):
+            self._local.connection = http.client.HTTPConnection('127.0.0.1', self.server.port)
+            self._connections.append(self._local.connection)
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        data = None
+        if body is not None:
+            data = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        self._local.connection.request(method, path, body=data, headers=headers)
+        response = self._local.connection.getresponse()
+        return response.status, response.read()
+
+    def close(self) -> None:
+        for connection in self._connections:
+            connection.close()
+        self.server.shutdown()
+        self.thread.join()
+
+
+TRANSPORTS = {transport.name: transport for transport in (ClientTransport, ServerTransport)}
+
+
+def seed(app: Flask, tasks: int, users: int, rng: random.Random) -> None:
+    """
+    Insert the synthetic dataset: tasks with random priorities and creation dates in the last year, users with the
+    same password. The password is hashed once, so that seeding many users does not take many hashes.
+    """
+    now = datetime.now()
+    with app.app_context():
+        password_hash = generate_password_hash(PASSWORD, **password_hasher.options())
+        connection = db.session.connection()
+        for start in range(0, users, SEED_BATCH_SIZE):
+            connection.execute(insert(User), [
+                {'username': f'user{i}', 'password_hash': password_hash, 'created_at': now, 'updated_at': now}
+                for i in range(start, min(start + SEED_BATCH_SIZE, users))
+            ])
+        for start in range(0, tasks, SEED_BATCH_SIZE):
+            rows = []
+            for i in range(start, min(start + SEED_BATCH_SIZE, tasks)):
+                created_at = now - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+                rows.append({'name': f'task {i}', 'priority': rng.randint(1, 5), 'created_at': created_at,
+                             'updated_at': created_at})
+            connection.execute(insert(Task), rows)
+        db.session.commit()
+
+
+class Scenario:
+    """
+    State shared by the requests of a benchmark run: tokens of the users and ids of the tasks.
+    """
+
+    def __init__(self, app: Flask, tasks: int, users: int, seed: int):
+        self.tasks = tasks
+        self.users = users
+        self.seed = seed
+        self.created_ids = []  # tasks created by the 'create' endpoint, deleted by the 'delete' endpoint
+        self._lock = threading.Lock()
+        with app.app_context():
+            identities = [f'user{i}' for i in range(min(users, 100))]
+            self.access_tokens = [create_access_token(identity=identity) for identity in identities]
+            self.refresh_tokens = [create_refresh_token(identity=identity) for identity in identities]
+
+    def call(self, transport, endpoint: str, i: int) -> int:
+        """
+        Send the i-th request of an endpoint.
+
+        :return: status code
+        """
+        rng = random.Random(self.seed * 1000003 + i)
+        token = self.access_tokens[i % len(self.access_tokens)]
+        task_id = rng.randint(1, self.tasks)
+        if endpoint == 'list':
+            cursor = encode_cursor([rng.randint(0, self.tasks)])
+            status, _ = transport.request('GET', f'/api/tasks?limit=100&after={cursor}', token=token)
+        elif endpoint == 'get':
+            status, _ = transport.request('GET', f'/api/tasks/{task_id}', token=token)
+        elif endpoint == 'create':
+            status, data = transport.request('POST', '/api/tasks', {'name': f'new task {i}', 'priority': 1},
+                                             token=token)
+            if status == 201:
+                with self._lock:
+                    self.created_ids.append(json.loads(data)['id'])
+        elif endpoint == 'update':
+            body = {'name': f'updated task {task_id}', 'priority': rng.randint(1, 5)}
+            status, _ = transport.request('PUT', f'/api/tasks/{task_id}', body, token=token)
+        elif endpoint == 'delete':
+            with self._lock:
+                task_id = self.created_ids.pop() if self.created_ids else task_id
+            status, _ = transport.request('DELETE', f'/api/tasks/{task_id}', token=token)
+        elif endpoint == 'login':
+            body = {'username': f'user{rng.randrange(self.users)}', 'password': PASSWORD}
+            status, _ = transport.request('POST', '/api/login', body)
+        elif endpoint == 'refresh':
+            refresh_token = self.refresh_tokens[i % len(self.refresh_tokens)]
+            status, _ = transport.request('POST', '/api/refresh', token=refresh_token)
+        else:
+            raise ValueError(f'unknown endpoint {endpoint}')
+        return status
+
+
+def measure(scenario: Scenario, transport, endpoint: str, args: argparse.Namespace) -> dict:
+    """
+    Send the requests of an endpoint from concurrent threads and measure them.
+
+    :return: result of the endpoint
+    """
+    for i in range(args.warmup):
+        scenario.call(transport, endpoint, -1 - i)
+    latencies, statuses = [], []
+
+    def call(i):
+        start = time.perf_counter()
+        status = scenario.call(transport, endpoint, i)
+        latencies.append(time.perf_counter() - start)
+        statuses.append(status)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.threads) as executor:
+        futures = [executor.submit(call, i) for i in range(args.requests)]
+    elapsed = time.perf_counter() - start
+    for future in futures:
+        future.result()  # raise the errors of the client threads, if any
+    errors = sum(1 for status in statuses if status >= 400)
+    return {
+        'tasks': scenario.tasks,
+        'transport': transport.name,
+        'endpoint': endpoint,
+        'requests': len(statuses),
+        'errors': errors,
+        'throughput_rps': (len(statuses) - errors) / elapsed,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p95_ms': percentile(latencies, 95) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run(tasks: int, args: argparse.Namespace) -> list[dict]:
+    """
+    Seed a dataset of the given size and benchmark the endpoints on it.
+
+    :return: results of the endpoints
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        config = make_config(f'sqlite:///{os.path.join(directory, "benchmark.db")}',
+                             LOG_FILE=os.path.join(directory, 'app.log'), LOG_REQUEST_SAMPLE_RATE=0,
+                             METRICS_ENABLED=False, PASSWORD_HASH_METHOD=args.method,
+                             TASKS_FAST_SERIALIZATION=args.fast_serialization)
+        app = create_app(config)
+        app.logger.setLevel(logging.ERROR)  # do not measure the logging of every request
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        limiter.enabled = False
+        with app.app_context():
+            db.create_all()
+        start = time.perf_counter()
+        seed(app, tasks, args.users, random.Random(args.seed))
+        print(f'seeded {tasks} tasks and {args.users} users in {time.perf_counter() - start:.1f} s', file=sys.stderr)
+        scenario = Scenario(app, tasks, args.users, args.seed)
+        for name in args.transport:
+            transport = TRANSPORTS[name](app)
+            try:
+                for endpoint in args.endpoints:
+                    results.append(measure(scenario, transport, endpoint, args))
+                    print_result(results[-1])
+            finally:
+                transport.close()
+        if 'password_hasher' in app.extensions and app.extensions['password_hasher'].executor is not None:
+            app.extensions['password_hasher'].executor.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+    return results
+
+
+def print_result(result: dict, baseline: dict = None) -> None:
+    line = (f'{result["tasks"]:>8} {result["transport"]:>9} {result["endpoint"]:>8} {result["requests"]:>8} '
+            f'{result["errors"]:>6} {result["throughput_rps"]:>9.1f} {result["p50_ms"]:>8.2f} {result["p95_ms"]:>8.2f} '
+            f'{result["p99_ms"]:>8.2f} {result["peak_rss_mb"]:>8.1f}')
+    if baseline is not None:
+        line += (f' {change(result["throughput_rps"], baseline["throughput_rps"]):>+8.1%}'
+                 f' {change(result["p95_ms"], baseline["p95_ms"]):>+8.1%}')
+    print(line)
+
+
+def change(value: float, baseline: float) -> float:
+    return (value - baseline) / baseline if baseline else 0.0
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[dict]:
+    """
+    Compare the results with the ones of a baseline run.
+
+    :param results: results of this run
+    :param baseline: results of the baseline run
+    :param tolerance: relative change of throughput or p95 latency tolerated before reporting a regression
+    :return: results got worse than the tolerance
+    """
+    baseline = {(result['tasks'], result['transport'], result['endpoint']): result for result in baseline}
+    print(f'\n{"tasks":>8} {"transport":>9} {"endpoint":>8} {"requests":>8} {"errors":>6} {"req/s":>9} '
+          f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"rss MB":>8} {"Δ req/s":>8} {"Δ p95":>8}')
+    regressions = []
+    for result in results:
+        base = baseline.get((result['tasks'], result['transport'], result['endpoint']))
+        if base is None:
+            continue
+        print_result(result, base)
+        if change(result['throughput_rps'], base['throughput_rps']) < -tolerance \
+                or change(result['p95_ms'], base['p95_ms']) > tolerance or result['errors'] > base['errors']:
+            regressions.append(result)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, nargs='+', default=[1000], help='dataset sizes, e.g. 1000 1000000')
+    parser.add_argument('--users', type=int, default=100, help='users in the dataset')
+    parser.add_argument('--transport', nargs='+', choices=TRANSPORTS, default=list(TRANSPORTS),
+                        help='test client and/or local HTTP server')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument('--requests', type=int, default=500, help='requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='requests per endpoint sent before measuring')
+    parser.add_argument('--threads', type=int, default=8, help='concurrent clients')
+    parser.add_argument('--method', default='pbkdf2:sha256:1000',
+                        help='PASSWORD_HASH_METHOD, cheap by default so that login measures the API and not the hash')
+    parser.add_argument('--fast-serialization', action='store_true',
+                        help='TASKS_FAST_SERIALIZATION, compare with a --baseline run without it')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the dataset and of the requests')
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--baseline', help='compare the results with the ones of this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative change reported as regression')
+    args = parser.parse_args()
+
+    print(f'{"tasks":>8} {"transport":>9} {"endpoint":>8} {"requests":>8} {"errors":>6} {"req/s":>9} '
+          f'{"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"rss MB":>8}')
+    results = []
+    for tasks in args.tasks:
+        results += run(tasks, args)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'date': datetime.now().isoformat(),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'cpus': os.cpu_count(),
+                    'args': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+                },
+                'results': results,
+            }, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+        for result in regressions:
+            print(f'regression: {result["transport"]} {result["endpoint"]} with {result["tasks"]} tasks',
+                  file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
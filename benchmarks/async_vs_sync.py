@@ -0,0 +1,223 @@
+"""
+Throughput and latency of the sync app on a threaded WSGI server (werkzeug) and of the async app on an ASGI server
+(hypercorn), under the same concurrent load, with and without many idle client connections.
+
+Each server runs in its own process on the same seeded file database. The idle connections are opened and stay
+silent, as slow clients or clients between two requests do, while the active clients send GET /api/tasks/<id> and
+GET /api/tasks?limit=10 in a loop over their own connections, kept alive when the server allows it (werkzeug closes
+them after each response). The number of threads of the server process is sampled during the load: the threaded
+server holds a thread per open connection, the async server a loop thread and the threads of the db driver.
+
+    python -m benchmarks.async_vs_sync --tasks 10000 --idle 0 500 --clients 50 --duration 10
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import tempfile
+import time
+
+from multiprocessing import get_context
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+from app import create_app, db, limiter
+from app.models.task import Task
+from benchmarks.common import make_config, percentile
+
+MODES = ['sync', 'async']
+CONNECT_BATCH_SIZE = 50  # connections opened at the same time, below the listen backlog of the servers
+SEED_BATCH_SIZE = 10000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def benchmark_config(directory: str) -> type:
+    """
+    Config of the apps, on the database of the run directory. Built in each process, config classes are not picklable.
+    """
+    return make_config(f'sqlite:///{os.path.join(directory, "benchmark.db")}',
+                       LOG_FILE=os.path.join(directory, 'app.log'), LOG_REQUEST_SAMPLE_RATE=0,
+                       SQL_PROFILER_ENABLED=False)
+
+
+def serve(mode: str, directory: str, port: int, keep_alive_timeout: float) -> None:
+    """
+    Serve the sync or the async app on a local port until the process is terminated.
+    """
+    config = benchmark_config(directory)
+    if mode == 'sync':
+        from werkzeug.serving import make_server
+        from benchmarks.api_endpoints import KeepAliveRequestHandler
+        app = create_app(config)
+        limiter.enabled = False
+        app.logger.setLevel(logging.ERROR)  # do not measure the logging of every request
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        make_server('127.0.0.1', port, app, threaded=True, request_handler=KeepAliveRequestHandler).serve_forever()
+    else:
+        from hypercorn.asyncio import serve as serve_asgi
+        from hypercorn.config import Config as HypercornConfig
+        from app.aio import create_async_app
+        hypercorn_config = HypercornConfig()
+        hypercorn_config.bind = [f'127.0.0.1:{port}']
+        hypercorn_config.keep_alive_timeout = keep_alive_timeout
+        hypercorn_config.accesslog = hypercorn_config.errorlog = None
+        app = create_async_app(config)
+        app.logger.setLevel(logging.ERROR)
+        asyncio.run(serve_asgi(app, hypercorn_config))
+
+
+def thread_count(pid: int) -> int:
+    """
+    Number of threads of a process, 0 if not available (Linux only).
+    """
+    try:
+        return len(os.listdir(f'/proc/{pid}/task'))
+    except OSError:
+        return 0
+
+
+async def get(connection: tuple, path: str, token: str) -> (int, bool):
+    """
+    Send a GET request over a connection and read the whole response.
+
+    :return: status code, False if the server closes the connection after the response
+    """
+    reader, writer = connection
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Bearer {token}\r\n\r\n'.encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed by the server')
+    length, keep_alive = 0, True
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode().partition(':')
+        if name.lower() == 'content-length':
+            length = int(value)
+        elif name.lower() == 'connection' and value.strip().lower() == 'close':
+            keep_alive = False
+    await reader.readexactly(length)
+    return int(status_line.split()[1]), keep_alive
+
+
+async def connect(port: int, timeout: float = 10) -> tuple:
+    """
+    Open a connection, retrying until the server is listening.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await asyncio.open_connection('127.0.0.1', port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.1)
+
+
+async def load(port: int, pid: int, token: str, args: argparse.Namespace, idle: int) -> dict:
+    """
+    Open the idle connections, then run the active clients for the duration of the run.
+
+    :return: results of the run
+    """
+    rng = random.Random(args.seed)
+    connection = await connect(port)  # wait for the server
+    await get(connection, '/api/tasks/1', token)
+    connection[1].close()
+    idle_connections = []
+    for start in range(0, idle, CONNECT_BATCH_SIZE):
+        batch = range(start, min(start + CONNECT_BATCH_SIZE, idle))
+        idle_connections += await asyncio.gather(*(connect(port) for _ in batch))
+    latencies, errors, threads = [], 0, [thread_count(pid)]
+    deadline = time.monotonic() + args.duration
+
+    async def client(n: int):
+        nonlocal errors
+        connection = await connect(port)
+        i = 0
+        while time.monotonic() < deadline:
+            path = f'/api/tasks/{rng.randint(1, args.tasks)}' if (n + i) % 2 else '/api/tasks?limit=10'
+            start = time.perf_counter()
+            try:
+                status, keep_alive = await get(connection, path, token)
+            except (OSError, ValueError, IndexError, asyncio.IncompleteReadError):
+                status, keep_alive = None, False
+            if not keep_alive:
+                connection[1].close()
+                connection = await connect(port)
+            latencies.append(time.perf_counter() - start)
+            errors += status != 200
+            i += 1
+        connection[1].close()
+
+    async def sample_threads():
+        while time.monotonic() < deadline:
+            threads.append(thread_count(pid))
+            await asyncio.sleep(0.5)
+
+    await asyncio.gather(sample_threads(), *(client(n) for n in range(args.clients)))
+    for _, writer in idle_connections:
+        writer.close()
+    return {
+        'requests_per_second': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'errors': errors,
+        'threads': max(threads),
+    }
+
+
+def run(mode: str, directory: str, token: str, idle: int, args: argparse.Namespace) -> dict:
+    """
+    Serve the app in a new process and load it.
+
+    :return: results of the run
+    """
+    port = free_port()
+    process = get_context('spawn').Process(target=serve, args=(mode, directory, port, args.duration + 60), daemon=True)
+    process.start()
+    try:
+        return asyncio.run(load(port, process.pid, token, args, idle))
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--idle', type=int, nargs='+', default=[0, 500], help='idle connections')
+    parser.add_argument('--clients', type=int, default=50, help='active clients')
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        app = create_app(benchmark_config(directory))
+        rng = random.Random(args.seed)
+        with app.app_context():
+            db.create_all()
+            connection = db.session.connection()
+            for start in range(0, args.tasks, SEED_BATCH_SIZE):
+                connection.execute(insert(Task), [{'name': f'task {i}', 'priority': rng.randint(1, 5)}
+                                                  for i in range(start, min(start + SEED_BATCH_SIZE, args.tasks))])
+            db.session.commit()
+            token = create_access_token(identity='benchmark_user')
+        print(f'{"mode":>6} {"idle":>6} {"req/s":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"errors":>7} '
+              f'{"threads":>8}')
+        for idle in args.idle:
+            for mode in args.modes:
+                result = run(mode, directory, token, idle, args)
+                print(f'{mode:>6} {idle:>6} {result["requests_per_second"]:>8.0f} {result["p50_ms"]:>8.1f} '
+                      f'{result["p95_ms"]:>8.1f} {result["p99_ms"]:>8.1f} {result["errors"]:>7} '
+                      f'{result["threads"]:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Helpers shared by the benchmarks.
+"""
+import resource
+import sys
+
+from config import Config
+
+
+def make_config(database_uri: str, **settings) -> type:
+    """
+    Build the config class of a benchmark run.
+
+    :param database_uri: SQLALCHEMY_DATABASE_URI
+    :param settings: other config keys overriding the Config defaults
+    :return: config class
+    """
+    class BenchmarkConfig(Config):
+        JWT_SECRET_KEY = 'benchmark'
+        SQLALCHEMY_DATABASE_URI = database_uri
+    for key, value in settings.items():
+        setattr(BenchmarkConfig, key, value)
+    return BenchmarkConfig
+
+
+def percentile(values: list[float], p: float) -> float:
+    """
+    Nearest-rank percentile of values.
+    """
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10  # bytes on macOS, KB on Linux
@@ -0,0 +1,73 @@
+"""
+Time saved per request by the verified-JWT cache (JWT_CACHE_ENABLED).
+
+For each setting, the same access token is decoded repeatedly with decode_token, then sent with GET /api/tasks/<id>
+requests through the test client (the task is served from the task cache, so that the JWT handling is a large part
+of the request).
+
+    python -m benchmarks.jwt_decode --requests 5000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from flask_jwt_extended import create_access_token, decode_token
+from app import create_app, db, limiter
+from app.models.task import Task
+from benchmarks.common import make_config, percentile
+
+
+def run(enabled: bool, args: argparse.Namespace) -> dict:
+    """
+    Measure decode_token and GET /api/tasks/<id> with the JWT cache enabled or disabled.
+
+    :return: results of the run
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        config = make_config(f'sqlite:///{os.path.join(directory, "benchmark.db")}',
+                             LOG_FILE=os.path.join(directory, 'app.log'), LOG_REQUEST_SAMPLE_RATE=0,
+                             JWT_CACHE_ENABLED=enabled)
+        app = create_app(config)
+        limiter.enabled = False
+        with app.app_context():
+            db.create_all()
+            db.session.add(Task(name='task', priority=1))
+            db.session.commit()
+            token = create_access_token(identity='benchmark_user')
+            start = time.perf_counter()
+            for _ in range(args.decodes):
+                decode_token(token)
+            decode_us = (time.perf_counter() - start) / args.decodes * 1e6
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        latencies = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            client.get('/api/tasks/1', headers=headers)
+            latencies.append(time.perf_counter() - start)
+    return {
+        'decode_us': decode_us,
+        'request_mean_us': statistics.mean(latencies) * 1e6,
+        'request_p50_us': percentile(latencies, 50) * 1e6,
+        'request_p95_us': percentile(latencies, 95) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--decodes', type=int, default=20000, help='decode_token calls per setting')
+    parser.add_argument('--requests', type=int, default=5000, help='requests per setting')
+    args = parser.parse_args()
+    results = {enabled: run(enabled, args) for enabled in (False, True)}
+    print(f'{"jwt cache":>10} {"decode us":>10} {"request mean us":>16} {"request p50 us":>15} {"request p95 us":>15}')
+    for enabled, result in results.items():
+        print(f'{"on" if enabled else "off":>10} {result["decode_us"]:>10.1f} {result["request_mean_us"]:>16.1f} '
+              f'{result["request_p50_us"]:>15.1f} {result["request_p95_us"]:>15.1f}')
+    saving = results[False]['request_mean_us'] - results[True]['request_mean_us']
+    print(f'saving per request: {saving:.1f} us ({saving / results[False]["request_mean_us"]:.1%})')
+
+
+if __name__ == '__main__':
+    main()
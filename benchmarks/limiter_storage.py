@@ -0,0 +1,88 @@
+"""
+Hot-path overhead of the rate limiter storages: latency of one limit check (hit) with the in-memory storage of each
+process and with the SQLite storage shared by the processes of the host, from several threads and processes.
+
+    python -m benchmarks.limiter_storage --storages memory sqlite --processes 1 4 --threads 4 --hits 5000
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from app.rate_limiting import SQLiteStorage  # registers the sqlite scheme
+from benchmarks.common import percentile
+
+
+def hit_loop(uri: str, strategy: str, threads: int, hits: int, keys: int) -> (list[float], float):
+    """
+    Hit a limit from concurrent threads of the current process.
+
+    :return: latency of each hit, elapsed time, in seconds
+    """
+    limiter = STRATEGIES[strategy](storage_from_string(uri))
+    limit = parse('1000000 per hour')  # never reached, every hit updates the storage
+    latencies = []
+
+    def hit(n):
+        for i in range(hits):
+            start = time.perf_counter()
+            limiter.hit(limit, f'client{(n * hits + i) % keys}')
+            latencies.append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=hit, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return latencies, time.perf_counter() - start
+
+
+def run(uri: str, processes: int, args: argparse.Namespace) -> dict:
+    """
+    Hit a limit from the given number of processes.
+
+    :return: results of the run
+    """
+    with ProcessPoolExecutor(processes, mp_context=get_context('spawn')) as executor:
+        futures = [executor.submit(hit_loop, uri, args.strategy, args.threads, args.hits, args.keys)
+                   for _ in range(processes)]
+        results = [future.result() for future in futures]
+    latencies = [latency for process_latencies, _ in results for latency in process_latencies]
+    elapsed = max(process_elapsed for _, process_elapsed in results)
+    return {
+        'hits_per_second': len(latencies) / elapsed,
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p99_us': percentile(latencies, 99) * 1e6,
+        'max_us': max(latencies) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--storages', nargs='+', choices=['memory', 'sqlite'], default=['memory', 'sqlite'])
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='fixed-window', help='RATELIMIT_STRATEGY')
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, os.cpu_count() or 1])
+    parser.add_argument('--threads', type=int, default=4, help='threads per process')
+    parser.add_argument('--hits', type=int, default=5000, help='hits per thread')
+    parser.add_argument('--keys', type=int, default=100, help='distinct clients')
+    args = parser.parse_args()
+    print(f'{"storage":>8} {"processes":>10} {"hits/s":>10} {"p50 us":>8} {"p99 us":>8} {"max us":>9}')
+    with tempfile.TemporaryDirectory() as directory:
+        for storage in args.storages:
+            for processes in args.processes:
+                path = os.path.join(directory, f'limits_{processes}.db')
+                uri = 'memory://' if storage == 'memory' else f'sqlite:///{path}'
+                result = run(uri, processes, args)
+                print(f'{storage:>8} {processes:>10} {result["hits_per_second"]:>10.0f} {result["p50_us"]:>8.1f} '
+                      f'{result["p99_us"]:>8.1f} {result["max_us"]:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Login throughput under concurrency, with password hashing on the request threads or on the hasher process pool.
+
+While a burst of logins is running, a probe thread measures the latency of GET /api/tasks, to show how much the
+password hashes slow down the other endpoints.
+
+    python -m benchmarks.login_throughput --workers 0 2 4 --threads 16 --logins 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app, db, limiter
+from benchmarks.common import make_config, percentile
+from config import Config
+
+USERNAME = 'benchmark_user'
+PASSWORD = 'Benchmark123#'
+
+
+def run(workers: int, args: argparse.Namespace) -> dict:
+    """
+    Run a burst of logins with the given number of hasher workers.
+
+    :return: results of the run
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        config = make_config(f'sqlite:///{os.path.join(directory, "benchmark.db")}', PASSWORD_HASH_METHOD=args.method,
+                             PASSWORD_HASH_WORKERS=workers, PASSWORD_HASH_QUEUE_SIZE=args.queue_size)
+        app = create_app(config)
+        limiter.enabled = False
+        with app.app_context():
+            db.create_all()
+        client = app.test_client()
+        client.post('/api/register', json={'username': USERNAME, 'password': PASSWORD})
+        access_token = client.post('/api/login', json={'username': USERNAME, 'password': PASSWORD}).json['access_token']
+
+        statuses = []
+        probe_latencies = []
+        done = threading.Event()
+
+        def login():
+            response = app.test_client().post('/api/login', json={'username': USERNAME, 'password': PASSWORD})
+            statuses.append(response.status_code)
+
+        def probe():
+            probe_client = app.test_client()
+            while not done.is_set():
+                start = time.perf_counter()
+                probe_client.get('/api/tasks?limit=10', headers={'Authorization': f'Bearer {access_token}'})
+                probe_latencies.append(time.perf_counter() - start)
+                time.sleep(0.01)
+
+        probe_thread = threading.Thread(target=probe)
+        probe_thread.start()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(args.threads) as executor:
+            for _ in range(args.logins):
+                executor.submit(login)
+        elapsed = time.perf_counter() - start
+        done.set()
+        probe_thread.join()
+        if workers:
+            app.extensions['password_hasher'].executor.shutdown()
+    ok = statuses.count(200)
+    return {
+        'workers': workers,
+        'logins_per_second': ok / elapsed,
+        'ok': ok,
+        'rejected': statuses.count(503),
+        'tasks_p50_ms': percentile(probe_latencies, 50) * 1000,
+        'tasks_p95_ms': percentile(probe_latencies, 95) * 1000,
+        'tasks_max_ms': max(probe_latencies, default=float('nan')) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, os.cpu_count() or 1],
+                        help='hasher pool sizes to compare, 0 hashes on the request threads')
+    parser.add_argument('--threads', type=int, default=16, help='concurrent clients')
+    parser.add_argument('--logins', type=int, default=200, help='logins per run')
+    parser.add_argument('--queue-size', type=int, default=64, help='PASSWORD_HASH_QUEUE_SIZE')
+    parser.add_argument('--method', default=Config.PASSWORD_HASH_METHOD, help='PASSWORD_HASH_METHOD')
+    args = parser.parse_args()
+    print(f'{"workers":>8} {"logins/s":>10} {"ok":>6} {"503":>6} {"tasks p50 ms":>13} {"tasks p95 ms":>13} '
+          f'{"tasks max ms":>13}')
+    for workers in args.workers:
+        result = run(workers, args)
+        print(f'{result["workers"]:>8} {result["logins_per_second"]:>10.1f} {result["ok"]:>6} {result["rejected"]:>6} '
+              f'{result["tasks_p50_ms"]:>13.1f} {result["tasks_p95_ms"]:>13.1f} {result["tasks_max_ms"]:>13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Latency of the full-text search of GET /api/tasks/search (FTS5 index) against a naive LIKE '%word%' scan of task.name.
+
+A file database is seeded with tasks named by random words of a synthetic vocabulary with a Zipf-like frequency, so
+that the searches include rare and common words, then the first page of results of each query is read with both
+methods. The FTS5 index is filled by the triggers while seeding.
+
+    python -m benchmarks.task_search --tasks 1000000 --queries 200
+"""
+import argparse
+import itertools
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+from sqlalchemy import insert, select
+from app import create_app, db, limiter
+from app.models.task import Task
+from app.repositories.task_repository import TaskRepository
+from benchmarks.common import make_config, percentile
+
+SEED_BATCH_SIZE = 10000
+
+
+def vocabulary(size: int, rng: random.Random) -> list[str]:
+    """
+    Random words of 3 to 10 letters.
+    """
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(size)]
+
+
+def seed(tasks: int, words: list[str], rng: random.Random) -> None:
+    """
+    Insert tasks named by 2 to 6 words, the first words of the vocabulary being the most frequent.
+    """
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    connection = db.session.connection()
+    for start in range(0, tasks, SEED_BATCH_SIZE):
+        connection.execute(insert(Task), [
+            {'name': ' '.join(rng.choices(words, cum_weights=cum_weights, k=rng.randint(2, 6))),
+             'priority': rng.randint(1, 5)}
+            for _ in range(start, min(start + SEED_BATCH_SIZE, tasks))
+        ])
+    db.session.commit()
+
+
+def measure(search, queries: list[str]) -> dict:
+    """
+    Run the queries and measure their latency.
+
+    :return: results
+    """
+    latencies, found = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        found += len(search(query))
+        latencies.append(time.perf_counter() - start)
+    return {
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'max_ms': max(latencies) * 1e3,
+        'found': found / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=1000000)
+    parser.add_argument('--words', type=int, default=50000, help='size of the vocabulary')
+    parser.add_argument('--queries', type=int, default=200, help='queries per method')
+    parser.add_argument('--limit', type=int, default=100, help='results per page')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        config = make_config(f'sqlite:///{os.path.join(directory, "benchmark.db")}',
+                             LOG_FILE=os.path.join(directory, 'app.log'), LOG_REQUEST_SAMPLE_RATE=0,
+                             SQL_PROFILER_ENABLED=False)
+        app = create_app(config)
+        limiter.enabled = False
+        with app.app_context():
+            db.create_all()
+            words = vocabulary(args.words, rng)
+            start = time.perf_counter()
+            seed(args.tasks, words, rng)
+            print(f'seeded {args.tasks} tasks in {time.perf_counter() - start:.1f} s', file=sys.stderr)
+            # half of the queries are whole words, half are prefixes, as typed in a search box
+            queries = [word if i % 2 else word[:3] for i, word in enumerate(rng.choices(words, k=args.queries))]
+            methods = {
+                'like': lambda query: db.session.execute(
+                    select(Task.id, Task.name).where(Task.name.like(f'%{query}%')).limit(args.limit)
+                ).all(),
+                'fts5': lambda query: TaskRepository.search_tasks(query, args.limit)[0],
+            }
+            print(f'{"method":>8} {"p50 ms":>10} {"p95 ms":>10} {"max ms":>10} {"found":>8}')
+            for name, search in methods.items():
+                result = measure(search, queries)
+                print(f'{name:>8} {result["p50_ms"]:>10.2f} {result["p95_ms"]:>10.2f} {result["max_ms"]:>10.2f} '
+                      f'{result["found"]:>8.1f}')
+
+
+if __name__ == '__main__':
+    main()
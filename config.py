@@ -6,20 +6,65 @@ class Config:
     JWT_SECRET_KEY = getenv("JWT_SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = getenv("SQLALCHEMY_DATABASE_URI")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_REPLICA_URIS = [uri for uri in getenv("SQLALCHEMY_REPLICA_URIS", "").split(",") if uri]  # read-only
+    SQLALCHEMY_REPLICA_SELECTION = 'round_robin'  # 'round_robin' or 'least_busy' replica serving each read
+    LOG_FILE = 'logs/app.log'
+    LOG_REQUEST_SAMPLE_RATE = 1.0  # fraction of the requests written to the access log, 5xx are always logged
+    LOG_REQUEST_HEADERS = ('Content-Type', 'Content-Length', 'User-Agent')  # headers written to the access log
+    LOG_REQUEST_BODY_MAX_BYTES = 0  # request body bytes written to the access log, 0 to skip the body
+    SQL_PROFILER_ENABLED = True  # record the SQL statements of each request, needed by the db metrics
+    SQL_SLOW_QUERY_MS = 100  # statements slower than this are logged
+    SQL_N_PLUS_ONE_THRESHOLD = 10  # statements executed this many times by a request are logged as N+1 queries
+    RATELIMIT_STORAGE_URI = getenv("RATELIMIT_STORAGE_URI", "memory://")  # 'sqlite:///<path>' to share the limits
+    RATELIMIT_KEY_BY = 'remote_address'  # 'remote_address' or 'jwt_identity' (client address for anonymous requests)
+    METRICS_ENABLED = True  # Prometheus metrics at /metrics, the db ones only with SQL_PROFILER_ENABLED
+    METRICS_MULTIPROCESS_DIR = getenv("METRICS_MULTIPROCESS_DIR")  # shared by the workers of the host, if any
+    METRICS_FLUSH_INTERVAL = 5  # seconds between two writes of the metrics of a worker to METRICS_MULTIPROCESS_DIR
+    PASSWORD_HASH_METHOD = 'scrypt:32768:8:1'  # werkzeug generate_password_hash method and cost
+    PASSWORD_HASH_WORKERS = 2  # processes hashing passwords, 0 to hash on the request thread
+    PASSWORD_HASH_QUEUE_SIZE = 16  # hashing jobs waiting for a worker before answering 503
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+    PASSWORD_HASH_MP_CONTEXT = 'spawn'  # multiprocessing start method of the workers
+    TASK_CACHE_ENABLED = False  # read-through cache of GET /tasks/<task_id>, see TASK_CACHE_BACKEND
+    TASK_CACHE_BACKEND = 'memory'  # 'memory' (one worker only) or 'sqlite' (shared by the workers and the async app)
+    TASK_CACHE_MAX_SIZE = 1024
+    TASK_CACHE_TTL = 60  # seconds
+    TASK_CACHE_PATH = getenv("TASK_CACHE_PATH")  # sqlite backend only, <instance_path>/task_cache.db if not set
+    JWT_CACHE_ENABLED = False  # keep the claims of verified tokens until they expire, skipping signature checks
+    JWT_CACHE_BACKEND = 'memory'  # 'memory' (per process) or 'sqlite' (shared by the processes of the host)
+    JWT_CACHE_MAX_SIZE = 10000
+    JWT_CACHE_PATH = getenv("JWT_CACHE_PATH")  # sqlite backend only, <instance_path>/jwt_cache.db if not set
+    TOKEN_BLOCKLIST_BLOOM_CAPACITY = 100000  # revoked tokens not expired yet, sizes the in-memory Bloom filter
+    TOKEN_BLOCKLIST_BLOOM_ERROR_RATE = 0.001  # fraction of the valid tokens looked up in the revoked_token table
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = 1  # seconds before the revocations made by the other processes are enforced
+    TOKEN_BLOCKLIST_REBUILD_INTERVAL = 3600  # seconds between two rebuilds of the filter dropping the expired tokens
+    TASKS_PAGE_DEFAULT_LIMIT = 100  # page size used when GET /tasks is paginated without an explicit limit
+    TASKS_PAGE_MAX_LIMIT = 1000
+    TASKS_BATCH_MAX_SIZE = 10000  # maximum number of tasks created by POST /tasks/batch or deleted by id at once
+    TASKS_EXPORT_BATCH_SIZE = 1000  # rows fetched from the db at a time by GET /tasks/export
+    TASKS_FAST_SERIALIZATION = False  # encode task lists from plain rows instead of marshalling ORM objects
+    TASK_LEASE_SECONDS = 30  # lease of the tasks claimed by POST /tasks/claim without an explicit lease_seconds
+    TASK_LEASE_MAX_SECONDS = 3600
 
 
 class ProdConfig(Config):
     DEBUG = False
+    TASKS_FAST_SERIALIZATION = True
+    LOG_REQUEST_SAMPLE_RATE = 0.1
 
 
 class DevConfig(Config):
     DEBUG = True
+    LOG_REQUEST_BODY_MAX_BYTES = 1024
 
 
 class TestConfig(Config):
     DEBUG = True
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'  # cheap hashes to keep tests fast
+    PASSWORD_HASH_WORKERS = 0
+    TOKEN_BLOCKLIST_SYNC_INTERVAL = 3600  # local revocations are enforced at once anyway, keeps query counts stable
 
 
 def get_config():
@@ -0,0 +1,37 @@
+"""task_fts full-text index
+
+Revision ID: b7c1e9f4a2d6
+Revises: b3f9a6d2c8e1
+Create Date: 2026-10-18 20:52:08.114730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c1e9f4a2d6'
+down_revision = 'b3f9a6d2c8e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 tables and triggers are not detected by autogenerate
+    op.execute("CREATE VIRTUAL TABLE task_fts USING fts5("
+               "name, content='task', content_rowid='id', tokenize='unicode61 remove_diacritics 2')")
+    op.execute("CREATE TRIGGER task_fts_insert AFTER INSERT ON task BEGIN "
+               "INSERT INTO task_fts (rowid, name) VALUES (new.id, new.name); END")
+    op.execute("CREATE TRIGGER task_fts_delete AFTER DELETE ON task BEGIN "
+               "INSERT INTO task_fts (task_fts, rowid, name) VALUES ('delete', old.id, old.name); END")
+    op.execute("CREATE TRIGGER task_fts_update AFTER UPDATE OF name ON task BEGIN "
+               "INSERT INTO task_fts (task_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+               "INSERT INTO task_fts (rowid, name) VALUES (new.id, new.name); END")
+    op.execute("INSERT INTO task_fts (task_fts) VALUES ('rebuild')")  # index the existing tasks
+
+
+def downgrade():
+    op.execute("DROP TRIGGER task_fts_update")
+    op.execute("DROP TRIGGER task_fts_delete")
+    op.execute("DROP TRIGGER task_fts_insert")
+    op.execute("DROP TABLE task_fts")
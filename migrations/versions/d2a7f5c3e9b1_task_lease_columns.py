@@ -0,0 +1,27 @@
+"""task lease columns
+
+Revision ID: d2a7f5c3e9b1
+Revises: c4d8e2f6a1b3
+Create Date: 2026-10-18 22:15:07.631904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f5c3e9b1'
+down_revision = 'c4d8e2f6a1b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # plain ALTER TABLE ADD COLUMN: a batch operation would recreate task and drop its triggers
+    op.add_column('task', sa.Column('lease_owner', sa.String(length=80), nullable=True))
+    op.add_column('task', sa.Column('lease_expires_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('task', 'lease_expires_at')
+    op.drop_column('task', 'lease_owner')
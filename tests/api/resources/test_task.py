@@ -1,7 +1,13 @@
+import json
 import pytest
 
+from datetime import datetime
 from unittest.mock import patch, Mock
+from sqlalchemy import text
 from flask_jwt_extended import create_access_token
+from app import db, task_cache
+from app.profiling import record_queries
+from app.repositories.task_repository import TasksVersion, TaskStatsSummary
 
 
 @pytest.fixture
@@ -44,6 +50,24 @@ def test_get_task_by_id(mock_task_repo, existing_task, status_code, task, json_t
 
 
 
+@patch('app.api.resources.task.TaskRepository')
+def test_get_task_by_id_not_modified(mock_task_repo, task, client):
+    task.updated_at = datetime(2024, 2, 24, 10, 43, 27)
+    mock_task_repo.get_task_by_id.return_value = task
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.get(f'/api/tasks/{task.id}', headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    response = client.get(f'/api/tasks/{task.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    task.updated_at = datetime(2024, 2, 25)
+    response = client.get(f'/api/tasks/{task.id}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
 @patch('app.api.resources.task.TaskRepository')
 def test_post_task(mock_task_repo, task, json_task, client):
     access_token = create_access_token(identity='test_user')
@@ -58,6 +82,42 @@ def test_post_task(mock_task_repo, task, json_task, client):
     assert response.json == json_task
 
 
+@patch('app.api.resources.task.TaskRepository')
+def test_post_tasks_batch(mock_task_repo, client):
+    access_token = create_access_token(identity='test_user')
+    mock_task_repo.create_tasks.return_value = [1, 2]
+    response = client.post(
+        '/api/tasks/batch',
+        json=[{'name': 'Task 1', 'priority': 2}, {'name': 'Task 2'}],
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    mock_task_repo.create_tasks.assert_called_once_with(
+        [{'name': 'Task 1', 'priority': 2}, {'name': 'Task 2', 'priority': 1}]
+    )
+    assert response.status_code == 201
+    assert response.json == {'ids': [1, 2]}
+
+
+@pytest.mark.parametrize("payload, message", [
+    ([], 'non-empty list'),
+    ({'name': 'Task 1'}, 'non-empty list'),
+    ([{'name': 'Task 1'}, {'priority': 1}], 'Task 1: name'),
+    ([{'name': 'Task 1', 'priority': 'high'}], 'Task 0: priority'),
+    (['Task 1'], 'Task 0 must be an object'),
+])
+@patch('app.api.resources.task.TaskRepository')
+def test_post_tasks_batch_invalid(mock_task_repo, payload, message, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.post(
+        '/api/tasks/batch',
+        json=payload,
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    mock_task_repo.create_tasks.assert_not_called()
+    assert response.status_code == 400
+    assert message in response.json['message']
+
+
 @pytest.mark.parametrize("existing_task, status_code, message", [
     (True, 200, 'updated'),
     (False, 404, 'not found')
@@ -76,6 +136,37 @@ def test_put_task(mock_task_repo, existing_task, status_code, message, task, jso
     assert message in response.json['message']
 
 
+@pytest.mark.parametrize("payload", [{'name': None, 'priority': None}, {'name': None, 'priority': 1},
+                                     {'name': 'Task 2', 'priority': None}, {'name': 'Task 2'}, {}])
+@patch('app.api.resources.task.TaskRepository')
+def test_put_task_invalid(mock_task_repo, payload, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.put('/api/tasks/1', json=payload, headers={'Authorization': f'Bearer {access_token}'})
+    mock_task_repo.update_task_by_id.assert_not_called()
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("existing_task, status_code, message", [
+    (True, 200, 'updated'),
+    (False, 404, 'not found')
+])
+@pytest.mark.parametrize("payload", [{'name': 'Task 2'}, {'priority': 3}, {'name': 'Task 2', 'priority': 3}])
+@patch('app.api.resources.task.TaskRepository')
+def test_patch_task(mock_task_repo, payload, existing_task, status_code, message, task, client):
+    access_token = create_access_token(identity='test_user')
+    mock_task_repo.update_task_by_id.return_value = task if existing_task else None
+    response = client.patch(f'/api/tasks/{task.id}', json=payload, headers={'Authorization': f'Bearer {access_token}'})
+    mock_task_repo.update_task_by_id.assert_called_with(task.id, **payload)
+    assert response.status_code == status_code
+    assert message in response.json['message']
+
+
+@pytest.mark.parametrize("payload", [{}, [], {'name': ''}, {'priority': 'high'}, {'priority': True}, {'done': True}])
+def test_patch_task_invalid(payload, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.patch('/api/tasks/1', json=payload, headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 400
+
 
 @pytest.mark.parametrize("existing_task, status_code, message", [
     (True, 204, ''),
@@ -101,6 +192,7 @@ def test_delete_task(mock_task_repo, existing_task, status_code, message, client
 @patch('app.api.resources.task.TaskRepository')
 def test_get_all_tasks(mock_task_repo, client):
     mock_task_repo.get_all_tasks.return_value = []
+    mock_task_repo.get_tasks_version.return_value = TasksVersion(0, None, None)
     access_token = create_access_token(identity='test_user')
     response = client.get(
         '/api/tasks',
@@ -110,6 +202,91 @@ def test_get_all_tasks(mock_task_repo, client):
     assert response.json == []
 
 
+@pytest.mark.parametrize("conditional_header, status_code", [
+    ('If-None-Match', 304),
+    ('If-Modified-Since', 304),
+    (None, 200)
+])
+@patch('app.api.resources.task.TaskRepository')
+def test_get_all_tasks_not_modified(mock_task_repo, conditional_header, status_code, client):
+    mock_task_repo.get_all_tasks.return_value = []
+    mock_task_repo.get_tasks_page.return_value = [], None
+    mock_task_repo.get_tasks_version.return_value = TasksVersion(2, 3, datetime(2024, 2, 24, 10, 43, 27))
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.get('/api/tasks', headers=headers)
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    if conditional_header == 'If-None-Match':
+        headers[conditional_header] = response.headers['ETag']
+    elif conditional_header == 'If-Modified-Since':
+        headers[conditional_header] = response.headers['Last-Modified']
+    mock_task_repo.get_all_tasks.reset_mock()
+    response = client.get('/api/tasks', headers=headers)
+    assert response.status_code == status_code
+    if status_code == 304:
+        assert response.data == b''
+        mock_task_repo.get_all_tasks.assert_not_called()
+    # a different page of the list has a different ETag
+    response = client.get('/api/tasks?limit=1', headers={**headers, 'If-None-Match': response.headers['ETag']})
+    assert response.status_code == 200
+
+
+def test_get_tasks_page_invalid_cursor_not_modified(app, client):
+    """
+    Ensure that the arguments are validated before the ETag, so that a malformed cursor is never answered with 304.
+    """
+    headers = {'Authorization': f'Bearer {create_access_token(identity="test_user")}'}
+    response = client.get('/api/tasks?after=malformed', headers=headers)
+    assert response.status_code == 400
+    etag = client.get('/api/tasks', headers=headers).headers['ETag']
+    response = client.get('/api/tasks?after=malformed', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("next_cursor", ['WzJd', None])
+@patch('app.api.resources.task.TaskRepository')
+def test_get_tasks_page(mock_task_repo, next_cursor, task, json_task, client):
+    mock_task_repo.get_tasks_page.return_value = [task], next_cursor
+    mock_task_repo.get_tasks_version.return_value = TasksVersion(1, 1, datetime(2024, 2, 24))
+    access_token = create_access_token(identity='test_user')
+    response = client.get(
+        '/api/tasks?limit=1&sort=priority',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    mock_task_repo.get_tasks_page.assert_called_once_with(1, None, 'priority')
+    assert response.status_code == 200
+    assert response.json == [json_task]
+    assert response.headers.get('X-Next-Cursor') == next_cursor
+
+
+@patch('app.api.resources.task.TaskRepository')
+def test_get_tasks_page_invalid_cursor(mock_task_repo, client):
+    mock_task_repo.get_tasks_page.side_effect = ValueError('invalid cursor foo')
+    access_token = create_access_token(identity='test_user')
+    response = client.get(
+        '/api/tasks?after=foo',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 400
+    assert 'invalid cursor' in response.json['message']
+
+
+@patch('app.api.resources.task.TaskRepository')
+def test_export_tasks(mock_task_repo, task, json_task, client):
+    mock_task_repo.iter_task_batches.return_value = iter([[task, task], [task]])
+    access_token = create_access_token(identity='test_user')
+    response = client.get(
+        '/api/tasks/export',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    lines = response.data.decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == [json_task] * 3
+
+
 @patch('app.api.resources.task.TaskRepository')
 def test_delete_all_tasks(mock_task_repo, client):
     mock_task_repo.delete_all_tasks.return_value = None
@@ -119,3 +296,290 @@ def test_delete_all_tasks(mock_task_repo, client):
         headers={'Authorization': f'Bearer {access_token}'}
     )
     assert response.status_code == 204
+
+
+@pytest.mark.parametrize("query, filters", [
+    ('ids=1,2', {'ids': [1, 2]}),
+    ('priority=2', {'priority': 2}),
+    ('created_from=2024-02-24&created_to=2024-02-25T10:00:00',
+     {'created_from': datetime(2024, 2, 24), 'created_to': datetime(2024, 2, 25, 10)}),
+])
+@patch('app.api.resources.task.TaskRepository')
+def test_delete_tasks(mock_task_repo, query, filters, client):
+    mock_task_repo.delete_tasks.return_value = 3
+    access_token = create_access_token(identity='test_user')
+    response = client.delete(
+        f'/api/tasks?{query}',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    mock_task_repo.delete_tasks.assert_called_once_with(**filters)
+    mock_task_repo.delete_all_tasks.assert_not_called()
+    assert response.status_code == 200
+    assert response.json == {'deleted': 3}
+
+
+@pytest.mark.parametrize("query", ['ids=1,a', 'created_from=yesterday'])
+@patch('app.api.resources.task.TaskRepository')
+def test_delete_tasks_invalid_filters(mock_task_repo, query, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.delete(
+        f'/api/tasks?{query}',
+        headers={'Authorization': f'Bearer {access_token}'}
+    )
+    mock_task_repo.delete_tasks.assert_not_called()
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("method, url, budget", [
+    ('post', '/api/tasks', 2),
+    ('post', '/api/tasks/batch', 1),
+    ('get', '/api/tasks', 2),
+    ('get', '/api/tasks?limit=1&sort=priority', 2),
+    ('get', '/api/tasks/export', 1),
+    ('get', '/api/tasks/{id}', 1),
+    ('put', '/api/tasks/{id}', 1),
+    ('patch', '/api/tasks/{id}', 1),
+    ('delete', '/api/tasks?priority=3', 1),
+    ('delete', '/api/tasks/{id}', 2),
+    ('delete', '/api/tasks', 1),
+])
+def test_query_budget(method, url, budget, client, query_budget):
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.post('/api/tasks/batch', json=[{'name': 'Task 1', 'priority': 1}, {'name': 'Task 2'}],
+                           headers=headers)
+    url = url.format(id=response.json['ids'][0])
+    payload = [{'name': 'Task 3'}] if url.endswith('batch') else {'name': 'Task 3', 'priority': 3}
+    with query_budget(budget):
+        response = getattr(client, method)(url, json=payload if method in ('post', 'put', 'patch') else None,
+                                           headers=headers)
+    assert response.status_code < 300
+
+
+@pytest.mark.parametrize("url", [
+    '/api/tasks',
+    '/api/tasks?limit=2&sort=priority',
+    '/api/tasks/export',
+])
+def test_fast_serialization(url, app, client):
+    """
+    Ensure that the responses encoded from plain rows are the same as the marshalled ones, byte for byte.
+    """
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/api/tasks/batch', json=[{'name': 'Task "1"', 'priority': 2}, {'name': 'Täsk 2', 'priority': 1}],
+                headers=headers)
+    responses = []
+    for fast in (False, True):
+        app.config['TASKS_FAST_SERIALIZATION'] = fast
+        try:
+            response = client.get(url, headers=headers)
+            responses.append((response.status_code, response.get_data(), response.headers.get('X-Next-Cursor')))
+        finally:
+            app.config['TASKS_FAST_SERIALIZATION'] = False
+    assert responses[0][0] == 200
+    assert b'T\\u00e4sk 2' in responses[0][1]
+    assert responses[1] == responses[0]
+
+
+@pytest.mark.parametrize("url, keys, next_cursor", [
+    ('/api/tasks?fields=name,id', ['id', 'name'], False),
+    ('/api/tasks?fields=name&limit=1&sort=priority', ['name'], True),
+    ('/api/tasks?fields= priority ,created_at,priority&limit=1', ['priority', 'created_at'], True),
+])
+def test_get_tasks_fields(url, keys, next_cursor, client):
+    """
+    Ensure that only the requested fields are returned, in the order of task_model.
+    """
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/api/tasks/batch', json=[{'name': 'Task 1', 'priority': 2}, {'name': 'Task 2'}], headers=headers)
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.json
+    assert all(list(task) == keys for task in response.json)
+    assert ('X-Next-Cursor' in response.headers) is next_cursor
+
+
+@pytest.mark.parametrize("url", ['/api/tasks?fields=id,password', '/api/tasks?fields=', '/api/tasks/1?fields=foo'])
+def test_get_tasks_invalid_fields(url, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.get(url, headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 400
+    assert 'valid fields are id, name, priority, created_at, updated_at' in response.json['errors']['fields']
+
+
+def test_get_task_fields(app, client):
+    """
+    Ensure that only the columns of the requested fields, the id and updated_at are selected for a single task.
+    """
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.post('/api/tasks/batch', json=[{'name': 'Task 1', 'priority': 2}], headers=headers)
+    task_id = response.json['ids'][0]
+    full = client.get(f'/api/tasks/{task_id}', headers=headers)
+    task_cache.clear()
+    with record_queries() as queries:
+        response = client.get(f'/api/tasks/{task_id}?fields=name', headers=headers)
+    assert response.status_code == 200
+    assert response.json == {'name': 'Task 1'}
+    assert response.headers['ETag'] != full.headers['ETag']
+    assert response.headers['Last-Modified'] == full.headers['Last-Modified']
+    statement = next(query.statement for query in queries if 'FROM task' in query.statement)
+    assert 'task.priority' not in statement and 'task.created_at' not in statement
+    headers['If-None-Match'] = response.headers['ETag']
+    assert client.get(f'/api/tasks/{task_id}?fields=name', headers=headers).status_code == 304
+
+
+@patch('app.api.resources.task.TaskRepository')
+def test_get_tasks_filters(mock_task_repo, task, json_task, client):
+    """
+    Ensure that filters are passed to the repository and return a page of tasks sorted by the filtered column.
+    """
+    mock_task_repo.get_tasks_page.return_value = [task], None
+    mock_task_repo.get_tasks_version.return_value = TasksVersion(1, 1, datetime(2024, 2, 24))
+    access_token = create_access_token(identity='test_user')
+    response = client.get('/api/tasks?priority_min=1&priority_max=2&created_from=2024-02-24',
+                          headers={'Authorization': f'Bearer {access_token}'})
+    mock_task_repo.get_tasks_page.assert_called_once_with(100, None, None, priority_min=1, priority_max=2,
+                                                          created_from=datetime(2024, 2, 24))
+    assert response.status_code == 200
+    assert response.json == [json_task]
+
+
+@pytest.mark.parametrize("query, status_code", [
+    ('name_prefix=Task&sort=-name', 200),
+    ('priority=1&sort=id', 200),
+    ('name_prefix=Task&sort=id', 400),
+    ('priority=1&created_from=2024-02-24', 400),
+    ('sort=description', 400),
+    ('priority_min=high', 400),
+])
+def test_get_tasks_filters_allowlist(query, status_code, client):
+    """
+    Ensure that only the filters and sort keys served by an index are accepted.
+    """
+    access_token = create_access_token(identity='test_user')
+    response = client.get(f'/api/tasks?{query}', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == status_code
+
+
+def test_search_tasks(client):
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/api/tasks/batch', json=[{'name': 'Water the plants'}, {'name': 'Plant a tree', 'priority': 2}],
+                headers=headers)
+    first = client.get('/api/tasks/search?q=plant&limit=1', headers=headers)
+    assert first.status_code == 200
+    assert len(first.json) == 1
+    assert list(first.json[0]) == ['id', 'name', 'priority', 'created_at', 'updated_at', 'highlight']
+    second = client.get(f'/api/tasks/search?q=plant&after={first.headers["X-Next-Cursor"]}', headers=headers)
+    assert 'X-Next-Cursor' not in second.headers
+    assert sorted(task['highlight'] for task in first.json + second.json) == [
+        '<mark>Plant</mark> a tree', 'Water the <mark>plants</mark>'
+    ]
+
+
+def test_search_tasks_highlight_escaped(client):
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    client.post('/api/tasks', json={'name': '<script>alert(1)</script> unsafe', 'priority': 1}, headers=headers)
+    response = client.get('/api/tasks/search?q=unsafe', headers=headers)
+    assert response.json[0]['name'] == '<script>alert(1)</script> unsafe'
+    assert response.json[0]['highlight'] == '&lt;script&gt;alert(1)&lt;/script&gt; <mark>unsafe</mark>'
+
+
+@pytest.mark.parametrize("url", ['/api/tasks/search', '/api/tasks/search?q=', '/api/tasks/search?q=plant&after=foo'])
+def test_search_tasks_invalid(url, client):
+    access_token = create_access_token(identity='test_user')
+    response = client.get(url, headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 400
+
+
+def test_claim_renew_ack_task(client):
+    access_token = create_access_token(identity='worker')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    ids = client.post('/api/tasks/batch', json=[{'name': 'Job', 'priority': 0}], headers=headers).json['ids']
+    claim = client.post('/api/tasks/claim', json={'lease_seconds': 60}, headers=headers)
+    assert claim.status_code == 200
+    assert claim.json['id'] == ids[0]
+    assert claim.json['lease_owner'].startswith('worker:')
+    assert list(claim.json) == ['id', 'name', 'priority', 'created_at', 'updated_at', 'lease_owner',
+                                'lease_expires_at']
+    lease = {'lease_owner': claim.json['lease_owner']}
+    renew = client.post(f'/api/tasks/{ids[0]}/renew', json={**lease, 'lease_seconds': 120}, headers=headers)
+    assert renew.status_code == 200
+    assert renew.json['lease_expires_at'] > claim.json['lease_expires_at']
+    assert client.post(f'/api/tasks/{ids[0]}/ack', json={'lease_owner': 'other'}, headers=headers).status_code == 409
+    assert client.post(f'/api/tasks/{ids[0]}/ack', json=lease, headers=headers).status_code == 204
+    assert client.post(f'/api/tasks/{ids[0]}/renew', json=lease, headers=headers).status_code == 409
+    assert client.get(f'/api/tasks/{ids[0]}', headers=headers).status_code == 404
+
+
+@patch('app.api.resources.task.TaskRepository')
+def test_claim_task_empty(mock_task_repository, client):
+    mock_task_repository.claim_task.return_value = None
+    access_token = create_access_token(identity='worker')
+    response = client.post('/api/tasks/claim', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 204
+    owner, seconds = mock_task_repository.claim_task.call_args.args
+    assert owner.startswith('worker:')
+    assert seconds == 30
+
+
+@pytest.mark.parametrize("lease_seconds", [0, -1, 3601, 1.5, '10'])
+def test_claim_task_invalid_lease(lease_seconds, client):
+    access_token = create_access_token(identity='worker')
+    response = client.post('/api/tasks/claim', json={'lease_seconds': lease_seconds},
+                           headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("url", ['/api/tasks/claim', '/api/tasks/1/renew', '/api/tasks/1/ack'])
+@pytest.mark.parametrize("payload", [[1], 'x', 1])
+@patch('app.api.resources.task.TaskRepository')
+def test_lease_invalid_payload(mock_task_repository, payload, url, client):
+    access_token = create_access_token(identity='worker')
+    response = client.post(url, json=payload, headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 400
+    assert response.json['message'] == 'Payload must be an object.'
+    assert not mock_task_repository.method_calls
+
+
+@patch('app.api.resources.task.TaskRepository')
+def test_get_task_stats(mock_task_repository, client):
+    mock_task_repository.get_task_stats.return_value = TaskStatsSummary(
+        3, [{'priority': 1, 'count': 2}, {'priority': 4, 'count': 1}], datetime(2024, 1, 1), datetime(2024, 2, 1, 12)
+    )
+    access_token = create_access_token(identity='test_user')
+    response = client.get('/api/tasks/stats', headers={'Authorization': f'Bearer {access_token}'})
+    assert response.status_code == 200
+    assert response.json == {
+        'total': 3,
+        'priorities': [{'priority': 1, 'count': 2}, {'priority': 4, 'count': 1}],
+        'oldest_created_at': '2024-01-01T00:00:00',
+        'newest_created_at': '2024-02-01T12:00:00'
+    }
+
+
+def test_get_task_stats_incremental(client):
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    before = client.get('/api/tasks/stats', headers=headers).json
+    client.post('/api/tasks/batch', json=[{'name': 'Task A', 'priority': 9}, {'name': 'Task B', 'priority': 9}],
+                headers=headers)
+    after = client.get('/api/tasks/stats', headers=headers).json
+    assert after['total'] == before['total'] + 2
+    assert {'priority': 9, 'count': 2} in after['priorities']
+    assert after['newest_created_at'] >= after['oldest_created_at']
+
+
+def test_rebuild_task_stats_command(app):
+    with app.app_context():
+        db.session.execute(text('INSERT INTO task_stats (priority, count) VALUES (99, 5)'))
+        db.session.commit()
+    result = app.test_cli_runner().invoke(args=['rebuild-task-stats'])
+    assert result.exit_code == 0
+    assert 'priority 99: 5 -> 0' in result.output
+    result = app.test_cli_runner().invoke(args=['rebuild-task-stats'])
+    assert result.output == 'task stats rebuilt, 0 counts repaired\n'
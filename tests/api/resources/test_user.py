@@ -2,6 +2,7 @@ import pytest
 
 from unittest.mock import patch, Mock
 from flask_jwt_extended import create_access_token, create_refresh_token
+from app.hashing import PasswordHasherBusy
 
 
 @pytest.mark.parametrize("username, password, status_code, message", [
@@ -57,6 +58,30 @@ def test_user_login_failed(mock_get_user_by_username, user_exists, client):
     assert 'invalid' in response.json['message']
 
 
+@patch('app.repositories.user_repository.UserRepository.get_user_by_username')
+def test_user_login_busy(mock_get_user_by_username, client):
+    """
+    Ensure that logins are rejected with 503 when the password hasher is overloaded.
+    """
+    mock_user = Mock()
+    mock_user.check_password.side_effect = PasswordHasherBusy('too many password hashing requests')
+    mock_get_user_by_username.return_value = mock_user
+    response = client.post('/api/login', json={'username': 'testuser', 'password': 'TestPassword123#'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+@patch('app.repositories.user_repository.UserRepository.create_user')
+def test_user_registration_busy(mock_create_user, client):
+    """
+    Ensure that registrations are rejected with 503 when the password hasher is overloaded.
+    """
+    mock_create_user.side_effect = PasswordHasherBusy('too many password hashing requests')
+    response = client.post('/api/register', json={'username': 'testuser', 'password': 'TestPassword123#'})
+    assert response.status_code == 503
+    assert 'too many' in response.json['message']
+
+
 @patch('app.api.resources.user.get_jwt_identity')
 def test_token_refresh_success(mock_get_jwt_identity, client):
     jwt_refresh_token = create_refresh_token(identity='test_user')
@@ -64,4 +89,49 @@ def test_token_refresh_success(mock_get_jwt_identity, client):
     response = client.post('/api/refresh', headers={'Authorization': f'Bearer {jwt_refresh_token}'})
     mock_get_jwt_identity.assert_called_once_with()
     assert response.status_code == 200
-    assert 'access_token' in response.json
\ No newline at end of file
+    assert 'access_token' in response.json
+
+def test_logout(client):
+    """
+    Ensure that the access token and the refresh token are rejected after a logout.
+    """
+    access_token = create_access_token(identity='test_user')
+    refresh_token = create_refresh_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.post('/api/logout', json={'refresh_token': refresh_token}, headers=headers)
+    assert response.status_code == 200
+    assert client.get('/api/tasks', headers=headers).status_code == 401
+    assert client.post('/api/logout', headers=headers).status_code == 401
+    response = client.post('/api/refresh', headers={'Authorization': f'Bearer {refresh_token}'})
+    assert response.status_code == 401
+    assert response.json['msg'] == 'Token has been revoked'
+
+
+def test_logout_refresh_token(client):
+    """
+    Ensure that a refresh token can revoke itself.
+    """
+    headers = {'Authorization': f'Bearer {create_refresh_token(identity="test_user")}'}
+    assert client.post('/api/logout', headers=headers).status_code == 200
+    assert client.post('/api/refresh', headers=headers).status_code == 401
+
+
+@pytest.mark.parametrize("refresh_token", [
+    'not a token',
+    'access token',
+    'refresh token of another user',
+])
+def test_logout_invalid_refresh_token(refresh_token, client):
+    """
+    Ensure that the refresh token revoked by a logout is a valid refresh token of the same user.
+    """
+    if refresh_token == 'access token':
+        refresh_token = create_access_token(identity='test_user')
+    elif refresh_token == 'refresh token of another user':
+        refresh_token = create_refresh_token(identity='another_user')
+    access_token = create_access_token(identity='test_user')
+    headers = {'Authorization': f'Bearer {access_token}'}
+    response = client.post('/api/logout', json={'refresh_token': refresh_token}, headers=headers)
+    assert response.status_code == 400
+    assert 'invalid refresh token' in response.json['message']
+    assert client.get('/api/tasks', headers=headers).status_code == 200
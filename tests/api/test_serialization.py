@@ -0,0 +1,34 @@
+import pytest
+
+from datetime import datetime
+from flask_restx import Model, fields, marshal
+from app.api.api_models import task_model
+from app.api.serialization import RowEncoder
+
+
+@pytest.mark.parametrize("row", [
+    (1, 'Task 1', 1, datetime(2024, 2, 24, 10, 43, 27), datetime(2024, 2, 24, 10, 43, 27, 123456)),
+    (2, 'Tâsk "2"', 3, None, None),
+    (None, None, None, None, None),
+])
+def test_row_encoder(row):
+    obj = dict(zip(task_model, row))
+    encoded = RowEncoder(task_model)([row])
+    assert encoded == [marshal(obj, task_model)]
+    assert list(encoded[0]) == list(task_model)
+
+
+def test_row_encoder_names():
+    encoder = RowEncoder(task_model, ['priority', 'id'])
+    assert encoder([(2, 1, 'extra sort column')]) == [{'priority': 2, 'id': 1}]
+
+
+@pytest.mark.parametrize("field", [
+    fields.DateTime(dt_format='rfc822'),
+    fields.Integer(default=0),
+    fields.String(attribute='other'),
+    fields.Float,
+])
+def test_row_encoder_unsupported_fields(field):
+    with pytest.raises(ValueError):
+        RowEncoder(Model('Unsupported', {'field': field}))
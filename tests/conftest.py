@@ -2,9 +2,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+import asyncio
 import pytest
 
-from app import create_app, db, limiter
+from sqlalchemy import event
+from app import create_app, db, limiter, profiling
 from config import TestConfig
 
 
@@ -22,6 +24,38 @@ def app():
         db.drop_all()
 
 
+@pytest.fixture
+def async_app():
+    """
+    Async app fixture with a test in-memory database, see run_async.
+    """
+    from app.aio import create_async_app
+    return create_async_app(TestConfig)
+
+
+@pytest.fixture
+def run_async(async_app):
+    """
+    Run a coroutine function on a new event loop, in an app context of the async app with the tables created.
+    The db is dropped with the connection at the end.
+    """
+    from quart import g
+    from app.aio.database import async_db
+
+    def run(func, *args, **kwargs):
+        async def main():
+            async with async_app.app_context():
+                await async_db.create_all()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    if 'async_session' in g:
+                        await g.pop('async_session').close()
+                    await async_db.dispose()
+        return asyncio.run(main())
+    return run
+
+
 @pytest.fixture
 def client(app):
     """
@@ -29,3 +63,36 @@ def client(app):
     """
     with app.test_client() as client:
         yield client
+
+
+@pytest.fixture
+def query_plan():
+    """
+    Run a function and return the SQLite query plan of each statement it executes.
+    """
+    def run(func, *args, **kwargs):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+                statements.append((statement, parameters))
+
+        event.listen(db.engine, 'before_cursor_execute', capture)
+        try:
+            func(*args, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', capture)
+        with db.engine.connect() as connection:
+            return [
+                ' '.join(row[3] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters))
+                for statement, parameters in statements
+            ]
+    return run
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Context manager ensuring that a block of code, e.g. a request, executes at most a given number of SQL statements.
+    """
+    return profiling.query_budget
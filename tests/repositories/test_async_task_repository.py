@@ -0,0 +1,90 @@
+import pytest
+
+from app import task_cache
+from app.cache import SQLiteCacheBackend
+from app.repositories.async_task_repository import AsyncTaskRepository
+
+COLUMNS = ['id', 'name', 'priority', 'created_at', 'updated_at']
+
+
+def test_create_and_get_task(run_async):
+    async def test():
+        task = await AsyncTaskRepository.create_task('Task1', 2)
+        assert (task.id, task.name, task.priority) == (1, 'Task1', 2)
+        assert task.created_at is not None
+        assert await AsyncTaskRepository.get_task_by_id(task.id, COLUMNS) == task
+        assert tuple(await AsyncTaskRepository.get_task_by_id(task.id, ['name'])) == ('Task1',)
+        assert await AsyncTaskRepository.get_task_by_id(42, COLUMNS) is None
+        assert await AsyncTaskRepository.get_all_tasks(COLUMNS) == [task]
+    run_async(test)
+
+
+def test_get_tasks_page(run_async):
+    async def test():
+        for i in range(5):
+            await AsyncTaskRepository.create_task(f'Task{i}', i % 2)
+        rows, cursor = await AsyncTaskRepository.get_tasks_page(2, sort='-priority', columns=['name'])
+        assert [tuple(row) for row in rows] == [('Task3', 1, 4), ('Task1', 1, 2)]  # followed by the sort columns
+        rows, cursor = await AsyncTaskRepository.get_tasks_page(2, after=cursor, sort='-priority', columns=['name'])
+        assert [row.name for row in rows] == ['Task4', 'Task2']
+        rows, cursor = await AsyncTaskRepository.get_tasks_page(10, sort=None, columns=['id'], priority=0)
+        assert [row.id for row in rows] == [1, 3, 5]
+        assert cursor is None
+        with pytest.raises(ValueError):
+            await AsyncTaskRepository.get_tasks_page(10, sort='name', columns=['id'], priority_min=0)
+    run_async(test)
+
+
+def test_update_task_by_id(run_async):
+    async def test():
+        task = await AsyncTaskRepository.create_task('Task1', 1)
+        updated_task = await AsyncTaskRepository.update_task_by_id(task.id, priority=3)
+        assert (updated_task.name, updated_task.priority) == ('Task1', 3)
+        assert updated_task.updated_at > task.updated_at
+        assert await AsyncTaskRepository.update_task_by_id(42, 'name', 1) is None
+    run_async(test)
+
+
+def test_delete_tasks(run_async):
+    async def test():
+        for i in range(4):
+            await AsyncTaskRepository.create_task(f'Task{i}', i % 2)
+        assert await AsyncTaskRepository.delete_task_by_id(1)
+        assert not await AsyncTaskRepository.delete_task_by_id(1)
+        assert await AsyncTaskRepository.delete_tasks(priority=1) == 2
+        assert await AsyncTaskRepository.delete_tasks() == 1
+        assert await AsyncTaskRepository.get_all_tasks(COLUMNS) == []
+    run_async(test)
+
+
+@pytest.fixture
+def cached_async_app(async_app, tmp_path):
+    async_app.config.update(TASK_CACHE_ENABLED=True, TASK_CACHE_BACKEND='sqlite',
+                            TASK_CACHE_PATH=str(tmp_path / 'task_cache.db'))
+    task_cache.init_app(async_app)
+    return async_app
+
+
+def test_writes_invalidate_task_cache(cached_async_app, tmp_path, run_async):
+    """
+    Ensure that the async writes invalidate the tasks in the cache shared with the sync app.
+    """
+    cache = SQLiteCacheBackend(str(tmp_path / 'task_cache.db'), max_size=10, ttl=60)  # cache of a sync worker
+
+    async def test():
+        for i in range(4):
+            await AsyncTaskRepository.create_task(f'Task{i}', i % 2)
+        for id in range(1, 5):
+            cache.set(id, {'id': id})
+        generation = cache.generation(1)
+        await AsyncTaskRepository.update_task_by_id(1, 'renamed')
+        assert cache.get(1) is None
+        assert cache.generation(1) != generation
+        await AsyncTaskRepository.delete_task_by_id(2)
+        assert cache.get(2) is None
+        assert await AsyncTaskRepository.delete_tasks(ids=[3]) == 1
+        assert cache.get(3) is None
+        assert cache.get(4) is not None
+        assert await AsyncTaskRepository.delete_tasks(priority=1) == 1
+        assert cache.get(4) is None
+    run_async(test)
@@ -0,0 +1,14 @@
+from app.repositories.async_user_repository import AsyncUserRepository
+
+
+def test_create_user(run_async):
+    async def test():
+        assert await AsyncUserRepository.create_user('user1', 'Passw0rd!')
+        assert not await AsyncUserRepository.create_user('user1', 'Passw0rd!')
+        user = await AsyncUserRepository.get_user_by_username('user1')
+        assert user.username == 'user1'
+        assert user.password_hash.startswith('pbkdf2:sha256:1000$')  # PASSWORD_HASH_METHOD of TestConfig
+        assert await AsyncUserRepository.check_password(user, 'Passw0rd!')
+        assert not await AsyncUserRepository.check_password(user, 'wrong_password')
+        assert await AsyncUserRepository.get_user_by_username('user2') is None
+    run_async(test)
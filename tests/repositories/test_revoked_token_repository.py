@@ -0,0 +1,71 @@
+import pytest
+
+from datetime import datetime, timedelta
+from app import db
+from app.models.revoked_token import RevokedToken
+from app.repositories.revoked_token_repository import RevokedTokenRepository
+
+
+@pytest.fixture(scope='module')
+def app():
+    """
+    App fixture with a test in-memory database.
+    """
+    from flask import Flask
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_revoke(app):
+    """
+    Ensure that a token is revoked only once.
+    """
+    with app.app_context():
+        expires_at = datetime.now() + timedelta(hours=1)
+        assert RevokedTokenRepository.is_revoked('jti-revoke') is False
+        assert RevokedTokenRepository.revoke('jti-revoke', 'access', expires_at) is True
+        assert RevokedTokenRepository.revoke('jti-revoke', 'access', expires_at) is False
+        assert RevokedTokenRepository.is_revoked('jti-revoke') is True
+
+
+def test_expired_revocations(app):
+    """
+    Ensure that the revocations of expired tokens are ignored and deleted.
+    """
+    with app.app_context():
+        RevokedTokenRepository.revoke('jti-expired', 'refresh', datetime.now() - timedelta(seconds=1))
+        RevokedTokenRepository.revoke('jti-active', 'refresh', datetime.now() + timedelta(hours=1))
+        assert RevokedTokenRepository.is_revoked('jti-expired') is False
+        assert 'jti-expired' not in [jti for _, jti in RevokedTokenRepository.get_revoked_after()]
+        assert RevokedTokenRepository.delete_expired() == 1
+        assert RevokedToken.query.filter_by(jti='jti-expired').first() is None
+        assert RevokedTokenRepository.is_revoked('jti-active') is True
+
+
+def test_get_revoked_after(app):
+    """
+    Ensure that the revocations are returned in insertion order, after the given id.
+    """
+    with app.app_context():
+        expires_at = datetime.now() + timedelta(hours=1)
+        last_id = max(row_id for row_id, _ in RevokedTokenRepository.get_revoked_after())
+        RevokedTokenRepository.revoke('jti-after-1', 'access', expires_at)
+        RevokedTokenRepository.revoke('jti-after-2', 'access', expires_at)
+        assert [jti for _, jti in RevokedTokenRepository.get_revoked_after(last_id)] == ['jti-after-1', 'jti-after-2']
+
+
+def test_is_revoked_uses_index(app, query_plan):
+    """
+    Ensure that revocations are looked up through the unique index on jti.
+    """
+    with app.app_context():
+        plans = query_plan(RevokedTokenRepository.is_revoked, 'jti-revoke')
+        assert len(plans) == 1
+        assert 'USING INDEX ix_revoked_token_jti' in plans[0]
@@ -1,6 +1,8 @@
 import pytest
-from app import db
-from app.repositories.task_repository import TaskRepository
+from datetime import datetime
+from sqlalchemy import text
+from app import db, task_cache
+from app.repositories.task_repository import TaskRepository, decode_cursor, encode_cursor, fts_query, prefix_successor
 from app.models.task import Task
 
 TASK1_NAME = 'Task1'
@@ -46,6 +48,12 @@ def test_get_task_by_id(id, name, priority, app):
         assert task == retrieved_task
 
 
+def test_get_task_by_id_columns(app, task1):
+    row = TaskRepository.get_task_by_id(task1.id, columns=['name', 'id'])
+    assert tuple(row) == (TASK1_NAME, task1.id)
+    assert TaskRepository.get_task_by_id(42, columns=['name']) is None
+
+
 def test_get_all_tasks(app, task1, task2):
     with app.app_context():
         tasks = TaskRepository.get_all_tasks()
@@ -79,12 +87,407 @@ def test_update_task_by_id(app):
         assert non_existing_task is None
 
 
+def test_update_task_by_id_partial(app, task1, query_plan):
+    plans = query_plan(TaskRepository.update_task_by_id, task1.id, priority=4)
+    assert len(plans) == 1  # a single UPDATE ... RETURNING, the task is not loaded first
+    assert 'SEARCH task USING INTEGER PRIMARY KEY' in plans[0]
+    task = TaskRepository.get_task_by_id(task1.id)
+    assert (task.name, task.priority) == (TASK1_NAME, 4)
+    updated_at = task.updated_at
+    updated_task = TaskRepository.update_task_by_id(task1.id, name='renamed')
+    assert (updated_task.name, updated_task.priority) == ('renamed', 4)
+    assert updated_task.updated_at > updated_at
+
+
 def test_delete_task_by_id(app):
     assert TaskRepository.delete_task_by_id(1) == True
     assert TaskRepository.delete_task_by_id(-123) == False
 
 
 def test_delete_all_tasks(app):
+    assert TaskRepository.delete_all_tasks() == 2
+    tasks = TaskRepository.get_all_tasks()
+    assert len(tasks) == 0
+
+def test_get_tasks_version(app, task1, task2):
+    version = TaskRepository.get_tasks_version()
+    assert version == (2, 2, task2.updated_at)
+    TaskRepository.update_task_by_id(1, 'updated_name', 2)
+    assert TaskRepository.get_tasks_version().last_modified > version.last_modified
     TaskRepository.delete_all_tasks()
+    assert TaskRepository.get_tasks_version() == (0, None, None)
+
+
+@pytest.mark.parametrize("sort", ['id', 'priority'])
+def test_get_tasks_page(sort, app, task1, task2):
+    tasks, cursor = TaskRepository.get_tasks_page(1, sort=sort)
+    assert tasks == [task1]
+    assert cursor is not None
+    tasks, cursor = TaskRepository.get_tasks_page(1, after=cursor, sort=sort)
+    assert tasks == [task2]
+    assert cursor is None
+
+
+def test_get_tasks_page_sorted_by_priority(app, task1, task2):
+    task3 = TaskRepository.create_task('Task3', 2)
+    tasks, cursor = TaskRepository.get_tasks_page(10, sort='priority')
+    assert tasks == [task1, task3, task2]
+    assert cursor is None
+
+
+@pytest.mark.parametrize("cursor", ['not a cursor', 'WzFd', 'WyJhIl0='])
+def test_get_tasks_page_invalid_cursor(cursor, app):
+    with pytest.raises(ValueError):
+        TaskRepository.get_tasks_page(1, after=cursor, sort='priority')
+
+
+def test_get_tasks_page_rows(app, task1, task2):
+    rows, cursor = TaskRepository.get_tasks_page(1, sort='priority', columns=['name'])
+    assert [tuple(row) for row in rows] == [(TASK1_NAME, TASK1_PRIORITY, task1.id)]  # followed by the sort columns
+    rows, cursor = TaskRepository.get_tasks_page(1, after=cursor, sort='priority', columns=['name'])
+    assert [tuple(row) for row in rows] == [(TASK2_NAME, TASK2_PRIORITY, task2.id)]
+    assert cursor is None
+
+
+def test_get_all_tasks_rows(app, task1, task2):
+    rows = TaskRepository.get_all_tasks(columns=['id', 'name'])
+    assert [tuple(row) for row in rows] == [(task1.id, TASK1_NAME), (task2.id, TASK2_NAME)]
+    assert not any(isinstance(obj, Task) and obj.id not in (task1.id, task2.id) for obj in db.session)
+    with pytest.raises(ValueError):
+        TaskRepository.get_all_tasks(columns=['id', 'password'])
+
+
+def test_iter_task_batches(app, task1, task2):
+    task3 = TaskRepository.create_task('Task3', 2)
+    batches = list(TaskRepository.iter_task_batches(2))
+    assert batches == [[task1, task2], [task3]]
+    batches = list(TaskRepository.iter_task_batches(2, columns=['id', 'priority']))
+    assert [[tuple(row) for row in batch] for batch in batches] == [[(1, 1), (2, 3)], [(3, 2)]]
+
+
+def test_create_tasks(app):
+    ids = TaskRepository.create_tasks([{'name': 'Task3', 'priority': 2}, {'name': 'Task4', 'priority': 1}])
+    assert len(ids) == 2
+    tasks = [TaskRepository.get_task_by_id(id) for id in ids]
+    assert [(task.name, task.priority) for task in tasks] == [('Task3', 2), ('Task4', 1)]
+    assert all(task.created_at is not None and task.updated_at is not None for task in tasks)
+    assert TaskRepository.create_tasks([]) == []
+
+
+def test_create_tasks_order(app):
+    names = [f'Task{i}' for i in range(100, 0, -1)]  # not sorted by name or priority
+    ids = TaskRepository.create_tasks([{'name': name, 'priority': i % 3} for i, name in enumerate(names)])
+    assert [TaskRepository.get_task_by_id(id).name for id in ids] == names
+
+
+@pytest.mark.parametrize("filters, remaining", [
+    ({'ids': [1, 3]}, [TASK2_NAME]),
+    ({'priority': TASK2_PRIORITY}, [TASK1_NAME]),
+    ({'ids': [1, 2], 'priority': TASK2_PRIORITY}, [TASK1_NAME]),
+    ({'created_from': datetime(2000, 1, 1)}, []),
+    ({'created_to': datetime(2000, 1, 1)}, [TASK1_NAME, TASK2_NAME]),
+])
+def test_delete_tasks(filters, remaining, app):
+    deleted = TaskRepository.delete_tasks(**filters)
     tasks = TaskRepository.get_all_tasks()
-    assert len(tasks) == 0
\ No newline at end of file
+    assert deleted == 2 - len(remaining)
+    assert [task.name for task in tasks] == remaining
+
+
+def test_get_tasks_page_uses_index(app, query_plan):
+    _, cursor = TaskRepository.get_tasks_page(1, sort='priority')
+    plans = query_plan(TaskRepository.get_tasks_page, 1, after=cursor, sort='priority')
+    assert len(plans) == 1
+    assert 'USING INDEX ix_task_priority_id' in plans[0]
+    assert 'TEMP B-TREE' not in plans[0]
+
+
+@pytest.mark.parametrize("sort, filters, names", [
+    ('-id', {}, ['Tas3', TASK2_NAME, TASK1_NAME]),
+    ('-priority', {}, [TASK2_NAME, 'Tas3', TASK1_NAME]),
+    ('name', {}, ['Tas3', TASK1_NAME, TASK2_NAME]),
+    (None, {'priority': TASK2_PRIORITY}, [TASK2_NAME]),
+    ('-id', {'priority': TASK1_PRIORITY}, [TASK1_NAME]),
+    (None, {'priority_min': 2, 'priority_max': 3}, ['Tas3', TASK2_NAME]),
+    (None, {'created_from': datetime(2000, 1, 1)}, [TASK1_NAME, TASK2_NAME, 'Tas3']),
+    ('-updated_at', {'updated_to': datetime(2000, 1, 1)}, []),
+    (None, {'name_prefix': 'Task'}, [TASK1_NAME, TASK2_NAME]),
+    ('-name', {'name_prefix': 'Tas'}, [TASK2_NAME, TASK1_NAME, 'Tas3']),
+])
+def test_get_tasks_page_filters(sort, filters, names, app):
+    TaskRepository.create_task('Tas3', 2)
+    pages, cursor = [], None
+    while True:  # one task per page, so that every page but the first one is located by the cursor
+        tasks, cursor = TaskRepository.get_tasks_page(1, after=cursor, sort=sort, **filters)
+        pages += tasks
+        if cursor is None:
+            break
+    assert [task.name for task in pages] == names
+
+
+@pytest.mark.parametrize("sort, filters", [
+    ('id', {'name_prefix': 'Task'}),
+    ('priority', {'created_from': datetime(2000, 1, 1)}),
+    ('id', {'priority_min': 1}),
+    (None, {'priority': 1, 'created_from': datetime(2000, 1, 1)}),
+    ('description', {}),
+])
+def test_get_tasks_page_filters_without_index(sort, filters, app):
+    with pytest.raises(ValueError):
+        TaskRepository.get_tasks_page(10, sort=sort, **filters)
+
+
+@pytest.mark.parametrize("sort, filters, index", [
+    ('-priority', {'priority_min': 1, 'priority_max': 3}, 'ix_task_priority_id'),
+    ('id', {'priority': 1}, 'ix_task_priority_id'),
+    ('created_at', {'created_from': datetime(2000, 1, 1)}, 'ix_task_created_at'),
+    ('-updated_at', {'updated_from': datetime(2000, 1, 1), 'updated_to': datetime(3000, 1, 1)}, 'ix_task_updated_at'),
+    ('name', {'name_prefix': 'Task'}, 'ix_task_name'),
+    ('-name', {}, 'ix_task_name'),
+])
+def test_get_tasks_page_filters_use_index(sort, filters, index, app, query_plan):
+    _, cursor = TaskRepository.get_tasks_page(1, sort=sort, **filters)
+    plans = query_plan(TaskRepository.get_tasks_page, 1, after=cursor, sort=sort, **filters)
+    assert len(plans) == 1
+    assert f'USING INDEX {index}' in plans[0]
+    assert 'TEMP B-TREE' not in plans[0]
+
+
+def test_cursor_datetime():
+    value = datetime(2024, 2, 24, 10, 43, 27, 123)
+    assert decode_cursor(encode_cursor([value, 1]), [Task.created_at, Task.id]) == [value, 1]
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(['yesterday', 1]), [Task.created_at, Task.id])
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([True]), [Task.id])
+
+
+@pytest.mark.parametrize("prefix, successor", [('Task', 'Tasl'), ('a' + chr(0x10FFFF), 'b'), (chr(0x10FFFF), None)])
+def test_prefix_successor(prefix, successor):
+    assert prefix_successor(prefix) == successor
+
+
+@pytest.mark.parametrize("text, query", [
+    ('buy mil', '"buy" "mil"*'),
+    ('"milk" OR (', '"milk" "OR"*'),
+])
+def test_fts_query(text, query):
+    assert fts_query(text) == query
+
+
+def test_search_tasks(app):
+    TaskRepository.create_tasks([{'name': name, 'priority': 1} for name in
+                                 ['buy milk', 'buy bread and milk', 'call mom', 'Café au lait', 'milk milk milk']])
+    rows, cursor = TaskRepository.search_tasks('MIL', 2)
+    assert [row.name for row in rows] == ['milk milk milk', 'buy milk']  # ranked by relevance
+    assert rows[1][5] == 'buy <mark>milk</mark>'
+    rows, cursor = TaskRepository.search_tasks('MIL', 2, after=cursor)
+    assert [row.name for row in rows] == ['buy bread and milk']
+    assert cursor is None
+    rows, _ = TaskRepository.search_tasks('cafe', 10, highlight=('[', ']'))
+    assert [row[5] for row in rows] == ['[Café] au lait']
+    with pytest.raises(ValueError):
+        TaskRepository.search_tasks('?!', 10)
+
+
+def test_search_tasks_highlight_escaped(app):
+    """
+    Ensure that the highlighted names are HTML-escaped, so that task names cannot inject markup.
+    """
+    name = '<script>alert("milk")</script> & \x02milk\x03'
+    TaskRepository.create_tasks([{'name': name, 'priority': 1}])
+    rows, _ = TaskRepository.search_tasks('milk', 10)
+    assert rows[0].name == name
+    assert rows[0].highlight == '&lt;script&gt;alert(&#34;<mark>milk</mark>&#34;)&lt;/script&gt; &amp; ' \
+                                '\x02<mark>milk</mark>\x03'
+
+
+def test_search_tasks_sync(app, task1):
+    """
+    Ensure that the full-text index is kept in sync with the task table.
+    """
+    assert [row.id for row in TaskRepository.search_tasks(TASK1_NAME, 10)[0]] == [task1.id]
+    TaskRepository.update_task_by_id(task1.id, 'renamed', 1)
+    assert TaskRepository.search_tasks(TASK1_NAME, 10)[0] == []
+    assert [row.id for row in TaskRepository.search_tasks('renamed', 10)[0]] == [task1.id]
+    TaskRepository.delete_tasks(ids=[task1.id])
+    assert TaskRepository.search_tasks('renamed', 10)[0] == []
+
+
+def test_search_tasks_uses_fts(app, query_plan):
+    plans = query_plan(TaskRepository.search_tasks, 'milk', 10)
+    assert len(plans) == 1
+    assert 'VIRTUAL TABLE INDEX' in plans[0]
+    assert 'SCAN task ' not in plans[0] + ' '
+
+
+def test_get_task_stats(app, task1, task2):
+    stats = TaskRepository.get_task_stats()
+    assert stats.total == 2
+    assert [tuple(row) for row in stats.priorities] == [(TASK1_PRIORITY, 1), (TASK2_PRIORITY, 1)]
+    assert (stats.oldest_created_at, stats.newest_created_at) == (task1.created_at, task2.created_at)
+    TaskRepository.delete_all_tasks()
+    assert TaskRepository.get_task_stats() == (0, [], None, None)
+
+
+def test_get_task_stats_sync(app, task1, task2):
+    """
+    Ensure that the counts are kept in sync with the task table by every kind of write.
+    """
+    TaskRepository.create_task('Task3', TASK2_PRIORITY)
+    TaskRepository.create_tasks([{'name': 'Task4', 'priority': 5}, {'name': 'Task5', 'priority': 5}])
+    TaskRepository.update_task_by_id(task1.id, 'renamed', 5)
+    TaskRepository.delete_task_by_id(task2.id)
+    TaskRepository.delete_tasks(priority=TASK2_PRIORITY)
+    stats = TaskRepository.get_task_stats()
+    assert stats.total == 3
+    assert [tuple(row) for row in stats.priorities] == [(5, 3)]
+
+
+def test_get_task_stats_uses_indexes(app, query_plan):
+    plans = query_plan(TaskRepository.get_task_stats)
+    assert len(plans) == 2
+    assert 'SCAN task ' not in ' '.join(plans) + ' '
+    assert plans[1].count('SEARCH task USING COVERING INDEX ix_task_created_at') == 2
+
+
+def test_rebuild_task_stats(app, task1, task2):
+    assert TaskRepository.rebuild_task_stats() == {}
+    db.session.execute(text('UPDATE task_stats SET count = 7 WHERE priority = :priority'), {'priority': TASK1_PRIORITY})
+    db.session.execute(text('DELETE FROM task_stats WHERE priority = :priority'), {'priority': TASK2_PRIORITY})
+    db.session.execute(text('INSERT INTO task_stats (priority, count) VALUES (4, 2)'))
+    db.session.commit()
+    assert TaskRepository.rebuild_task_stats() == {TASK1_PRIORITY: (7, 1), TASK2_PRIORITY: (0, 1), 4: (2, 0)}
+    assert [tuple(row) for row in TaskRepository.get_task_stats().priorities] == [(TASK1_PRIORITY, 1),
+                                                                                  (TASK2_PRIORITY, 1)]
+
+
+def test_claim_task(app, task1, task2):
+    task3 = TaskRepository.create_task('Task3', TASK1_PRIORITY)
+    claimed = [TaskRepository.claim_task(f'worker{i}', 30) for i in range(4)]
+    assert [row.id if row else None for row in claimed] == [task1.id, task3.id, task2.id, None]
+    assert claimed[0].lease_owner == 'worker0'
+    assert claimed[0].lease_expires_at > datetime.now()
+    assert claimed[0].updated_at == task1.updated_at  # a lease is not a modification of the task
+
+
+def test_claim_task_lease_expiry(app, task1, task2):
+    expired = TaskRepository.claim_task('worker1', -1)
+    assert expired.id == task1.id
+    assert TaskRepository.renew_lease(task1.id, 'worker1', 30) is None
+    assert not TaskRepository.ack_task(task1.id, 'worker1')
+    assert TaskRepository.claim_task('worker2', 30).id == task1.id  # claimed again once the lease expired
+
+
+def test_renew_lease(app, task1):
+    claimed = TaskRepository.claim_task('worker1', 30)
+    assert TaskRepository.renew_lease(task1.id, 'worker2', 60) is None
+    assert TaskRepository.renew_lease(task1.id, 'worker1', 60) > claimed.lease_expires_at
+    assert TaskRepository.renew_lease(42, 'worker1', 60) is None
+
+
+def test_ack_task(app, task1, task2):
+    task_id = TaskRepository.claim_task('worker1', 30).id
+    assert not TaskRepository.ack_task(task_id, 'worker2')
+    assert not TaskRepository.ack_task(task2.id, 'worker1')
+    assert TaskRepository.ack_task(task_id, 'worker1')
+    assert TaskRepository.get_task_by_id(task_id) is None
+    assert not TaskRepository.ack_task(task_id, 'worker1')
+
+
+def test_claim_task_concurrent(tmp_path):
+    """
+    Ensure that concurrent workers never claim the same task.
+    """
+    from flask import Flask
+    from concurrent.futures import ThreadPoolExecutor
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "tasks.db"}'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        TaskRepository.create_tasks([{'name': f'Task{i}', 'priority': i % 3 + 1} for i in range(200)])
+
+    def work(worker):
+        claimed = []
+        with app.app_context():
+            while (row := TaskRepository.claim_task(f'worker{worker}', 30)) is not None:
+                claimed.append(row.id)
+        return claimed
+
+    with ThreadPoolExecutor(8) as executor:
+        claimed = [task_id for ids in executor.map(work, range(8)) for task_id in ids]
+    assert sorted(claimed) == list(range(1, 201))
+
+
+def test_claim_task_uses_index(app, query_plan):
+    plans = query_plan(TaskRepository.claim_task, 'worker1', 30)
+    assert len(plans) == 1
+    assert 'USING INDEX ix_task_priority_id' in plans[0]
+    assert 'TEMP B-TREE' not in plans[0]
+
+
+def test_delete_tasks_uses_index(app, query_plan):
+    plans = query_plan(TaskRepository.delete_tasks, created_from=datetime(2000, 1, 1))
+    assert 'USING COVERING INDEX ix_task_created_at' in plans[0] or 'USING INDEX ix_task_created_at' in plans[0]
+
+
+@pytest.fixture
+def cached_app(app):
+    app.config['TASK_CACHE_ENABLED'] = True
+    task_cache.init_app(app)
+    return app
+
+
+def test_get_task_by_id_cached(cached_app, task1, query_plan):
+    assert TaskRepository.get_task_by_id(1) == task1
+    db.session.remove()  # start a new session, as a new request would do
+    assert query_plan(TaskRepository.get_task_by_id, 1) == []
+    task = TaskRepository.get_task_by_id(1)
+    assert task == task1
+    assert task.id == 1
+    assert task_cache.stats()['hits'] == 2
+    assert task_cache.stats()['misses'] == 1
+    assert TaskRepository.get_task_by_id(-123) is None
+    assert task_cache.stats()['misses'] == 2
+
+
+def test_get_task_by_id_cache_concurrent_update(cached_app, task1, monkeypatch):
+    """
+    Ensure that a task read on a miss is not cached if it is updated before it is added to the cache.
+    """
+    to_cache = TaskRepository._to_cache
+
+    def update_after_read(task):
+        cached = to_cache(task)
+        TaskRepository.update_task_by_id(1, 'updated_name')  # concurrent update, committed after the read
+        return cached
+    monkeypatch.setattr(TaskRepository, '_to_cache', update_after_read)
+    assert TaskRepository.get_task_by_id(1) is not None
+    monkeypatch.undo()
+    assert task_cache.get(1) is None
+    db.session.remove()
+    assert TaskRepository.get_task_by_id(1).name == 'updated_name'
+    assert task_cache.get(1)['name'] == 'updated_name'
+
+
+def test_delete_tasks_cache_invalidation(cached_app, task1, task2):
+    TaskRepository.get_task_by_id(1)
+    TaskRepository.get_task_by_id(2)
+    assert TaskRepository.delete_tasks(ids=[2, 3]) == 1
+    assert task_cache.get(1) is not None
+    assert task_cache.get(2) is None
+    assert TaskRepository.delete_tasks(priority=TASK1_PRIORITY) == 1
+    assert task_cache.get(1) is None
+
+
+def test_get_task_by_id_cache_invalidation(cached_app):
+    TaskRepository.get_task_by_id(1)
+    TaskRepository.get_task_by_id(2)
+    TaskRepository.update_task_by_id(1, 'updated_name', 2)
+    db.session.remove()
+    assert TaskRepository.get_task_by_id(1).name == 'updated_name'
+    TaskRepository.delete_task_by_id(1)
+    assert TaskRepository.get_task_by_id(1) is None
+    TaskRepository.delete_all_tasks()
+    assert TaskRepository.get_task_by_id(2) is None
@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from app import db
 from app.repositories.user_repository import UserRepository
 
@@ -40,3 +41,25 @@ def test_get_user_by_username(app):
         assert UserRepository.get_user_by_username('non_existing_user') is None
         assert user is not None
         assert user.username == 'test_user'
+
+
+def test_create_user_duplicated_username(app):
+    """
+    Ensure that the username is unique even if the existence check is skipped.
+    """
+    with app.app_context():
+        UserRepository.create_user('duplicated_user', 'password123')
+        with patch('app.repositories.user_repository.User.query') as mock_query:
+            mock_query.filter_by.return_value.first.return_value = None
+            assert UserRepository.create_user('duplicated_user', 'password123') is False
+        assert UserRepository.get_user_by_username('duplicated_user') is not None
+
+
+def test_get_user_by_username_uses_index(app, query_plan):
+    """
+    Ensure that users are looked up through the unique index on username.
+    """
+    with app.app_context():
+        plans = query_plan(UserRepository.get_user_by_username, 'test_user')
+        assert len(plans) == 1
+        assert 'USING INDEX ix_user_username' in plans[0]
@@ -0,0 +1,167 @@
+import pytest
+
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token, decode_token
+from app.aio.database import async_db
+from app.aio.tokens import create_token
+from app.models.revoked_token import RevokedToken
+from config import TestConfig
+
+USER = {'username': 'testuser', 'password': 'TestPassword123#'}
+
+
+async def login(client) -> dict:
+    """
+    Register and login the test user.
+
+    :return: authorization headers of its access token
+    """
+    await client.post('/api/register', json=USER)
+    response = await client.post('/api/login', json=USER)
+    return {'Authorization': f'Bearer {(await response.get_json())["access_token"]}'}
+
+
+def test_register_login_refresh(async_app, run_async):
+    async def test():
+        client = async_app.test_client()
+        response = await client.post('/api/register', json=USER)
+        assert response.status_code == 201
+        response = await client.post('/api/register', json=USER)
+        assert response.status_code == 400
+        assert 'already exists' in (await response.get_json())['message']
+        response = await client.post('/api/register', json={'username': 'user2', 'password': 'test'})
+        assert response.status_code == 400
+        assert '8 characters long' in (await response.get_json())['message']
+        response = await client.post('/api/login', json={'username': 'testuser', 'password': 'wrong'})
+        assert response.status_code == 401
+        response = await client.post('/api/login', json=USER)
+        assert response.status_code == 200
+        tokens = await response.get_json()
+        response = await client.post('/api/refresh', headers={'Authorization': f'Bearer {tokens["access_token"]}'})
+        assert response.status_code == 422
+        assert (await response.get_json())['msg'] == 'Only refresh tokens are allowed'
+        response = await client.post('/api/refresh', headers={'Authorization': f'Bearer {tokens["refresh_token"]}'})
+        assert response.status_code == 200
+        assert 'access_token' in await response.get_json()
+    run_async(test)
+
+
+def test_tasks(async_app, run_async):
+    async def test():
+        client = async_app.test_client()
+        headers = await login(client)
+        response = await client.post('/api/tasks', json={'name': 'Task1', 'priority': 2}, headers=headers)
+        assert response.status_code == 201
+        task = await response.get_json()
+        assert list(task) == ['id', 'name', 'priority', 'created_at', 'updated_at']
+        assert (task['name'], task['priority']) == ('Task1', 2)
+        response = await client.get(f'/api/tasks/{task["id"]}', headers=headers)
+        assert await response.get_json() == task
+        response = await client.get(f'/api/tasks/{task["id"]}?fields=name', headers=headers)
+        assert await response.get_json() == {'name': 'Task1'}
+        response = await client.patch(f'/api/tasks/{task["id"]}', json={'priority': 3}, headers=headers)
+        assert response.status_code == 200
+        response = await client.put(f'/api/tasks/{task["id"]}', json={'name': 'Task2'}, headers=headers)
+        assert response.status_code == 400
+        response = await client.get('/api/tasks', headers=headers)
+        assert [(task['name'], task['priority']) for task in await response.get_json()] == [('Task1', 3)]
+        response = await client.delete(f'/api/tasks/{task["id"]}', headers=headers)
+        assert response.status_code == 204
+        response = await client.delete(f'/api/tasks/{task["id"]}', headers=headers)
+        assert response.status_code == 404
+    run_async(test)
+
+
+def test_tasks_page(async_app, run_async):
+    async def test():
+        client = async_app.test_client()
+        headers = await login(client)
+        for i in range(5):
+            await client.post('/api/tasks', json={'name': f'Task{i}', 'priority': i % 2}, headers=headers)
+        response = await client.get('/api/tasks?limit=3&fields=name', headers=headers)
+        assert await response.get_json() == [{'name': 'Task0'}, {'name': 'Task1'}, {'name': 'Task2'}]
+        cursor = response.headers['X-Next-Cursor']
+        response = await client.get(f'/api/tasks?limit=3&fields=name&after={cursor}', headers=headers)
+        assert await response.get_json() == [{'name': 'Task3'}, {'name': 'Task4'}]
+        assert 'X-Next-Cursor' not in response.headers
+        response = await client.get('/api/tasks?priority=1&fields=id', headers=headers)
+        assert await response.get_json() == [{'id': 2}, {'id': 4}]
+        response = await client.get('/api/tasks?after=malformed', headers=headers)
+        assert response.status_code == 400
+        response = await client.delete('/api/tasks?priority=0', headers=headers)
+        assert await response.get_json() == {'deleted': 3}
+    run_async(test)
+
+
+@pytest.mark.parametrize("payload, message", [
+    (None, 'non-empty'),
+    ({'priority': 1}, 'name'),
+    ({'name': '', 'priority': 1}, 'name'),
+    ({'name': 'Task1', 'priority': 'high'}, 'priority'),
+    ({'name': 'Task1', 'owner': 'testuser'}, 'owner'),
+])
+def test_post_task_invalid(payload, message, async_app, run_async):
+    async def test():
+        client = async_app.test_client()
+        response = await client.post('/api/tasks', json=payload, headers=await login(client))
+        assert response.status_code == 400
+        assert message in (await response.get_json())['message']
+    run_async(test)
+
+
+@pytest.mark.parametrize("authorization, status_code, message", [
+    (None, 401, 'Missing Authorization Header'),
+    ('Token abc', 401, "Missing 'Bearer' type in 'Authorization' header. Expected 'Authorization: Bearer <JWT>'"),
+    ('Bearer abc', 422, 'Not enough segments'),
+])
+def test_tasks_unauthorized(authorization, status_code, message, async_app, run_async):
+    async def test():
+        headers = {'Authorization': authorization} if authorization else {}
+        response = await async_app.test_client().get('/api/tasks', headers=headers)
+        assert response.status_code == status_code
+        assert (await response.get_json())['msg'] == message
+    run_async(test)
+
+
+def test_tokens_interoperability(app, async_app, run_async):
+    """
+    Ensure that the tokens of the sync app are accepted by the async app and vice versa.
+    """
+    with app.app_context():
+        sync_token = create_access_token(identity='testuser')
+
+    async def test():
+        response = await async_app.test_client().get('/api/tasks', headers={'Authorization': f'Bearer {sync_token}'})
+        assert response.status_code == 200
+        return create_token('testuser')
+    async_token = run_async(test)
+    with app.app_context():
+        claims = decode_token(async_token)
+    assert (claims['sub'], claims['type'], claims['fresh']) == ('testuser', 'access', False)
+
+
+def test_revoked_token(async_app, run_async):
+    async def test():
+        client = async_app.test_client()
+        headers = await login(client)
+        assert (await client.get('/api/tasks', headers=headers)).status_code == 200
+        from app.aio.tokens import decode_token as decode_async_token
+        claims = decode_async_token(headers['Authorization'].split()[1])
+        async_db.session.add(RevokedToken(jti=claims['jti'], token_type='access',
+                                          expires_at=datetime.now() + timedelta(hours=1)))
+        await async_db.session.commit()
+        response = await client.get('/api/tasks', headers=headers)
+        assert response.status_code == 401
+        assert (await response.get_json())['msg'] == 'Token has been revoked'
+    run_async(test)
+
+
+def test_memory_task_cache_refused():
+    from app.aio import create_async_app
+
+    class Config(TestConfig):
+        TASK_CACHE_ENABLED = True
+        TASK_CACHE_BACKEND = 'memory'
+
+    with pytest.raises(ValueError):
+        create_async_app(Config)
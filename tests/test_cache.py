@@ -0,0 +1,101 @@
+import pytest
+
+from flask import Flask
+from app.cache import Cache, MemoryCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryCacheBackend(max_size=2, ttl=60)
+    return SQLiteCacheBackend(str(tmp_path / 'cache.db'), max_size=2, ttl=60)
+
+
+def test_backend_get_set_delete(backend):
+    assert backend.get(1) is None
+    backend.set(1, {'name': 'Task 1'})
+    backend.set(2, {'name': 'Task 2'})
+    assert backend.get(1) == {'name': 'Task 1'}
+    backend.delete(1)
+    assert backend.get(1) is None
+    assert backend.get(2) == {'name': 'Task 2'}
+    backend.clear()
+    assert backend.get(2) is None
+    assert len(backend) == 0
+
+
+def test_backend_lru_eviction(backend):
+    backend.set(1, 'a')
+    backend.set(2, 'b')
+    assert backend.get(1) == 'a'  # 2 becomes the least recently used key
+    backend.set(3, 'c')
+    assert len(backend) == 2
+    assert backend.get(2) is None
+    assert backend.get(1) == 'a'
+    assert backend.get(3) == 'c'
+
+
+def test_backend_ttl(backend):
+    backend.set(1, 'a', ttl=0)
+    backend.set(2, 'b')
+    assert backend.get(1) is None
+    assert backend.get(2) == 'b'
+
+
+def test_backend_set_generation(backend):
+    generation = backend.generation(1)
+    assert backend.set(1, 'a', generation=generation)
+    assert backend.get(1) == 'a'
+    backend.delete(1)  # e.g. the value has been updated after it was read
+    assert not backend.set(1, 'a', generation=generation)
+    assert backend.get(1) is None
+    generation = backend.generation(1)
+    backend.clear()
+    assert not backend.set(1, 'a', generation=generation)
+    assert backend.set(1, 'b', generation=backend.generation(1))
+    assert backend.set(1, 'c')
+    assert backend.get(1) == 'c'
+
+
+def test_sqlite_backend_is_shared(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    backend1 = SQLiteCacheBackend(path, max_size=10, ttl=60)
+    backend2 = SQLiteCacheBackend(path, max_size=10, ttl=60)
+    backend1.set(1, 'a')
+    assert backend2.get(1) == 'a'
+    generation = backend1.generation(2)
+    backend2.delete(2)
+    assert backend1.get(1) == 'a'
+    assert not backend1.set(2, 'b', generation=generation)  # invalidated by the other process
+    backend2.delete(1)
+    assert backend1.get(1) is None
+
+
+@pytest.mark.parametrize("backend_name", ['memory', 'sqlite'])
+def test_cache_extension(backend_name, tmp_path):
+    app = Flask(__name__)
+    app.config.update(TEST_CACHE_ENABLED=True, TEST_CACHE_BACKEND=backend_name,
+                      TEST_CACHE_PATH=str(tmp_path / 'cache.db'))
+    cache = Cache('TEST_CACHE', app)
+    with app.app_context():
+        assert cache.get(1) is None
+        cache.set(1, 'a')
+        assert cache.get(1) == 'a'
+        assert cache.stats() == {'enabled': True, 'hits': 1, 'misses': 1, 'size': 1}
+
+
+def test_cache_extension_disabled():
+    app = Flask(__name__)
+    cache = Cache('TEST_CACHE', app)
+    assert cache.get(1) is None  # outside of the app context
+    with app.app_context():
+        cache.set(1, 'a')
+        assert cache.get(1) is None
+        assert cache.stats()['enabled'] is False
+
+
+def test_cache_extension_invalid_backend():
+    app = Flask(__name__)
+    app.config.update(TEST_CACHE_ENABLED=True, TEST_CACHE_BACKEND='redis')
+    with pytest.raises(ValueError):
+        Cache('TEST_CACHE', app)
@@ -0,0 +1,87 @@
+import asyncio
+import time
+import pytest
+import threading
+
+from flask import Flask
+from werkzeug.security import check_password_hash, generate_password_hash
+from app.hashing import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture(scope='module')
+def hasher_app():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_METHOD='pbkdf2:sha256:1000', PASSWORD_HASH_WORKERS=1,
+                      PASSWORD_HASH_QUEUE_SIZE=0, PASSWORD_HASH_TIMEOUT=5)
+    hasher = PasswordHasher(app)
+    yield app, hasher
+    app.extensions['password_hasher'].executor.shutdown()
+
+
+def test_run_on_pool(hasher_app):
+    app, hasher = hasher_app
+    with app.app_context():
+        password_hash = hasher.run(generate_password_hash, 'password', **hasher.options())
+        assert password_hash.startswith('pbkdf2:sha256:1000$')
+        assert hasher.run(check_password_hash, password_hash, 'password')
+        assert not hasher.run(check_password_hash, password_hash, 'wrong_password')
+
+
+def test_run_overloaded(hasher_app):
+    app, hasher = hasher_app
+    with app.app_context():
+        hasher.run(time.sleep, 0)  # start the worker
+
+        def slow_job():
+            with app.app_context():
+                hasher.run(time.sleep, 0.5)
+
+        thread = threading.Thread(target=slow_job)
+        thread.start()
+        time.sleep(0.1)
+        with pytest.raises(PasswordHasherBusy):
+            hasher.run(time.sleep, 0)
+        thread.join()
+        hasher.run(time.sleep, 0)  # the slot has been released
+
+
+def test_run_without_workers():
+    app = Flask(__name__)
+    hasher = PasswordHasher(app)
+    assert hasher.options() == {}
+    with app.app_context():
+        assert hasher.options() == {}
+        assert hasher.run(len, 'password') == 8
+
+
+def test_run_async(hasher_app):
+    app, hasher = hasher_app
+
+    async def hash_and_check():
+        password_hash = await hasher.run_async(app, generate_password_hash, 'password', **hasher.options(app))
+        return password_hash, await hasher.run_async(app, check_password_hash, password_hash, 'password')
+
+    password_hash, valid = asyncio.run(hash_and_check())
+    assert password_hash.startswith('pbkdf2:sha256:1000$')
+    assert valid
+
+
+def test_run_async_overloaded(hasher_app):
+    app, hasher = hasher_app
+
+    async def overload():
+        await hasher.run_async(app, time.sleep, 0)  # start the worker
+        slow_job = asyncio.ensure_future(hasher.run_async(app, time.sleep, 0.5))
+        await asyncio.sleep(0.1)
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.run_async(app, time.sleep, 0)
+        await slow_job
+        await hasher.run_async(app, time.sleep, 0)  # the slot has been released
+
+    asyncio.run(overload())
+
+
+def test_run_async_without_workers():
+    app = Flask(__name__)
+    hasher = PasswordHasher(app)
+    assert asyncio.run(hasher.run_async(app, len, 'password')) == 8
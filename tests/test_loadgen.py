@@ -0,0 +1,80 @@
+import pytest
+import threading
+
+from unittest import mock
+from werkzeug.serving import make_server
+from app.loadgen import CONNECTION_ERROR, ApiClient, LoadGenerator, LoadStats, parse_mix, retry_delay
+
+
+@pytest.fixture
+def server(app):
+    """
+    Serve the test app on a local port.
+    """
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'http://127.0.0.1:{server.port}/api'
+    server.shutdown()
+    thread.join()
+
+
+def test_parse_mix():
+    assert parse_mix('get=60, create=30,delete=10') == {'get': 60, 'create': 30, 'delete': 10}
+    with pytest.raises(ValueError, match='unknown operation'):
+        parse_mix('get=60,patch=40')
+    with pytest.raises(ValueError, match='negative weight'):
+        parse_mix('get=-1')
+    with pytest.raises(ValueError, match='no operations'):
+        parse_mix('get=0')
+
+
+def test_retry_delay():
+    assert retry_delay('3', 1) == 3
+    assert 0.05 <= retry_delay(None, 1) <= 0.1
+    assert 0.4 <= retry_delay('Wed, 21 Oct 2015 07:28:00 GMT', 4) <= 0.8
+    assert retry_delay(None, 100) <= 5
+
+
+def test_load_stats():
+    stats = LoadStats()
+    stats.record('get', 200, 0.01)
+    stats.record('get', 429, 0.002)
+    stats.record('create', 500, 0.03)
+    interval = stats.interval()
+    assert (interval['requests'], interval['errors'], interval['throttled']) == (3, 1, 1)
+    assert stats.interval()['requests'] == 0
+    create, get, total = stats.summary()
+    assert (create['operation'], create['requests'], create['errors']) == ('create', 1, 1)
+    assert (get['operation'], get['requests'], get['throttled'], get['max_ms']) == ('get', 2, 1, 10)
+    assert (total['operation'], total['requests'], total['errors'], total['throttled']) == ('total', 3, 1, 1)
+    stats.record('get', CONNECTION_ERROR, 30)
+    assert stats.summary()[-1]['errors'] == 2
+
+
+def test_load_generator_connection_errors():
+    """
+    Ensure that requests failed without a response are counted as errors and do not stop the worker.
+    """
+    responses = [ConnectionRefusedError(), (201, {}, {'id': 1}), TimeoutError(), (201, {}, {'id': 2})]
+    generator = LoadGenerator('http://127.0.0.1:1/api', users=1, threads=1, mix={'create': 1}, requests=4)
+    with mock.patch.object(LoadGenerator, 'login'), mock.patch.object(ApiClient, 'request', side_effect=responses):
+        total = generator.run().summary()[-1]
+    assert (total['requests'], total['errors']) == (4, 2)
+    assert generator.task_ids == [1, 2]
+
+
+def test_loadgen_command(app, server):
+    result = app.test_cli_runner().invoke(args=['loadgen', '--url', server, '--users', '2', '--threads', '1',
+                                                '--requests', '30', '--mix', 'list=1,get=1,create=2,delete=1'])
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    total = next(line for line in lines if line.split()[:1] == ['total'])
+    assert total.split()[1] == '30'  # requests
+    assert total.split()[-2:] == ['0', '0']  # errors, 429
+
+
+def test_loadgen_command_invalid_mix(app):
+    result = app.test_cli_runner().invoke(args=['loadgen', '--mix', 'patch=1'])
+    assert result.exit_code == 2
+    assert 'unknown operation patch' in result.output
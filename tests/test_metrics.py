@@ -0,0 +1,84 @@
+import os
+import json
+import pytest
+
+from flask_jwt_extended import create_access_token
+from app import metrics
+from app.metrics import MetricsRegistry, merge_snapshots, to_prometheus
+
+
+def test_registry_to_prometheus():
+    registry = MetricsRegistry()
+    registry.inc('http_requests_total', (('endpoint', '/api/tasks'), ('method', 'GET'), ('status', '200')))
+    registry.inc('http_requests_total', (('endpoint', '/api/tasks'), ('method', 'GET'), ('status', '200')))
+    registry.add('http_requests_in_progress', value=3)
+    registry.observe('http_request_duration_seconds', (('endpoint', '/api/tasks'),), 0.2, (0.1, 0.5))
+    registry.observe('http_request_duration_seconds', (('endpoint', '/api/tasks'),), 0.7, (0.1, 0.5))
+    text = to_prometheus(merge_snapshots([registry.snapshot()]))
+    assert '# TYPE http_requests_total counter' in text
+    assert 'http_requests_total{endpoint="/api/tasks",method="GET",status="200"} 2' in text
+    assert 'http_requests_in_progress 3' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="/api/tasks",le="0.1"} 0' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="/api/tasks",le="0.5"} 1' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="/api/tasks",le="+Inf"} 2' in text
+    assert 'http_request_duration_seconds_sum{endpoint="/api/tasks"} 0.8999999999999999' in text
+    assert 'http_request_duration_seconds_count{endpoint="/api/tasks"} 2' in text
+
+
+def test_merge_snapshots():
+    registry1, registry2 = MetricsRegistry(), MetricsRegistry()
+    registry1.inc('db_queries_total', (('endpoint', '/api/tasks'),), 2)
+    registry2.inc('db_queries_total', (('endpoint', '/api/tasks'),), 3)
+    registry2.observe('http_request_db_queries', (), 1, (0, 1))
+    snapshot = json.loads(json.dumps(registry2.snapshot()))  # as read from the multiprocess directory
+    merged = merge_snapshots([registry1.snapshot(), snapshot])
+    assert merged['counters'][('db_queries_total', (('endpoint', '/api/tasks'),))] == 5
+    assert merged['histograms'][('http_request_db_queries', ())] == [(0, 1), [0, 1, 0], 1]
+
+
+def test_metrics_endpoint(client):
+    access_token = create_access_token(identity='test_user')
+    client.get('/api/tasks', headers={'Authorization': f'Bearer {access_token}'})
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.data.decode()
+    assert 'http_requests_total{endpoint="/api/tasks",method="GET",status="200"}' in text
+    assert 'http_request_duration_seconds_count{endpoint="/api/tasks",method="GET"}' in text
+    assert 'db_queries_total{endpoint="/api/tasks"}' in text
+    assert 'http_requests_in_progress 1' in text  # the /metrics request itself
+    assert 'task_cache_hits_total' in text
+
+
+def test_metrics_without_profiler(app, client):
+    counters = metrics.registry.counters
+    requests_key = ('http_requests_total', (('endpoint', '/api/tasks/stats'), ('method', 'GET'), ('status', '200')))
+    queries_key = ('db_queries_total', (('endpoint', '/api/tasks/stats'),))
+    requests, queries = counters.get(requests_key, 0), counters.get(queries_key, 0)
+    app.config['SQL_PROFILER_ENABLED'] = False
+    try:
+        access_token = create_access_token(identity='test_user')
+        client.get('/api/tasks/stats', headers={'Authorization': f'Bearer {access_token}'})
+    finally:
+        app.config['SQL_PROFILER_ENABLED'] = True
+    assert counters[requests_key] == requests + 1
+    assert counters.get(queries_key, 0) == queries
+
+
+@pytest.mark.parametrize("alive", [True, False])
+def test_metrics_multiprocess(alive, app, client, tmp_path):
+    pid = os.getppid() if alive else 2 ** 22 + 1  # above the maximum pid
+    registry = MetricsRegistry()
+    registry.inc('http_rate_limited_total', (('endpoint', '/api/login'),), 7)
+    registry.add('http_requests_in_progress', value=5)
+    with open(tmp_path / f'metrics_{pid}.json', 'w') as f:
+        json.dump(registry.snapshot(), f)
+    app.config['METRICS_MULTIPROCESS_DIR'] = str(tmp_path)
+    try:
+        text = client.get('/metrics').data.decode()
+        assert 'http_rate_limited_total{endpoint="/api/login"} 7' in text
+        assert ('http_requests_in_progress 6' in text) == alive
+        metrics.flush(str(tmp_path))
+        assert os.path.exists(tmp_path / f'metrics_{os.getpid()}.json')
+    finally:
+        app.config['METRICS_MULTIPROCESS_DIR'] = None
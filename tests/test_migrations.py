@@ -0,0 +1,33 @@
+import os
+import sys
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHECK_SCRIPT = '''
+import sys
+import flask_migrate
+from app import create_app, db
+from config import TestConfig
+
+
+class Config(TestConfig):
+    SQLALCHEMY_DATABASE_URI = f'sqlite:///{sys.argv[1]}'
+
+
+app = create_app(Config)
+with app.app_context():
+    db.create_all()
+    flask_migrate.stamp()
+    flask_migrate.check()
+'''
+
+
+def test_autogenerate_is_clean(tmp_path):
+    """
+    Ensure that autogenerate detects no changes between the models and the head schema, task_fts included.
+    Run in a new process, since alembic reconfigures the logging.
+    """
+    result = subprocess.run([sys.executable, '-c', CHECK_SCRIPT, str(tmp_path / 'app.db')], cwd=ROOT,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,53 @@
+import pytest
+import logging
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from app import db
+from app.profiling import QueryBudgetExceeded, query_budget, record_queries
+
+
+@pytest.fixture
+def profiler_config(app):
+    """
+    Restore the profiler config of the test app after each test.
+    """
+    config = {key: value for key, value in app.config.items() if key.startswith('SQL_')}
+    yield app.config
+    app.config.update(config)
+
+
+def test_record_queries(app):
+    with app.app_context():
+        with record_queries() as queries:
+            db.session.execute(text('SELECT 1'))
+            db.session.execute(text('SELECT 2'))
+    assert [query.statement for query in queries] == ['SELECT 1', 'SELECT 2']
+    assert all(query.duration >= 0 for query in queries)
+
+
+def test_query_budget(app):
+    with app.app_context():
+        with query_budget(1):
+            db.session.execute(text('SELECT 1'))
+        with pytest.raises(QueryBudgetExceeded, match='2 queries executed, budget is 1'):
+            with query_budget(1):
+                db.session.execute(text('SELECT 1'))
+                db.session.execute(text('SELECT 2'))
+
+
+def test_slow_query_log(client, caplog, profiler_config):
+    profiler_config['SQL_SLOW_QUERY_MS'] = 0
+    caplog.set_level(logging.WARNING, logger='app')
+    access_token = create_access_token(identity='test_user')
+    client.get('/api/tasks', headers={'Authorization': f'Bearer {access_token}'})
+    assert any(record.getMessage().startswith('slow query') for record in caplog.records)
+
+
+def test_n_plus_one_log(client, caplog, profiler_config):
+    profiler_config['SQL_N_PLUS_ONE_THRESHOLD'] = 1
+    caplog.set_level(logging.WARNING, logger='app')
+    access_token = create_access_token(identity='test_user')
+    client.get('/api/tasks', headers={'Authorization': f'Bearer {access_token}'})
+    messages = [record.getMessage() for record in caplog.records]
+    assert any(message.startswith('suspected N+1 query, executed 1 times by GET /api/tasks') for message in messages)
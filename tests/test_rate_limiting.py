@@ -0,0 +1,87 @@
+import pytest
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from flask_jwt_extended import create_access_token
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+from app import create_app, db, limiter
+from app.rate_limiting import SQLiteStorage
+from config import TestConfig
+
+
+def increment(uri: str, times: int) -> int:
+    storage = storage_from_string(uri)
+    return max(storage.incr('shared', 60) for _ in range(times))
+
+
+@pytest.fixture
+def storage_uri(tmp_path):
+    return f'sqlite:///{tmp_path / "limits.db"}'
+
+
+@pytest.fixture
+def limited_app(storage_uri):
+    """
+    App with the rate limiter enabled, using the sqlite storage and keying the limits on the JWT identity.
+    """
+    class LimitedConfig(TestConfig):
+        RATELIMIT_ENABLED = True
+        RATELIMIT_STORAGE_URI = storage_uri
+        RATELIMIT_KEY_BY = 'jwt_identity'
+    app = create_app(LimitedConfig)
+    with app.app_context():
+        db.create_all()
+    yield app
+    limiter.enabled = False
+
+
+def test_storage_from_string(storage_uri, tmp_path):
+    storage = storage_from_string(storage_uri)
+    assert isinstance(storage, SQLiteStorage)
+    assert storage.path == str(tmp_path / 'limits.db')
+    assert storage.check()
+
+
+def test_fixed_window(storage_uri):
+    storage = storage_from_string(storage_uri)
+    assert [storage.incr('key', 60) for _ in range(3)] == [1, 2, 3]
+    assert storage.get('key') == 3
+    assert storage.get_expiry('key') > 0
+    assert storage.incr('expired', 0) == 1
+    assert storage.incr('expired', 0) == 1  # a new window starts once the counter is expired
+    assert storage.get('expired') == 0
+    storage.clear('key')
+    assert storage.get('key') == 0
+    rate_limiter = FixedWindowRateLimiter(storage)
+    limit = parse('2 per minute')
+    assert [rate_limiter.hit(limit, 'user') for _ in range(3)] == [True, True, False]
+    assert storage.reset() == 2
+
+
+def test_moving_window(storage_uri):
+    storage = storage_from_string(storage_uri)
+    rate_limiter = MovingWindowRateLimiter(storage)
+    limit = parse('2 per minute')
+    assert [rate_limiter.hit(limit, 'user') for _ in range(3)] == [True, True, False]
+    assert rate_limiter.get_window_stats(limit, 'user').remaining == 0
+    assert storage.acquire_entry('other', 2, 60, amount=3) is False
+    rate_limiter.clear(limit, 'user')
+    assert rate_limiter.hit(limit, 'user')
+
+
+def test_shared_by_processes(storage_uri):
+    with ProcessPoolExecutor(4, mp_context=get_context('fork')) as executor:
+        list(executor.map(increment, [storage_uri] * 4, [50] * 4))
+    assert storage_from_string(storage_uri).get('shared') == 200
+
+
+def test_limits_by_jwt_identity(limited_app):
+    client = limited_app.test_client()
+    with limited_app.app_context():
+        tokens = [create_access_token(identity=identity) for identity in ('user1', 'user2')]
+    statuses = [client.get('/api/tasks', headers={'Authorization': f'Bearer {token}'}).status_code
+                for token in tokens + tokens]
+    assert statuses == [200, 200, 429, 429]  # 1 per second for each user, from the same address
+    assert client.get('/api/tasks').status_code == 401  # anonymous requests are limited by address
@@ -0,0 +1,98 @@
+import shutil
+import pytest
+
+from flask_jwt_extended import create_access_token
+from app import create_app, db, limiter, task_cache
+from app.models.task import Task
+from app.repositories.task_repository import TaskRepository
+from app.repositories.user_repository import UserRepository
+from config import TestConfig
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    """
+    App with a primary db file and two replica files, copies of the primary taken after the first task is created.
+    """
+    class ReplicaConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "primary.db"}'
+        SQLALCHEMY_REPLICA_URIS = [f'sqlite:///{tmp_path / "replica0.db"}', f'sqlite:///{tmp_path / "replica1.db"}']
+        TASK_CACHE_ENABLED = False
+    app = create_app(ReplicaConfig)
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+        db.session.add(Task(name='replicated task', priority=1))
+        db.session.commit()
+        for i in range(2):
+            shutil.copy(tmp_path / 'primary.db', tmp_path / f'replica{i}.db')
+        db.session.add(Task(name='primary only task', priority=2))
+        db.session.commit()
+    yield app
+    for engine in app.extensions['read_replicas'].engines:
+        engine.dispose()
+
+
+def test_reads_from_replica(replica_app):
+    with replica_app.test_request_context():
+        assert [task.name for task in TaskRepository.get_all_tasks()] == ['replicated task']
+        assert TaskRepository.get_task_by_id(2) is None
+        assert UserRepository.get_user_by_username('user') is None
+        assert len(Task.query.all()) == 2  # queries outside the repository reads run on the primary
+
+
+def test_cache_filled_from_primary(replica_app):
+    replica_app.config['TASK_CACHE_ENABLED'] = True
+    task_cache.init_app(replica_app)
+    with replica_app.test_request_context():
+        assert TaskRepository.get_task_by_id(2).name == 'primary only task'  # not the replicas, which lag behind
+        assert task_cache.get(2)['name'] == 'primary only task'
+        assert TaskRepository.get_task_by_id(2, columns=['name']) is not None  # cached
+
+
+def test_read_your_writes(replica_app):
+    with replica_app.test_request_context():
+        TaskRepository.create_task('new task', 3)
+        assert len(TaskRepository.get_all_tasks()) == 3
+    with replica_app.test_request_context():
+        replica_app.preprocess_request()
+        assert len(TaskRepository.get_all_tasks()) == 1  # a new request reads from the replicas again
+
+
+def test_read_your_bulk_writes(replica_app):
+    with replica_app.test_request_context():
+        TaskRepository.delete_all_tasks()
+        assert TaskRepository.get_all_tasks() == []
+
+
+def test_api_reads_from_replica(replica_app):
+    client = replica_app.test_client()
+    with replica_app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity="user")}'}
+    assert client.get('/api/tasks/1', headers=headers).status_code == 200
+    assert client.get('/api/tasks/2', headers=headers).status_code == 404  # not replicated yet
+    assert client.put('/api/tasks/1', json={'name': 'updated task', 'priority': 2}, headers=headers).status_code == 200
+    assert client.get('/api/tasks/1', headers=headers).json['name'] == 'replicated task'  # replication lag
+
+
+def test_reads_of_a_request_use_one_replica(replica_app, tmp_path):
+    with replica_app.app_context():
+        db.session.add(Task(name='task on replica1 only', priority=3))
+        db.session.commit()
+    shutil.copy(tmp_path / 'primary.db', tmp_path / 'replica1.db')  # replica0 lags behind replica1
+    for _ in range(2):  # one request per replica, round robin
+        with replica_app.test_request_context():
+            replica_app.preprocess_request()
+            version = TaskRepository.get_tasks_version()
+            assert version.count == len(TaskRepository.get_all_tasks()) == len(TaskRepository.get_all_tasks())
+
+
+@pytest.mark.parametrize("selection, expected", [
+    ('round_robin', [0, 1, 0, 1]),
+    ('least_busy', [1, 1, 1, 1]),
+])
+def test_replica_selection(selection, expected, replica_app):
+    state = replica_app.extensions['read_replicas']
+    state.selection = selection
+    with state.engines[0].connect():  # replica 0 is busy
+        assert [state.engines.index(state.select()) for _ in expected] == expected
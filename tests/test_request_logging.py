@@ -0,0 +1,97 @@
+import json
+import time
+import pytest
+import logging
+
+from logging.handlers import QueueHandler
+from flask import Flask, Request
+from flask.logging import default_handler
+from app import configure_logging, log_listeners
+
+
+@pytest.fixture
+def access_log(app, caplog):
+    """
+    Collect the access log entries of the test app.
+    """
+    def entries():
+        return [json.loads(record.getMessage()) for record in caplog.records if record.name == 'app.access']
+    caplog.set_level(logging.INFO, logger='app.access')
+    return entries
+
+
+@pytest.fixture
+def log_config(app):
+    """
+    Restore the logging config of the test app after each test.
+    """
+    config = {key: value for key, value in app.config.items() if key.startswith('LOG_REQUEST')}
+    yield app.config
+    app.config.update(config)
+
+
+def test_access_log(client, access_log):
+    client.post('/api/login?x=1', json={'username': 'nobody', 'password': 'secret'},
+                headers={'Authorization': 'Bearer token', 'User-Agent': 'pytest'})
+    (entry,) = access_log()
+    assert entry['method'] == 'POST'
+    assert entry['path'] == '/api/login?x=1'
+    assert entry['status'] == 401
+    assert entry['duration_ms'] >= 0
+    assert entry['headers'] == {'Content-Type': 'application/json', 'Content-Length': '44', 'User-Agent': 'pytest'}
+    assert 'body' not in entry
+
+
+def test_access_log_body(client, access_log, log_config):
+    log_config.update(LOG_REQUEST_BODY_MAX_BYTES=10, LOG_REQUEST_HEADERS=())
+    client.post('/api/login', json={'username': 'nobody', 'password': 'secret'})
+    (entry,) = access_log()
+    assert len(entry['body']) == 10 and entry['body'].startswith('{')
+    assert entry['body_truncated'] is True
+    assert 'headers' not in entry
+
+
+def test_access_log_body_not_read(client, access_log, log_config, monkeypatch):
+    """
+    Ensure that a body not read by the view is not read as a whole to log its first bytes.
+    """
+    def get_data(*args, **kwargs):
+        raise AssertionError('the whole body is read')
+    log_config.update(LOG_REQUEST_BODY_MAX_BYTES=10, LOG_REQUEST_HEADERS=())
+    monkeypatch.setattr(Request, 'get_data', get_data)
+    response = client.post('/api/tasks', data='x' * 100000)  # 401, no token
+    assert response.status_code == 401
+    (entry,) = access_log()
+    assert entry['body'] == 'x' * 10
+    assert entry['body_truncated'] is True
+
+
+def test_access_log_sampling(client, access_log, log_config):
+    log_config.update(LOG_REQUEST_SAMPLE_RATE=0)
+    client.post('/api/login', json={'username': 'nobody', 'password': 'secret'})
+    assert access_log() == []
+
+
+def test_logging_handlers(app):
+    """
+    Ensure that the records are only written by the background thread, not by the default handler of Flask.
+    """
+    assert default_handler not in app.logger.handlers
+    assert [type(handler) for handler in app.logger.handlers] == [QueueHandler]
+
+
+def test_log_file_per_app(tmp_path):
+    """
+    Ensure that an app configured after another one with a different log file logs to its own file.
+    """
+    for i in range(2):
+        app = Flask('logging_test')  # the apps with the same name share their logger
+        app.config['LOG_FILE'] = str(tmp_path / f'app{i}.log')
+        configure_logging(app)
+        app.logger.info(f'record of app {i}')
+    deadline = time.monotonic() + 5
+    while 'record of app 1' not in (tmp_path / 'app1.log').read_text() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 'record of app 1' in (tmp_path / 'app1.log').read_text()
+    assert 'record of app 1' not in (tmp_path / 'app0.log').read_text()
+    assert len(log_listeners) >= 2
@@ -0,0 +1,77 @@
+import pytest
+
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token, decode_token
+from app import create_app, db, limiter, token_blocklist
+from app.profiling import record_queries
+from app.repositories.revoked_token_repository import RevokedTokenRepository
+from app.revocation import BloomFilter
+from config import TestConfig
+
+
+@pytest.fixture
+def blocklist_app(tmp_path):
+    """
+    App syncing the blocklist on every request, as if the other processes revoked tokens continuously.
+    """
+    class BlocklistConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "blocklist.db"}'
+        TOKEN_BLOCKLIST_SYNC_INTERVAL = 0
+    app = create_app(BlocklistConfig)
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def test_bloom_filter():
+    bloom = BloomFilter(1000, 0.01)
+    items = [f'item{i}' for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)  # no false negatives
+    false_positives = sum(f'other{i}' in bloom for i in range(10000))
+    assert false_positives < 300
+    assert len(bloom) == 1000
+
+
+def test_no_lookup_for_valid_tokens(app, client):
+    headers = {'Authorization': f'Bearer {create_access_token(identity="user")}'}
+    client.get('/api/tasks', headers=headers)  # first sync
+    with record_queries() as queries:
+        assert client.get('/api/tasks', headers=headers).status_code == 200
+    assert not any('revoked_token' in query.statement for query in queries)
+
+
+def test_revoked_token_rejected(app, client):
+    token = create_access_token(identity='user')
+    headers = {'Authorization': f'Bearer {token}'}
+    token_blocklist.revoke(decode_token(token))
+    response = client.get('/api/tasks', headers=headers)
+    assert response.status_code == 401
+    assert response.json['msg'] == 'Token has been revoked'
+
+
+def test_revocations_of_other_processes(blocklist_app):
+    client = blocklist_app.test_client()
+    token = create_access_token(identity='user')
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/tasks', headers=headers).status_code == 200
+    claims = decode_token(token)
+    RevokedTokenRepository.revoke(claims['jti'], claims['type'], datetime.fromtimestamp(claims['exp']))
+    assert client.get('/api/tasks', headers=headers).status_code == 401
+
+
+def test_rebuild_drops_expired_tokens(blocklist_app):
+    client = blocklist_app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="user")}'}
+    RevokedTokenRepository.revoke('expired-jti', 'access', datetime.now() - timedelta(seconds=1))
+    RevokedTokenRepository.revoke('active-jti', 'access', datetime.now() + timedelta(hours=1))
+    blocklist_app.extensions['token_blocklist'].rebuilt_at = None
+    assert client.get('/api/tasks', headers=headers).status_code == 200
+    bloom = blocklist_app.extensions['token_blocklist'].bloom
+    assert 'active-jti' in bloom
+    assert 'expired-jti' not in bloom
+    assert [jti for _, jti in RevokedTokenRepository.get_revoked_after()] == ['active-jti']
@@ -0,0 +1,97 @@
+import time
+import pytest
+
+from datetime import timedelta
+from unittest import mock
+from flask_jwt_extended import create_access_token, decode_token, jwt_manager
+from jwt import ExpiredSignatureError, InvalidSignatureError
+from app import create_app, db, jwt, jwt_cache, limiter
+from config import TestConfig
+
+
+@pytest.fixture(scope='module')
+def cache_app():
+    """
+    App with the JWT cache enabled.
+    """
+    class CacheConfig(TestConfig):
+        JWT_SECRET_KEY = 'cachesecret'
+        JWT_CACHE_ENABLED = True
+    app = create_app(CacheConfig)
+    limiter.enabled = False
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def decode_spy():
+    """
+    Count the tokens actually decoded and verified.
+    """
+    with mock.patch.object(jwt_manager, '_decode_jwt', wraps=jwt_manager._decode_jwt) as spy:
+        yield spy
+
+
+def test_decode_cached(cache_app, decode_spy):
+    token = create_access_token(identity='user')
+    claims = decode_token(token)
+    assert decode_token(token) == claims
+    assert decode_spy.call_count == 1
+    assert jwt_cache.stats()['hits'] >= 1
+
+
+def test_cached_until_exp(cache_app):
+    token = create_access_token(identity='user', expires_delta=timedelta(seconds=30))
+    decode_token(token)
+    (_, expires_at), = [entry for key, entry in cache_app.extensions['jwt_cache'].backend._entries.items()
+                        if key == jwt._cache_key(token)]
+    assert 29 < expires_at - time.monotonic() <= 30
+
+
+def test_expired_not_cached(cache_app, decode_spy):
+    token = create_access_token(identity='user', expires_delta=timedelta(seconds=-1))
+    for _ in range(2):
+        with pytest.raises(ExpiredSignatureError):
+            decode_token(token)
+    assert decode_spy.call_count == 4  # decoded again to attach the claims to each error
+
+
+def test_secret_rotation(cache_app):
+    token = create_access_token(identity='user')
+    decode_token(token)
+    cache_app.config['JWT_SECRET_KEY'] = 'rotated'
+    try:
+        with pytest.raises(InvalidSignatureError):
+            decode_token(token)
+    finally:
+        cache_app.config['JWT_SECRET_KEY'] = 'cachesecret'
+
+
+def test_requests_decode_cached(cache_app, decode_spy):
+    """
+    Ensure that the tokens of the requests are decoded through the overridden _decode_jwt_from_config.
+    """
+    client = cache_app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="user")}'}
+    for _ in range(2):
+        assert client.get('/api/tasks', headers=headers).status_code == 200
+    assert decode_spy.call_count == 1
+
+
+def test_revocation_checked_on_cached_tokens(cache_app):
+    client = cache_app.test_client()
+    headers = {'Authorization': f'Bearer {create_access_token(identity="user")}'}
+    assert client.get('/api/tasks', headers=headers).status_code == 200
+    with mock.patch.object(jwt, '_token_in_blocklist_callback', lambda jwt_header, jwt_data: True):
+        assert client.get('/api/tasks', headers=headers).status_code == 401
+
+
+def test_disabled(app, decode_spy):
+    token = create_access_token(identity='user')
+    decode_token(token)
+    decode_token(token)
+    assert decode_spy.call_count == 2
+    assert jwt_cache.stats()['enabled'] is False